@@ -0,0 +1,6 @@
+# coding=utf-8
+""" Tools for measuring the performance of the models and widgets, meant to be run by hand or from benchmarks, and not
+imported by the rest of the package.
+
+Author: Ian Davis
+"""
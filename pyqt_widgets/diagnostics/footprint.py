@@ -0,0 +1,364 @@
+# coding=utf-8
+""" Report how many bytes each row of a TableModel or TreeModel costs, broken down into the parts a row is made of.
+
+Each part (the QObject, the rest of the row object, the dictionary packed by pack_dictionary, the changed signal
+connection, and the entry in the model's mapping of rows) is built on its own for every row and measured, and then
+whole models are built with add_row/add_nodes, so that whatever the parts do not account for shows up as 'other'. The
+same rows are also stored in simpler layouts (packed dictionaries in an OrderedDict, tuples in a list) for comparison.
+Run it from the command line, for example:
+
+    python -m pyqt_widgets.diagnostics.footprint --rows 100000 --columns 8 --width 16
+
+Python heap bytes are measured with tracemalloc where it is available, and otherwise (on python 2) by adding up
+sys.getsizeof of every object reachable from what was built that no earlier measurement reached, which leaves out the
+allocator's overhead and whatever is only held by C++ (such as signal connections). Process bytes (which include the C++
+side of every QObject) come from the resident set size of the process, with psutil where it is installed.
+
+Author: Ian Davis
+"""
+
+import argparse
+import gc
+import sys
+import types
+
+from collections import OrderedDict as OrderedDictionary
+
+from PyQt4.QtCore import QObject
+
+from pyqt_widgets.models import TableModel, TreeModel
+from pyqt_widgets.models.table_models.basic import TableRow
+from pyqt_widgets.models.tree_models.basic import TreeChildren, TreeItem
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+# Objects shared by every row, which are never counted by deep_size.
+SHARED_TYPES = (type, types.ClassType, types.ModuleType, types.FunctionType, types.BuiltinFunctionType,
+                types.MethodType, types.CodeType, )
+
+
+def deep_size(root, seen):
+    """ Add up sys.getsizeof of every object reachable from an object, skipping the objects that were already counted.
+
+    :param root: The object to start from.
+    :param seen: A set of the ids of the objects that were already counted, which the counted objects are added to.
+    :return: The number of bytes.
+    """
+    size = 0
+    pending = [root]
+
+    while pending:
+        value = pending.pop()
+
+        if id(value) in seen or isinstance(value, SHARED_TYPES):
+            continue
+
+        seen.add(id(value))
+        size += sys.getsizeof(value)
+        pending.extend(gc.get_referents(value))
+
+    return size
+
+
+def process_bytes():
+    """ Get the resident set size of the process in bytes, or None if it cannot be read on this platform.
+    """
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+
+    try:
+        with open('/proc/self/statm') as statm:
+            resident_pages = int(statm.read().split()[1])
+    except (IOError, OSError, IndexError, ValueError):
+        return None
+
+    import resource
+    return resident_pages * resource.getpagesize()
+
+
+def python_bytes():
+    """ Get the number of bytes traced by tracemalloc, or None if it is not tracing.
+    """
+    if tracemalloc is None or not tracemalloc.is_tracing():
+        return None
+
+    return tracemalloc.get_traced_memory()[0]
+
+
+class FootprintReport(object):
+    """ Measure the bytes per row of a number of parts of a model, each built for every row by a callable.
+
+        Everything that is measured is kept alive until the report is done, so that the memory of one measurement is
+        never reused by the next, which would make the process bytes of the later measurements look too small.
+    """
+
+    def __init__(self, rows):
+        """ FootprintReport initializer
+
+        :param rows: The number of rows every measured callable builds.
+        """
+        self.rows = rows
+        self.lines = []
+        self._kept = []
+        # The ids of the objects deep_size has counted, when python bytes are not measured with tracemalloc.
+        self._seen = set()
+
+    def exclude(self, *values):
+        """ Leave objects that were built outside of measure (and everything reachable from them) out of the python
+            bytes of later measurements. They must be kept alive until the report is done.
+        """
+        if python_bytes() is None:
+            for value in values:
+                deep_size(value, self._seen)
+
+    def measure(self, label, build, excluding=None):
+        """ Measure the bytes per row built by a callable, adding a line to the report.
+
+        :param label: The label of the line.
+        :param build: A callable building the part for every row, returning what has to be kept alive.
+        :param excluding: Optional bytes per row of a part the built part includes, to leave out of its figures.
+        :return: A (python bytes, process bytes) tuple of bytes per row, with None for unavailable measurements.
+        """
+        gc.collect()
+        python_before, process_before = python_bytes(), process_bytes()
+
+        built = build()
+        self._kept.append(built)
+
+        gc.collect()
+        python_after, process_after = python_bytes(), process_bytes()
+
+        if python_before is None and built is not None:
+            python_before, python_after = 0, deep_size(built, self._seen)
+
+        per_row = (self._per_row(python_before, python_after), self._per_row(process_before, process_after))
+
+        if excluding is not None:
+            per_row = (_subtract(per_row[0], excluding[0]), _subtract(per_row[1], excluding[1]))
+
+        self.lines.append((label, ) + per_row)
+
+        return per_row
+
+    def add(self, label, python_per_row, process_per_row):
+        """ Add a line with figures that were calculated rather than measured.
+        """
+        self.lines.append((label, python_per_row, process_per_row))
+
+    def release(self):
+        """ Release everything that was built for the report.
+        """
+        del self._kept[:]
+        self._seen.clear()
+        gc.collect()
+
+    def _per_row(self, before, after):
+        if before is None or after is None:
+            return None
+
+        return float(after - before) / self.rows
+
+
+def make_records(rows, columns, width):
+    """ Generate records with a key column and a number of string columns of a given width.
+
+    :return: A (header, records) tuple.
+    """
+    header = tuple('Column{0}'.format(column) for column in xrange(columns))
+    records = []
+
+    for row in xrange(rows):
+        record = {header[0]: 'Key{0}'.format(row)}
+
+        for column in header[1:]:
+            record[column] = '{0}{1}'.format(column, row).ljust(width, '.')[:width]
+
+        records.append(record)
+
+    return header, records
+
+
+def _subtract(first, second):
+    if first is None or second is None:
+        return None
+
+    return first - second
+
+
+def _connect_all(model, nodes):
+    for node in nodes:
+        model._connect_node(node)
+
+
+def _add_parts(label, report, total, parts):
+    """ Add the line of what a total does not account for once its parts are subtracted.
+    """
+    python_other, process_other = total
+
+    for python_part, process_part in parts:
+        python_other = _subtract(python_other, python_part)
+        process_other = _subtract(process_other, process_part)
+
+    report.add(label, python_other, process_other)
+
+
+def table_footprint(rows, columns=4, width=16):
+    """ Report the bytes per row of a TableModel.
+
+    :param rows: The number of rows to build.
+    :param columns: The number of columns, including the key column.
+    :param width: The width of the string values of the columns.
+    :return: FootprintReport
+    """
+    header, records = make_records(rows, columns, width)
+    model = TableModel(header)
+    key_column = model.key_column
+    report = FootprintReport(rows)
+    report.exclude(records)
+
+    report.add('cell values', sum(sys.getsizeof(value) for value in records[0].itervalues()), None)
+
+    qobject = report.measure('QObject', lambda: [QObject() for index in xrange(rows)])
+    table_rows = [TableRow({}, index) for index in xrange(rows)]
+    report.exclude(table_rows)
+    row_object = report.measure('TableRow (excluding QObject)',
+                                lambda: [TableRow({}, index) for index in xrange(rows)], qobject)
+
+    packed = report.measure('packed dictionary', lambda: [model.pack_dictionary(record) for record in records])
+    connection = report.measure('changed connection', lambda: _connect_all(model, table_rows))
+
+    def build_mapping():
+        table_data = OrderedDictionary()
+
+        for index, table_row in enumerate(table_rows):
+            table_data[records[index][key_column]] = table_row
+
+        return table_data
+
+    entry = report.measure('OrderedDict entry', build_mapping)
+
+    def build_model():
+        table_model = TableModel(header)
+
+        for record in records:
+            table_model.add_row(record)
+
+        return table_model
+
+    total = report.measure('total per add_row', build_model)
+    _add_parts('other', report, total, (qobject, row_object, packed, connection, entry))
+
+    report.measure('alternative: packed dictionaries in an OrderedDict',
+                   lambda: OrderedDictionary((record[key_column], model.pack_dictionary(record)) for record in records))
+    report.measure('alternative: tuples in a list',
+                   lambda: [tuple(record[column] for column in header) for record in records])
+
+    report.release()
+    return report
+
+
+def tree_footprint(rows, columns=4, width=16):
+    """ Report the bytes per row of a TreeModel holding the rows as children of its root.
+
+    :param rows: The number of rows to build.
+    :param columns: The number of columns, including the key column.
+    :param width: The width of the string values of the columns.
+    :return: FootprintReport
+    """
+    header, records = make_records(rows, columns, width)
+    model = TreeModel(header)
+    key_column = model.key_column
+    report = FootprintReport(rows)
+    report.exclude(records)
+
+    report.add('cell values', sum(sys.getsizeof(value) for value in records[0].itervalues()), None)
+
+    qobject = report.measure('QObject', lambda: [QObject() for index in xrange(rows)])
+    tree_items = [TreeItem({}) for index in xrange(rows)]
+    report.exclude(tree_items)
+    item_object = report.measure('TreeItem (excluding QObject)',
+                                 lambda: [TreeItem({}) for index in xrange(rows)], qobject)
+
+    packed = report.measure('packed dictionary', lambda: [model.pack_dictionary(record) for record in records])
+    connection = report.measure('changed connection', lambda: _connect_all(model, tree_items))
+
+    def build_children():
+        children = TreeChildren()
+
+        for index, tree_item in enumerate(tree_items):
+            children[records[index][key_column]] = tree_item
+
+        children.row_of(tree_items[-1])
+        return children
+
+    entry = report.measure('TreeChildren entry', build_children)
+
+    def build_model():
+        tree_model = TreeModel(header)
+        nodes = tree_model.add_nodes(None, records)
+        nodes[-1].row()
+
+        return tree_model
+
+    total = report.measure('total per add_nodes', build_model)
+    _add_parts('other', report, total, (qobject, item_object, packed, connection, entry))
+
+    report.measure('alternative: packed dictionaries in an OrderedDict',
+                   lambda: OrderedDictionary((record[key_column], model.pack_dictionary(record)) for record in records))
+    report.measure('alternative: tuples in a list',
+                   lambda: [tuple(record[column] for column in header) for record in records])
+
+    report.release()
+    return report
+
+
+def format_report(title, report):
+    """ Format a FootprintReport as a table of text.
+    """
+    def format_bytes(value):
+        return '{0:>10.1f}'.format(value) if value is not None else '{0:>10}'.format('n/a')
+
+    lines = ['{0} ({1} rows)'.format(title, report.rows),
+             '    {0:<52} {1:>10} {2:>10}'.format('bytes per row', 'python', 'process')]
+
+    for label, python_per_row, process_per_row in report.lines:
+        lines.append('    {0:<52} {1} {2}'.format(label, format_bytes(python_per_row), format_bytes(process_per_row)))
+
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Report the bytes per row of TableModel and TreeModel.')
+    parser.add_argument('--model', choices=('table', 'tree', 'both'), default='both')
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--columns', type=int, default=4, help='The number of columns, including the key column.')
+    parser.add_argument('--width', type=int, default=16, help='The width of the string values.')
+    arguments = parser.parse_args(argv)
+
+    if tracemalloc is not None:
+        tracemalloc.start()
+
+    try:
+        if arguments.model in ('table', 'both'):
+            print format_report('TableModel', table_footprint(arguments.rows, arguments.columns, arguments.width))
+
+        if arguments.model in ('tree', 'both'):
+            print format_report('TreeModel', tree_footprint(arguments.rows, arguments.columns, arguments.width))
+    finally:
+        if tracemalloc is not None:
+            tracemalloc.stop()
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
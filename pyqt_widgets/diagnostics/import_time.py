@@ -0,0 +1,133 @@
+# coding=utf-8
+""" Measure the cold import cost of every public name of pyqt_widgets.models and pyqt_widgets.widgets.
+
+Each name is imported in a fresh interpreter, timing the import statement alone (not the interpreter start up) and
+counting the modules it loaded, a number of times, keeping the median. Run it from the command line, for example:
+
+    python -m pyqt_widgets.diagnostics.import_time --repeat 5
+
+Author: Ian Davis
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+import pyqt_widgets
+
+
+PACKAGES = ('pyqt_widgets.models', 'pyqt_widgets.widgets', )
+
+IMPORT_SCRIPT = """
+import json
+import sys
+from timeit import default_timer
+
+modules = set(sys.modules)
+start = default_timer()
+{statement}
+elapsed = default_timer() - start
+loaded = [name for name in sys.modules if name not in modules and sys.modules[name] is not None]
+print(json.dumps({{'seconds': elapsed, 'modules': len(loaded), 'qtgui': 'PyQt4.QtGui' in loaded}}))
+"""
+
+
+def import_statements(packages=PACKAGES):
+    """ Get the import statement of each public name of the lazily imported packages, preceded by the import of each
+        package itself.
+
+    :param packages: The names of the packages.
+    :return: A list of import statements.
+    """
+    statements = []
+
+    for package_name in packages:
+        package = __import__(package_name, fromlist=['__name__'])
+        statements.append('import {package}'.format(package=package_name))
+
+        for name in sorted(package.exports):
+            statements.append('from {package} import {name}'.format(package=package_name, name=name))
+
+    return statements
+
+
+def cold_import(statement, python=sys.executable):
+    """ Run an import statement in a fresh interpreter.
+
+    :param statement: The import statement.
+    :param python: The python executable to run.
+    :return: A dictionary with the 'seconds' the statement took, the number of 'modules' it loaded, and whether it
+        loaded PyQt4.QtGui ('qtgui').
+    :raise RuntimeError: If the statement failed.
+    """
+    environment = dict(os.environ)
+    package_root = os.path.dirname(os.path.dirname(os.path.abspath(pyqt_widgets.__file__)))
+    environment['PYTHONPATH'] = os.pathsep.join(path for path in (package_root, environment.get('PYTHONPATH')) if path)
+
+    process = subprocess.Popen([python, '-c', IMPORT_SCRIPT.format(statement=statement)], env=environment,
+                               stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    output, error = process.communicate()
+
+    if process.returncode:
+        raise RuntimeError('{statement} failed:\n{error}'.format(statement=statement, error=error.strip()))
+
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def measure(statements, repeat=5, python=sys.executable):
+    """ Measure the median cold import cost of a number of import statements.
+
+    :param statements: The import statements.
+    :param repeat: The number of times to run each statement.
+    :param python: The python executable to run.
+    :return: A list of (statement, result) tuples, where result is the median cold_import result, or the error message
+        of a statement that failed.
+    """
+    results = []
+
+    for statement in statements:
+        try:
+            runs = sorted((cold_import(statement, python) for run in xrange(repeat)), key=lambda run: run['seconds'])
+        except RuntimeError as error:
+            results.append((statement, str(error)))
+            continue
+
+        results.append((statement, runs[len(runs) // 2]))
+
+    return results
+
+
+def format_results(results):
+    """ Format the results of measure as a table of text.
+    """
+    lines = ['{0:<70} {1:>10} {2:>8} {3:>6}'.format('statement', 'ms', 'modules', 'QtGui')]
+
+    for statement, result in results:
+        if isinstance(result, basestring):
+            lines.append('{0:<70} {1}'.format(statement, result.splitlines()[-1]))
+            continue
+
+        lines.append('{0:<70} {1:>10.2f} {2:>8} {3:>6}'.format(statement, result['seconds'] * 1000.0,
+                                                               result['modules'], 'yes' if result['qtgui'] else 'no'))
+
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Measure the cold import cost of the public names of pyqt_widgets.')
+    parser.add_argument('--repeat', type=int, default=5, help='The number of times to import each name.')
+    parser.add_argument('--package', choices=PACKAGES, action='append',
+                        help='The package to measure, defaults to all of them.')
+    parser.add_argument('--python', default=sys.executable, help='The python executable to measure with.')
+    arguments = parser.parse_args(argv)
+
+    results = measure(import_statements(arguments.package or PACKAGES), arguments.repeat, arguments.python)
+    print format_results(results)
+
+    return 1 if [result for statement, result in results if isinstance(result, basestring)] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
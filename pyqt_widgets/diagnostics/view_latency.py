@@ -0,0 +1,329 @@
+# coding=utf-8
+""" Measure how long real QTableView/QTreeView frames take over our models, and how many model calls each frame makes.
+
+The harness attaches a model to a view, drives it through scripted scrolling, expansion, resizing and filtering, and
+repaints the view synchronously after every step, recording the time each frame took and how many times the view
+called index, data, parent and rowCount for it. Run it from the command line, for example:
+
+    python -m pyqt_widgets.diagnostics.view_latency --model tree --rows 1000000 --budget 16
+
+The views are real widgets, so Qt 4 needs a display to create them on X11. On a machine without one (a CI runner, for
+example), run the harness under a virtual X server:
+
+    xvfb-run -a python -m pyqt_widgets.diagnostics.view_latency --model tree --rows 1000000 --budget 16
+
+which prints the percentiles of the frame times and model calls per frame, and exits with an error when the p99 frame
+time is over the budget (in milliseconds).
+
+Author: Ian Davis
+"""
+
+import argparse
+import math
+import os
+import sys
+
+from collections import defaultdict
+from timeit import default_timer
+
+from PyQt4.QtCore import QRegExp
+from PyQt4.QtCore import QSize
+from PyQt4.QtGui import QApplication
+from PyQt4.QtGui import QSortFilterProxyModel
+from PyQt4.QtGui import QTableView
+from PyQt4.QtGui import QTreeView
+
+from pyqt_widgets.models import TableModel, TreeModel
+from pyqt_widgets.models.proxy_models import TreeFilterProxyModel
+
+
+COUNTED_METHODS = ('index', 'data', 'parent', 'rowCount')
+PERCENTILES = (50, 90, 99)
+
+_counting_classes = {}
+
+
+def counting_model(model_class):
+    """ Get a subclass of a model class that counts the calls made to its index, data, parent and rowCount methods in
+        its call_counts dictionary.
+
+    :param model_class: The model class to count the calls of, such as TableModel or TreeModel.
+    :return: The counting subclass.
+    """
+    if model_class in _counting_classes:
+        return _counting_classes[model_class]
+
+    attributes = {}
+
+    for method_name in COUNTED_METHODS:
+        attributes[method_name] = _counted(getattr(model_class, method_name), method_name)
+
+    counting_class = type('Counting' + model_class.__name__, (model_class, ), attributes)
+    _counting_classes[model_class] = counting_class
+
+    return counting_class
+
+
+def _counted(method, method_name):
+    def counted_method(self, *args, **kwargs):
+        counts = self.__dict__.get('call_counts')
+
+        if counts is None:
+            counts = self.call_counts = defaultdict(int)
+
+        counts[method_name] += 1
+        return method(self, *args, **kwargs)
+
+    counted_method.__name__ = method_name
+    counted_method.__doc__ = method.__doc__
+    return counted_method
+
+
+def percentiles(values, points=PERCENTILES):
+    """ Get the nearest-rank percentiles of a collection of values.
+
+    :param values: The values.
+    :param points: The percentiles to get.
+    :return: A dictionary mapping each percentile (and 'max') to its value.
+    """
+    ordered = sorted(values)
+
+    if not ordered:
+        return dict((point, 0) for point in points + ('max', ))
+
+    result = {'max': ordered[-1]}
+
+    for point in points:
+        rank = max(1, int(math.ceil(point / 100.0 * len(ordered))))
+        result[point] = ordered[rank - 1]
+
+    return result
+
+
+class ViewLatencyHarness(object):
+    """ Drive a view over a counting model through scripted steps, recording the time and model calls of each frame.
+    """
+
+    def __init__(self, view, model, size=QSize(1280, 800)):
+        """ ViewLatencyHarness initializer
+
+        :param view: The QTableView or QTreeView to drive, tree models are shown through a TreeFilterProxyModel and
+            table models through a QSortFilterProxyModel.
+        :param model: The model to show, an instance of a class returned by counting_model.
+        :param size: The size to show the view at.
+        """
+        self.view = view
+        self.model = model
+        self.frames = []
+
+        model.call_counts = defaultdict(int)
+
+        if isinstance(model, TreeModel):
+            view.setModel(TreeFilterProxyModel(model, view))
+        else:
+            filter_model = QSortFilterProxyModel(view)
+            filter_model.setSourceModel(model)
+            view.setModel(filter_model)
+
+        view.resize(size)
+        view.show()
+        QApplication.processEvents()
+
+    def frame(self, name, step):
+        """ Run one scripted step and repaint the view right away, recording the frame.
+
+        :param name: The name of the script the step belongs to.
+        :param step: A callable changing the view or model.
+        """
+        counts = self.model.call_counts
+        counts.clear()
+
+        start = default_timer()
+        step()
+        QApplication.processEvents()
+        self.view.viewport().repaint()
+        elapsed = default_timer() - start
+
+        self.frames.append((name, elapsed * 1000.0, dict(counts)))
+
+    def scroll(self, steps=200):
+        """ Scroll from the top to the bottom of the view in equal steps.
+        """
+        scroll_bar = self.view.verticalScrollBar()
+        maximum = scroll_bar.maximum()
+
+        for step in xrange(steps + 1):
+            value = maximum * step // steps
+            self.frame('scroll', lambda: scroll_bar.setValue(value))
+
+    def expand(self, count=100):
+        """ Expand (and then collapse) the first top level rows of a tree view one at a time.
+        """
+        if not isinstance(self.view, QTreeView):
+            return
+
+        view_model = self.view.model()
+        indexes = [view_model.index(row, 0) for row in xrange(min(count, view_model.rowCount()))]
+
+        for index in indexes:
+            self.frame('expand', lambda: self.view.expand(index))
+
+        for index in indexes:
+            self.frame('collapse', lambda: self.view.collapse(index))
+
+    def resize(self, sizes=((1920, 1080), (800, 600), (1280, 800))):
+        """ Resize the view through a number of sizes.
+        """
+        for width, height in sizes:
+            self.frame('resize', lambda: self.view.resize(width, height))
+
+    def filter(self, section, patterns):
+        """ Filter the model by a number of patterns, and finally clear the filter.
+
+            Tree models are filtered with filter_nodes, table models through the view's QSortFilterProxyModel, matching
+            the start of the values as match_pattern does, so that a frame times the filtering and repaint rather than
+            a python loop over the rows.
+        """
+        model = self.model
+
+        if isinstance(model, TreeModel):
+            for pattern in patterns:
+                self.frame('filter', lambda: model.filter_nodes(section, pattern))
+
+            self.frame('filter', model.clear_filter)
+            return
+
+        filter_model = self.view.model()
+        filter_model.setFilterKeyColumn(section)
+
+        for pattern in patterns:
+            regex = QRegExp('^(?:{pattern})'.format(pattern=pattern))
+            self.frame('filter', lambda: filter_model.setFilterRegExp(regex))
+
+        self.frame('filter', lambda: filter_model.setFilterRegExp(QRegExp()))
+
+    def report(self):
+        """ Summarize the recorded frames.
+
+        :return: A dictionary mapping each script name (and 'all') to a dictionary with the number of frames, the
+            percentiles of the frame times in milliseconds, and the percentiles of the calls per frame of each method.
+        """
+        frames_by_name = defaultdict(list)
+
+        for name, elapsed, counts in self.frames:
+            frames_by_name[name].append((elapsed, counts))
+            frames_by_name['all'].append((elapsed, counts))
+
+        report = {}
+
+        for name, frames in frames_by_name.iteritems():
+            report[name] = {'frames': len(frames),
+                            'frame_ms': percentiles([elapsed for elapsed, counts in frames]),
+                            'calls': dict((method_name, percentiles([counts.get(method_name, 0)
+                                                                     for elapsed, counts in frames]))
+                                          for method_name in COUNTED_METHODS),
+                            }
+
+        return report
+
+
+def populate(model, rows):
+    """ Fill a model with generated rows, a two level tree of top level rows with 9 children each for tree models.
+    """
+    def record(index):
+        return {model.header[0]: 'Row{0}'.format(index),
+                model.header[1]: index,
+                model.header[2]: 'Value{0}'.format(index % 97),
+                }
+
+    if isinstance(model, TreeModel):
+        parent_count = max(1, rows // 10)
+        children = [(record(index), [record(parent_count + index * 9 + child) for child in xrange(9)])
+                    for index in xrange(parent_count)]
+        model.add_nodes(None, children)
+        return
+
+    for index in xrange(rows):
+        model.add_row(record(index))
+
+
+def format_report(report):
+    """ Format a report returned by ViewLatencyHarness.report as a table of text.
+    """
+    lines = []
+
+    for name in sorted(report):
+        summary = report[name]
+        frame_ms = summary['frame_ms']
+        lines.append('{name:<10} frames={frames:<6} frame ms: {times}  max={max:.2f}'.format(
+            name=name, frames=summary['frames'], max=frame_ms['max'],
+            times='  '.join('p{0}={1:.2f}'.format(point, frame_ms[point]) for point in PERCENTILES)))
+
+        for method_name in COUNTED_METHODS:
+            calls = summary['calls'][method_name]
+            lines.append('{indent}{method:<9} calls/frame: {calls}'.format(
+                indent=' ' * 11, method=method_name,
+                calls='  '.join('p{0}={1}'.format(point, calls[point]) for point in PERCENTILES) +
+                '  max={0}'.format(calls['max'])))
+
+    return '\n'.join(lines)
+
+
+def has_display():
+    """ Get whether there is a display to create widgets on. Qt 4 aborts when a QApplication is created on X11 without
+        one, instead of raising an error.
+    """
+    if sys.platform.startswith('win') or sys.platform == 'darwin':
+        return True
+
+    return bool(os.environ.get('DISPLAY'))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Measure view frame latency over TableModel and TreeModel.')
+    parser.add_argument('--model', choices=('table', 'tree'), default='tree')
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--steps', type=int, default=200, help='The number of scroll steps.')
+    parser.add_argument('--budget', type=float, default=None,
+                        help='Fail when the p99 frame time (in milliseconds) is over this budget.')
+    arguments = parser.parse_args(argv)
+
+    if not has_display():
+        print >> sys.stderr, 'No X display to create the views on (DISPLAY is not set), run under xvfb-run -a.'
+        return 2
+
+    application = QApplication.instance() or QApplication(sys.argv)
+
+    header = ('Name', 'Size', 'Value', )
+
+    if arguments.model == 'tree':
+        model = counting_model(TreeModel)(header)
+        view = QTreeView()
+    else:
+        model = counting_model(TableModel)(header)
+        view = QTableView()
+
+    populate(model, arguments.rows)
+
+    harness = ViewLatencyHarness(view, model)
+    harness.scroll(arguments.steps)
+    harness.expand()
+    harness.resize()
+    harness.filter(2, ('Value1', 'Value12', 'Value1$'))
+
+    report = harness.report()
+    print format_report(report)
+
+    view.close()
+    application.processEvents()
+
+    if arguments.budget is not None and report['all']['frame_ms'][99] > arguments.budget:
+        print 'p99 frame time {0:.2f} ms is over the budget of {1:.2f} ms'.format(report['all']['frame_ms'][99],
+                                                                               arguments.budget)
+        return 1
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
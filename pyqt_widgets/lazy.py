@@ -0,0 +1,108 @@
+# coding=utf-8
+""" Define a module type that imports the submodules of a package the first time one of their names is used, so that
+importing a package does not import everything in it.
+
+Author: Ian Davis
+"""
+
+import importlib
+
+from types import ModuleType
+
+
+class LazyModule(ModuleType):
+    """ Stand-in for a package module, that imports the submodule defining a name the first time the name is looked up,
+        behaving as if the package had star-imported its submodules in the given order.
+
+        A package replaces itself in sys.modules at the end of its __init__:
+
+            sys.modules[__name__] = LazyModule(sys.modules[__name__], (('basic', ('TableModel', 'TableRow')), ))
+
+        Names that are not listed are looked for in every submodule, later submodules first (as a later star import
+        would have replaced the name), and star imports of the package import every submodule.
+    """
+
+    def __init__(self, module, exports):
+        """ LazyModule initializer
+
+        :param module: The package module being replaced, whose attributes are copied.
+        :param exports: A sequence of (submodule name, names) tuples, listing the public names of each submodule in the
+            order the package used to star-import them.
+        """
+        ModuleType.__init__(self, module.__name__, module.__doc__)
+
+        self.__dict__.update(module.__dict__)
+
+        # Python 2 clears the globals of a module when it is garbage collected, which would break any function defined
+        # in the package's __init__, so the original module has to be kept alive for as long as we are.
+        self._module = module
+        self._submodules = tuple(submodule_name for submodule_name, names in exports)
+        self._exports = {}
+
+        for submodule_name, names in exports:
+            for name in names:
+                self._exports[name] = submodule_name
+
+    @property
+    def exports(self):
+        """ A dictionary mapping each listed public name to the name of the submodule that defines it.
+        """
+        return dict(self._exports)
+
+    def __getattr__(self, name):
+        if name == '__all__':
+            self.__all__ = self._all_names()
+            return self.__all__
+        elif name.startswith('__'):
+            raise AttributeError(name)
+
+        submodule_name = self._exports.get(name)
+
+        if submodule_name is not None:
+            value = getattr(self._load(submodule_name), name)
+        else:
+            for submodule_name in reversed(self._submodules):
+                submodule = self._load(submodule_name)
+
+                if hasattr(submodule, name):
+                    value = getattr(submodule, name)
+                    break
+            else:
+                raise AttributeError("'module' object has no attribute '{name}'".format(name=name))
+
+        # Cache the value, so that we are not asked for it again.
+        setattr(self, name, value)
+        return value
+
+    def __dir__(self):
+        return sorted(set(self.__dict__) | set(self._exports))
+
+    def _load(self, submodule_name):
+        submodule = importlib.import_module('{package}.{submodule}'.format(package=self.__name__,
+                                                                           submodule=submodule_name))
+
+        # Importing a submodule sets the package attribute of its name to the submodule, hiding a listed name that is
+        # the same as the submodule's (such as widgets.image_view, the function), so put the listed name back.
+        owner_name = self._exports.get(submodule_name)
+
+        if owner_name is not None and self.__dict__.get(submodule_name) is submodule:
+            owner = submodule if owner_name == submodule_name else self._load(owner_name)
+            setattr(self, submodule_name, getattr(owner, submodule_name))
+
+        return submodule
+
+    def _all_names(self):
+        """ Import every submodule, getting the names a star import of each of them would have.
+        """
+        names = []
+
+        for submodule_name in self._submodules:
+            submodule = self._load(submodule_name)
+            submodule_names = getattr(submodule, '__all__', None)
+
+            if submodule_names is None:
+                submodule_names = [name for name in vars(submodule) if not name.startswith('_')]
+
+            names.extend(name for name in submodule_names if name not in names)
+
+        return names
@@ -1,2 +1,21 @@
-from table_models import *
-from tree_models import *
+# coding=utf-8
+""" The model packages are imported the first time one of their names is used, see pyqt_widgets.lazy.
+
+Author: Ian Davis
+"""
+
+import os
+import sys
+
+from pyqt_widgets.lazy import LazyModule
+
+
+sys.modules[__name__] = LazyModule(sys.modules[__name__], (
+    ('table_models', ('TableModel', 'TableRow', )),
+    ('tree_models', ('TreeModel', 'TreeItem', 'TreeChildren', 'rollup_value', 'longest_increasing_subsequence', )),
+    ('proxy_models', ('TreeFilterProxyModel', 'TreeFlattenProxyModel', 'FenwickTree', )),
+))
+
+if os.environ.get('PYQT_WIDGETS_INSTRUMENT'):
+    # Instrumentation is switched on by the environment variable when its module is imported.
+    import instrumentation
@@ -4,6 +4,9 @@ from PyQt4.QtCore import QObject
 from PyQt4.QtCore import Qt
 
 
+NUMERIC_TYPES = frozenset(('int', 'float', 'number'))
+
+
 class BasicModel(QAbstractItemModel):
     def __init__(self, header, header_types=None, key_column=None, parent=None):
         QAbstractItemModel.__init__(self, parent)
@@ -33,6 +36,45 @@ class BasicModel(QAbstractItemModel):
 
         return packed_dictionary
 
+    def sort_key(self, column_name, value):
+        """ Get the key to sort a value of a given column by, according to the type of the column in header_types.
+
+            Values of 'int', 'float' and 'number' columns are compared numerically, with empty or non-numeric values
+            sorted after all numbers, and values of any other column are compared as case-insensitive text.
+
+        :param column_name: The column the value belongs to.
+        :param value: The value to get the key for.
+        :return: A tuple that compares in the order the values should be sorted in.
+        """
+        if self.header_types.get(column_name) in NUMERIC_TYPES:
+            try:
+                return 0, float(value)
+            except (TypeError, ValueError):
+                pass
+
+        if value is None:
+            value = ''
+        elif not isinstance(value, basestring):
+            value = unicode(value)
+
+        return 1, value.lower()
+
+    def _changed_sections(self, keys=None):
+        """ Get the smallest range of sections that covers a collection of changed columns.
+
+        :param keys: The columns that changed, or None for all of them.
+        :return: A (first section, last section) tuple, or (None, None) if none of the columns are in our header.
+        """
+        if keys is None:
+            return 0, len(self.header) - 1
+
+        sections = [self.header.index(key) for key in keys if key in self.header]
+
+        if not sections:
+            return None, None
+
+        return min(sections), max(sections)
+
     def columnCount(self, parent=QModelIndex()):
         """ Model-method, called by the view to determine how many columns are to be displayed at a given time.
         :param parent:
@@ -0,0 +1,260 @@
+# coding=utf-8
+""" Define opt-in instrumentation of the hot model methods, counting the calls made to each method of our models (and
+each role, for the methods that take one) and the wall time spent in them.
+
+Instrumentation is switched on with instrumentation.enable(), or by setting the PYQT_WIDGETS_INSTRUMENT environment
+variable before the models are imported (to 1, or to the number of seconds between summaries). While it is off the
+model classes are left untouched, so it costs nothing; enabling it wraps the methods on the classes themselves.
+
+Author: Ian Davis
+"""
+
+import os
+import sys
+
+from collections import defaultdict
+from timeit import default_timer
+
+from PyQt4.QtCore import Qt
+
+from pyqt_widgets.models.basic import BasicModel
+from pyqt_widgets.models.tree_models.basic import TreeItem
+
+# pyqt_widgets.models imports its model packages lazily, import the rest of them so that enable finds every model class.
+import pyqt_widgets.models.table_models
+
+
+ENVIRONMENT_VARIABLE = 'PYQT_WIDGETS_INSTRUMENT'
+
+MODEL_METHODS = ('index', 'parent', 'rowCount', 'columnCount', 'hasChildren', 'data', 'setData', 'headerData',
+                 'flags', 'canFetchMore', 'fetchMore', '_notify_data_changed', )
+ITEM_METHODS = ('row', )
+
+# The position of the role argument of the methods that take one, not counting self.
+ROLE_ARGUMENTS = {'data': 1, 'setData': 2, 'headerData': 2}
+
+ROLE_NAMES = dict((getattr(Qt, name), name) for name in dir(Qt)
+                  if name.endswith('Role') and isinstance(getattr(Qt, name), int))
+
+
+def _subclasses(cls):
+    classes = [cls]
+
+    for subclass in cls.__subclasses__():
+        classes.extend(_subclasses(subclass))
+
+    return classes
+
+
+class ModelInstrumentation(object):
+    """ Count the calls made to the hot methods of BasicModel and its subclasses (and TreeItem.row), and accumulate the
+        wall time spent in each of them, per role for data, setData and headerData.
+
+        Times are inclusive, so the time of TreeModel.index includes the TreeItem.row calls it makes, and the time of
+        _notify_data_changed includes the slots of every view connected to dataChanged.
+
+        Every interval seconds, the next instrumented call hands a summary of the calls since the last summary to each
+        callback, and resets the counts. Without any callbacks the summary is written to stderr.
+    """
+
+    def __init__(self, interval=1.0):
+        """ ModelInstrumentation initializer
+
+        :param interval: The number of seconds between summaries, or None to only summarize when summary is called.
+        """
+        self.interval = interval
+        self.callbacks = []
+
+        self._stats = defaultdict(lambda: [0, 0.0])
+        self._originals = []
+        self._started = None
+        self._next_summary = None
+
+    @property
+    def enabled(self):
+        return bool(self._originals)
+
+    def enable(self, interval=None, callback=None):
+        """ Start instrumenting the model classes.
+
+            Subclasses of BasicModel defined after this is called inherit the instrumented methods, but methods they
+            override are only instrumented by the next call to enable.
+
+        :param interval: Optional number of seconds between summaries, defaults to the current interval.
+        :param callback: Optional callable to add to the callbacks, see add_callback.
+        """
+        if interval is not None:
+            self.interval = interval
+
+        if callback is not None:
+            self.add_callback(callback)
+
+        wrapped = set((cls, method_name) for cls, method_name, method in self._originals)
+
+        for cls in _subclasses(BasicModel):
+            self._wrap_methods(cls, MODEL_METHODS, wrapped)
+
+        self._wrap_methods(TreeItem, ITEM_METHODS, wrapped)
+
+        if self._started is None:
+            self._restart()
+
+    def disable(self):
+        """ Stop instrumenting the model classes, restoring their original methods and discarding the counts.
+        """
+        while self._originals:
+            cls, method_name, method = self._originals.pop()
+            setattr(cls, method_name, method)
+
+        self._stats.clear()
+        self._started = None
+        self._next_summary = None
+
+    def add_callback(self, callback):
+        """ Add a callable to hand each summary to.
+
+        :param callback: A callable taking a list of summary rows (see summary) and the number of seconds they cover.
+        """
+        if callback not in self.callbacks:
+            self.callbacks.append(callback)
+
+    def remove_callback(self, callback):
+        if callback in self.callbacks:
+            self.callbacks.remove(callback)
+
+    def summary(self, reset=True):
+        """ Summarize the calls made since instrumentation was enabled or the last summary was reset.
+
+        :param reset: Whether to reset the counts.
+        :return: A list of dictionaries with the 'method', 'role' (None for methods without a role), 'calls',
+            'total_ms' and 'mean_us' of each method and role that was called, ordered from the most total time down.
+        """
+        rows = []
+
+        for (method_label, role), (calls, seconds) in self._stats.iteritems():
+            rows.append({'method': method_label,
+                         'role': ROLE_NAMES.get(role, role),
+                         'calls': calls,
+                         'total_ms': seconds * 1000.0,
+                         'mean_us': seconds * 1000000.0 / calls,
+                         })
+
+        rows.sort(key=lambda row: row['total_ms'], reverse=True)
+
+        if reset:
+            self._stats.clear()
+            self._restart()
+
+        return rows
+
+    def _restart(self):
+        self._started = default_timer()
+
+        if self.interval is None:
+            self._next_summary = None
+        else:
+            self._next_summary = self._started + self.interval
+
+    def _report(self):
+        """ Hand a summary of the calls since the last one to the callbacks, or to stderr without any callbacks.
+        """
+        elapsed = default_timer() - self._started
+        rows = self.summary()
+
+        if not self.callbacks:
+            sys.stderr.write(format_summary(rows, elapsed) + '\n')
+
+        for callback in list(self.callbacks):
+            callback(rows, elapsed)
+
+    def _wrap_methods(self, cls, method_names, wrapped):
+        for method_name in method_names:
+            method = cls.__dict__.get(method_name)
+
+            if method is None or (cls, method_name) in wrapped:
+                continue
+
+            self._originals.append((cls, method_name, method))
+            setattr(cls, method_name, self._instrumented(method, '{0}.{1}'.format(cls.__name__, method_name),
+                                                         ROLE_ARGUMENTS.get(method_name)))
+
+    def _instrumented(self, method, method_label, role_argument):
+        """ Wrap a method so that each call is counted and timed.
+
+        :param method: The function to wrap.
+        :param method_label: The name to report the method's calls under.
+        :param role_argument: The position of the method's role argument, or None if it does not take one.
+        """
+        stats = self._stats
+
+        def instrumented_method(*args, **kwargs):
+            start = default_timer()
+
+            try:
+                return method(*args, **kwargs)
+            finally:
+                end = default_timer()
+
+                if role_argument is None:
+                    role = None
+                elif len(args) > role_argument + 1:
+                    role = args[role_argument + 1]
+                else:
+                    role = kwargs.get('role')
+
+                method_stats = stats[method_label, role]
+                method_stats[0] += 1
+                method_stats[1] += end - start
+
+                if self._next_summary is not None and end >= self._next_summary:
+                    self._report()
+
+        instrumented_method.__name__ = method.__name__
+        instrumented_method.__doc__ = method.__doc__
+        instrumented_method.__wrapped__ = method
+
+        return instrumented_method
+
+
+def format_summary(rows, elapsed):
+    """ Format a summary returned by ModelInstrumentation.summary as a table of text.
+
+    :param rows: The summary rows.
+    :param elapsed: The number of seconds the summary covers.
+    """
+    lines = ['Model calls over {0:.2f}s:'.format(elapsed)]
+
+    for row in rows:
+        method_label = row['method']
+
+        if row['role'] is not None:
+            method_label = '{0}[{1}]'.format(method_label, row['role'])
+
+        lines.append('    {0:<48} {1:>9} calls {2:>10.2f} ms {3:>9.2f} us/call'.format(
+            method_label, row['calls'], row['total_ms'], row['mean_us']))
+
+    return '\n'.join(lines)
+
+
+def _interval_from_environment(value):
+    """ Get the summary interval set by the PYQT_WIDGETS_INSTRUMENT environment variable.
+
+    :return: The number of seconds between summaries, or None if instrumentation should stay off.
+    """
+    if value in (None, '', '0'):
+        return None
+
+    try:
+        interval = float(value)
+    except ValueError:
+        return 1.0
+
+    return interval if interval > 0 else None
+
+
+instrumentation = ModelInstrumentation()
+
+_environment_interval = _interval_from_environment(os.environ.get(ENVIRONMENT_VARIABLE))
+
+if _environment_interval is not None:
+    instrumentation.enable(_environment_interval)
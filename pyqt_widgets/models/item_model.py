@@ -12,7 +12,8 @@ class ItemModel(QObject):
     """ Generic Model item data container, that stores data via an internal dictionary and emulates the interface of a dictionary.
     """
 
-    changed = pyqtSignal()
+    # Emitted with the list of keys whose values changed.
+    changed = pyqtSignal(object)
 
     def __init__(self, data, parent=None):
         QObject.__init__(self, parent)
@@ -26,6 +27,20 @@ class ItemModel(QObject):
     def get(self, key, default=None):
         return self._data.get(key, default)
 
+    def update(self, mapping):
+        """ Set the values of a number of keys at once, emitting a single changed signal listing the keys whose values
+            actually changed (and none at all if nothing changed).
+
+        :param mapping: A dictionary mapping keys to their new values.
+        :return: The list of keys whose values changed.
+        """
+        changed_keys = self._apply(mapping)
+
+        if changed_keys:
+            self.changed.emit(changed_keys)
+
+        return changed_keys
+
     def iteritems(self):
         return self._data.iteritems()
 
@@ -41,9 +56,24 @@ class ItemModel(QObject):
     def __getitem__(self, key):
         return self._data[key]
 
+    def _apply(self, mapping):
+        """ Set the values of a number of keys without emitting changed.
+
+        :return: The list of keys whose values changed.
+        """
+        data = self._data
+        changed_keys = []
+
+        for key, value in mapping.iteritems():
+            if key not in data or data[key] != value:
+                data[key] = value
+                changed_keys.append(key)
+
+        return changed_keys
+
     def __setitem__(self, key, value):
         self._data[key] = value
-        self.changed.emit()
+        self.changed.emit([key])
 
     def __str__(self):
         return str(self._data)
\ No newline at end of file
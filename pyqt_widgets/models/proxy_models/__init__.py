@@ -0,0 +1,2 @@
+from flatten import *
+from tree_filter import *
@@ -0,0 +1,580 @@
+# coding=utf-8
+""" Define a QAbstractProxyModel that displays a TreeModel as an indented flat list, with the expanded state of each
+node handled by the proxy.
+
+Author: Ian Davis
+"""
+
+from PyQt4.QtCore import QModelIndex
+from PyQt4.QtCore import Qt
+from PyQt4.QtGui import QAbstractProxyModel
+
+
+class FenwickTree(object):
+    """ Fenwick (binary indexed) tree over a list of positive integers, answering prefix sums, point updates and the
+        lookup of the position a running offset falls in, all in O(log n).
+    """
+
+    def __init__(self, values=()):
+        """ FenwickTree initializer, building the tree over the given values in linear time.
+
+        :param values: Iterable of the initial values.
+        """
+        tree = [0]
+        tree.extend(values)
+        size = len(tree) - 1
+
+        for index in xrange(1, size + 1):
+            parent = index + (index & -index)
+
+            if parent <= size:
+                tree[parent] += tree[index]
+
+        self._tree = tree
+        self.total = self.prefix_sum(size)
+
+    def add(self, position, delta):
+        """ Add delta to the value at a given position.
+
+        :param position: The (0-based) position of the value.
+        :param delta: The amount to add.
+        """
+        tree = self._tree
+        size = len(tree) - 1
+        index = position + 1
+
+        while index <= size:
+            tree[index] += delta
+            index += index & -index
+
+        self.total += delta
+
+    def append(self, value):
+        """ Add a new value after the last one.
+
+        :param value: The value to add.
+        """
+        tree = self._tree
+        index = len(tree)
+        covered = value + self.prefix_sum(index - 1) - self.prefix_sum(index - (index & -index))
+
+        tree.append(covered)
+        self.total += value
+
+    def truncate(self, size):
+        """ Drop every value from position size onwards.
+
+        :param size: The number of values to keep.
+        """
+        del self._tree[size + 1:]
+        self.total = self.prefix_sum(size)
+
+    def prefix_sum(self, count):
+        """ Get the sum of the first count values.
+
+        :param count: The number of values to sum.
+        :return: int
+        """
+        tree = self._tree
+        total = 0
+
+        while count > 0:
+            total += tree[count]
+            count -= count & -count
+
+        return total
+
+    def find(self, offset):
+        """ Find the position whose range of the running total contains a given offset, that is, the position such that
+            prefix_sum(position) <= offset < prefix_sum(position + 1).
+
+        :param offset: The offset to look up, between 0 and total - 1.
+        :return: Tuple of the position and the remainder of the offset past prefix_sum(position).
+        """
+        tree = self._tree
+        size = len(tree) - 1
+        position = 0
+        step = 1
+
+        while step * 2 <= size:
+            step *= 2
+
+        while step:
+            index = position + step
+
+            if index <= size and tree[index] <= offset:
+                position = index
+                offset -= tree[index]
+
+            step //= 2
+
+        return position, offset
+
+    def __len__(self):
+        return len(self._tree) - 1
+
+
+class TreeFlattenProxyModel(QAbstractProxyModel):
+    """ TreeFlattenProxyModel presents the visible nodes of a TreeModel as the rows of a flat table, in pre-order, with
+        the first column indented to the depth of each node. Nodes start out collapsed, and are expanded and collapsed
+        through the proxy, which remembers the expanded state of the descendants of a collapsed node like a tree view.
+
+        Every expanded node keeps a FenwickTree over the number of rows each of its children takes up (the child itself,
+        plus the rows of its subtree when it is expanded), so a flat row is mapped to its node, and a node to its flat
+        row, with one O(log n) lookup per level of the tree, without walking the siblings. Expanding or collapsing a node
+        only updates the counts of its ancestors.
+
+        Rows inserted or removed in the source model are forwarded as ranged inserts and removals. Changes to the
+        children of an expanded node at the end of its children cost O(log n), while changes in the middle rebuild the
+        counts of that node's children. Moves and layout changes in the source model reset the proxy.
+    """
+
+    DepthRole = Qt.UserRole + 1
+
+    def __init__(self, source_model=None, parent=None, indent='    '):
+        """ TreeFlattenProxyModel initializer
+
+        :param source_model: The TreeModel to flatten.
+        :param parent: The QT Parent object.
+        :param indent: The string repeated before the text of the first column once for every level of depth.
+        """
+        QAbstractProxyModel.__init__(self, parent)
+
+        self.indent = indent
+        self._counts = {}
+        self._pending_removal = None
+
+        if source_model is not None:
+            self.setSourceModel(source_model)
+
+    def setSourceModel(self, source_model):
+        """ Set the TreeModel to flatten, with every node collapsed.
+
+        :param source_model: The TreeModel to flatten.
+        """
+        self.beginResetModel()
+
+        previous_model = self.sourceModel()
+
+        if previous_model is not None:
+            self._connect_source(previous_model, connect=False)
+
+        QAbstractProxyModel.setSourceModel(self, source_model)
+        self._connect_source(source_model)
+        self._counts = {source_model.root: self._count_children(source_model.root)}
+
+        self.endResetModel()
+
+    def expand(self, index):
+        """ Expand the node at a given proxy index.
+
+        :param index: QModelIndex of this model.
+        """
+        if index.isValid():
+            self.expand_node(index.internalPointer())
+
+    def collapse(self, index):
+        """ Collapse the node at a given proxy index.
+
+        :param index: QModelIndex of this model.
+        """
+        if index.isValid():
+            self.collapse_node(index.internalPointer())
+
+    def toggle(self, index):
+        """ Expand the node at a given proxy index if it is collapsed, or collapse it if it is expanded.
+
+        :param index: QModelIndex of this model.
+        """
+        if not index.isValid():
+            return
+        elif self.is_expanded(index.internalPointer()):
+            self.collapse_node(index.internalPointer())
+        else:
+            self.expand_node(index.internalPointer())
+
+    def is_expanded(self, node):
+        """ Get whether a node is expanded (even if one of its ancestors is collapsed).
+
+        :param node: The TreeItem to check.
+        :return: bool
+        """
+        return node in self._counts
+
+    def expand_node(self, node):
+        """ Expand a node, inserting the rows of its visible descendants after it. Nodes with a child loader are loaded
+            first, every batch of them (see TreeModel.fetch_batch_size), since nothing fetches the rest of the children
+            of a node in a flat list.
+
+        :param node: The TreeItem to expand.
+        """
+        if node in self._counts:
+            return
+
+        source_model = self.sourceModel()
+        source_index = source_model.index_of_node(node)
+
+        while source_model.canFetchMore(source_index):
+            source_model.fetchMore(source_index)
+
+        counts = self._count_children(node)
+        row = self._row_of_node(node)
+
+        if row is not None and counts.total:
+            self.beginInsertRows(QModelIndex(), row + 1, row + counts.total)
+            self._counts[node] = counts
+            self._propagate(node, counts.total)
+            self.endInsertRows()
+        else:
+            self._counts[node] = counts
+            self._propagate(node, counts.total)
+
+    def collapse_node(self, node):
+        """ Collapse a node, removing the rows of its descendants.
+
+        :param node: The TreeItem to collapse.
+        """
+        if node not in self._counts or node is self.sourceModel().root:
+            return
+
+        total = self._counts[node].total
+        row = self._row_of_node(node)
+
+        if row is not None and total:
+            self.beginRemoveRows(QModelIndex(), row + 1, row + total)
+            self._propagate(node, -total)
+            del self._counts[node]
+            self.endRemoveRows()
+        else:
+            self._propagate(node, -total)
+            del self._counts[node]
+
+    def node_at(self, row):
+        """ Get the TreeItem displayed at a given row.
+
+        :param row: The flat row.
+        :return: TreeItem
+        :raise IndexError: If the row is out of range.
+        """
+        node = self.sourceModel().root
+        counts = self._counts
+
+        if not 0 <= row < counts[node].total:
+            raise IndexError('Row {row} is out of range'.format(row=row))
+
+        while True:
+            position, row = counts[node].find(row)
+            node = node.children.at(position)
+
+            if row == 0:
+                return node
+
+            row -= 1
+
+    def mapToSource(self, proxy_index):
+        """ Proxy-method, map an index of this model to the TreeModel.
+
+        :param proxy_index: QModelIndex of this model.
+        :return: QModelIndex of the source model.
+        """
+        if not proxy_index.isValid():
+            return QModelIndex()
+
+        return self.sourceModel().index_of_node(proxy_index.internalPointer(), proxy_index.column())
+
+    def mapFromSource(self, source_index):
+        """ Proxy-method, map an index of the TreeModel to this model.
+
+        :param source_index: QModelIndex of the source model.
+        :return: QModelIndex of this model, which is invalid when the node is hidden under a collapsed ancestor.
+        """
+        if not source_index.isValid():
+            return QModelIndex()
+
+        node = source_index.internalPointer()
+        row = self._row_of_node(node)
+
+        if row is None:
+            return QModelIndex()
+
+        return self.createIndex(row, source_index.column(), node)
+
+    def index(self, row, column, parent=QModelIndex()):
+        """ Model-method, called by the view to get the index of a given row and column.
+
+        :param row: The flat row.
+        :param column: The column.
+        :param parent: Always invalid, as this model is flat.
+        :return: QModelIndex
+        """
+        if parent.isValid() or not self.hasIndex(row, column, parent):
+            return QModelIndex()
+
+        return self.createIndex(row, column, self.node_at(row))
+
+    def parent(self, index=None):
+        """ Model-method, every row of this model is top level.
+        """
+        if index is None:
+            return QAbstractProxyModel.parent(self)
+
+        return QModelIndex()
+
+    def rowCount(self, parent=QModelIndex()):
+        """ Model-method, called by the view to determine how many rows there are.
+
+        :param parent: Always invalid, as this model is flat.
+        """
+        if parent.isValid():
+            return 0
+
+        return self._counts[self.sourceModel().root].total
+
+    def columnCount(self, parent=QModelIndex()):
+        """ Model-method, called by the view to determine how many columns are to be displayed.
+
+        :param parent: Always invalid, as this model is flat.
+        """
+        return self.sourceModel().columnCount()
+
+    def hasChildren(self, parent=QModelIndex()):
+        """ Model-method, only the (invalid) top level index has children.
+        """
+        if parent.isValid():
+            return False
+
+        return self.rowCount() > 0
+
+    def data(self, index, role=Qt.DisplayRole):
+        """ Model-method, called by the view to determine what to display for a given index and role.
+
+            The text of the first column is indented to the depth of the node, and the depth itself is available
+            through DepthRole.
+
+        :param index: QModelIndex to display data for.
+        :param role: The role to display (DisplayRole, DepthRole, etc).
+        :return: The data to display.
+        """
+        if not index.isValid():
+            return
+
+        source_model = self.sourceModel()
+
+        if role == self.DepthRole:
+            return source_model.depth(index.internalPointer())
+
+        data = source_model.data(self.mapToSource(index), role)
+
+        if role == Qt.DisplayRole and index.column() == 0 and self.indent:
+            data = self.indent * source_model.depth(index.internalPointer()) + (data or '')
+
+        return data
+
+    def flags(self, index):
+        return self.sourceModel().flags(self.mapToSource(index))
+
+    def headerData(self, section, orientation, role):
+        return self.sourceModel().headerData(section, orientation, role)
+
+    def _connect_source(self, source_model, connect=True):
+        connections = ((source_model.rowsInserted, self._source_rows_inserted),
+                       (source_model.rowsAboutToBeRemoved, self._source_rows_about_to_be_removed),
+                       (source_model.rowsRemoved, self._source_rows_removed),
+                       (source_model.dataChanged, self._source_data_changed),
+                       (source_model.headerDataChanged, self.headerDataChanged),
+                       (source_model.rowsAboutToBeMoved, self._source_about_to_be_reset),
+                       (source_model.rowsMoved, self._source_reset),
+                       (source_model.layoutAboutToBeChanged, self._source_about_to_be_reset),
+                       (source_model.layoutChanged, self._source_reset),
+                       (source_model.modelAboutToBeReset, self._source_about_to_be_reset),
+                       (source_model.modelReset, self._source_reset),
+                       )
+
+        for signal, slot in connections:
+            if connect:
+                signal.connect(slot)
+            else:
+                signal.disconnect(slot)
+
+    def _count_children(self, node):
+        """ Build the FenwickTree over the number of rows each child of a node takes up.
+
+        :param node: The TreeItem whose children to count.
+        :return: FenwickTree
+        """
+        counts = self._counts
+        return FenwickTree(1 + counts[child].total if child in counts else 1 for child in node.children.itervalues())
+
+    def _propagate(self, node, delta):
+        """ Add delta to the row count of an expanded node within each of its ancestors, up to the first collapsed one.
+
+        :param node: The expanded TreeItem whose number of visible descendants changed.
+        :param delta: The change in the number of visible descendants.
+        """
+        counts = self._counts
+        root = self.sourceModel().root
+
+        while node is not root:
+            parent = node.parent
+            parent_counts = counts.get(parent)
+
+            if parent_counts is None:
+                return
+
+            parent_counts.add(node.row(), delta)
+            node = parent
+
+    def _row_of_node(self, node):
+        """ Get the flat row of a node.
+
+        :param node: The TreeItem to look up.
+        :return: The row, or None when the node is hidden under a collapsed ancestor.
+        """
+        counts = self._counts
+        root = self.sourceModel().root
+        row = 0
+
+        while True:
+            parent = node.parent
+
+            if parent is None or parent not in counts:
+                return None
+
+            row += counts[parent].prefix_sum(node.row())
+
+            if parent is root:
+                return row
+
+            row += 1
+            node = parent
+
+    def _row_of_child(self, parent, position):
+        """ Get the flat row a child at a given position of an expanded node would be displayed at.
+
+        :param parent: The expanded TreeItem.
+        :param position: The position among the children of parent.
+        :return: The row, or None when parent is hidden under a collapsed ancestor.
+        """
+        offset = self._counts[parent].prefix_sum(position)
+
+        if parent is self.sourceModel().root:
+            return offset
+
+        parent_row = self._row_of_node(parent)
+
+        if parent_row is None:
+            return None
+
+        return parent_row + 1 + offset
+
+    def _forget_expanded(self, nodes):
+        """ Drop the expanded state of the given nodes and all of their descendants, which are leaving the tree.
+
+        :param nodes: Iterable of TreeItems.
+        """
+        counts = self._counts
+        pending = list(nodes)
+
+        while pending:
+            node = pending.pop()
+            counts.pop(node, None)
+            pending.extend(node.children.itervalues())
+
+    def _source_rows_inserted(self, source_parent, first, last):
+        parent = self.sourceModel()._node_from_index(source_parent)
+        parent_counts = self._counts.get(parent)
+
+        if parent_counts is None:
+            return
+
+        inserted = last - first + 1
+        row = self._row_of_child(parent, first)
+
+        if row is not None:
+            self.beginInsertRows(QModelIndex(), row, row + inserted - 1)
+
+        if first == len(parent_counts):
+            for _ in xrange(inserted):
+                parent_counts.append(1)
+        else:
+            self._counts[parent] = self._count_children(parent)
+
+        self._propagate(parent, inserted)
+
+        if row is not None:
+            self.endInsertRows()
+
+    def _source_rows_about_to_be_removed(self, source_parent, first, last):
+        parent = self.sourceModel()._node_from_index(source_parent)
+        parent_counts = self._counts.get(parent)
+        removed_nodes = [parent.children.at(position) for position in xrange(first, last + 1)]
+
+        self._forget_expanded(removed_nodes)
+
+        if parent_counts is None:
+            return
+
+        removed = parent_counts.prefix_sum(last + 1) - parent_counts.prefix_sum(first)
+        row = self._row_of_child(parent, first)
+
+        if row is not None:
+            self.beginRemoveRows(QModelIndex(), row, row + removed - 1)
+
+        self._pending_removal = (parent, first, last, removed, row is not None)
+
+    def _source_rows_removed(self, source_parent, first, last):
+        if self._pending_removal is None:
+            return
+
+        parent, first, last, removed, notified = self._pending_removal
+        self._pending_removal = None
+        parent_counts = self._counts[parent]
+
+        if last == len(parent_counts) - 1:
+            parent_counts.truncate(first)
+        else:
+            self._counts[parent] = self._count_children(parent)
+
+        self._propagate(parent, -removed)
+
+        if notified:
+            self.endRemoveRows()
+
+    def _source_data_changed(self, top_left, bottom_right):
+        top_row = self._row_of_node(top_left.internalPointer())
+        bottom_row = self._row_of_node(bottom_right.internalPointer())
+
+        if top_row is None or bottom_row is None:
+            return
+
+        self.dataChanged.emit(self.createIndex(top_row, top_left.column(), top_left.internalPointer()),
+                              self.createIndex(bottom_row, bottom_right.column(), bottom_right.internalPointer()))
+
+    def _source_about_to_be_reset(self, *args):
+        self.beginResetModel()
+
+    def _source_reset(self, *args):
+        """ Rebuild the counts of every expanded node still in the tree, from the deepest up, after a change to the
+            source model that was not a plain insert or removal.
+        """
+        source_model = self.sourceModel()
+        root = source_model.root
+        expanded_nodes = []
+
+        for node in self._counts:
+            ancestor = node
+
+            while ancestor is not None and ancestor is not root:
+                ancestor = ancestor.parent
+
+            if ancestor is root and node is not root:
+                expanded_nodes.append(node)
+
+        expanded_nodes.sort(key=source_model.depth, reverse=True)
+        self._counts = {}
+
+        for node in expanded_nodes:
+            self._counts[node] = self._count_children(node)
+
+        self._counts[root] = self._count_children(root)
+        self.endResetModel()
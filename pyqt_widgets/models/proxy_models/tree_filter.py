@@ -0,0 +1,61 @@
+# coding=utf-8
+""" Define a QSortFilterProxyModel that displays a TreeModel filtered by TreeModel.filter_nodes.
+
+Author: Ian Davis
+"""
+
+from PyQt4.QtGui import QSortFilterProxyModel
+
+
+class TreeFilterProxyModel(QSortFilterProxyModel):
+    """ TreeFilterProxyModel hides the nodes of a TreeModel that do not pass the filter set by TreeModel.filter_nodes.
+        Unlike filtering through QSortFilterProxyModel's own filterRegExp, which hides a parent along with all of its
+        matching descendants, the ancestors of matching nodes stay visible.
+
+        Whether a node passes is answered by the TreeModel from its cached filter state, so refiltering after the
+        filter changes costs a single set lookup per row, and only for the rows of levels the view has mapped.
+    """
+
+    def __init__(self, source_model=None, parent=None):
+        """ TreeFilterProxyModel initializer
+
+        :param source_model: The TreeModel to filter.
+        :param parent: The QT Parent object.
+        """
+        QSortFilterProxyModel.__init__(self, parent)
+
+        self.setDynamicSortFilter(True)
+
+        if source_model is not None:
+            self.setSourceModel(source_model)
+
+    def setSourceModel(self, source_model):
+        """ Set the TreeModel to filter, refiltering whenever its filter changes.
+
+        :param source_model: The TreeModel to filter.
+        """
+        previous_model = self.sourceModel()
+
+        if previous_model is not None:
+            previous_model.filter_changed.disconnect(self._refilter)
+
+        QSortFilterProxyModel.setSourceModel(self, source_model)
+        source_model.filter_changed.connect(self._refilter)
+
+    def filterAcceptsRow(self, source_row, source_parent):
+        """ Proxy-method, called to determine whether a given row of the source model should be displayed.
+
+        :param source_row: The row in the source model.
+        :param source_parent: The parent index of the row in the source model.
+        :return: True if the node at the given row passes the source model's filter.
+        """
+        source_model = self.sourceModel()
+        node = source_model.index(source_row, 0, source_parent).internalPointer()
+
+        if node is None:
+            return False
+
+        return source_model.accepts_node(node)
+
+    def _refilter(self):
+        self.invalidateFilter()
@@ -46,12 +46,19 @@ class TableModel(BasicModel):
     def add_row(self, data):
         """ Add a new row to the table, displaying the data mapped from a dictionary to our table header.
 
+            A row whose key is already in the table replaces the existing row in place instead of being appended.
+
         :param data: A dictionary mapping to our table header and the values for each column.
         :return: TableRow instance that was added to the model.
         """
+        key_value = data[self.key_column]
+        existing_row = self.table_data.get(key_value)
+
+        if existing_row is not None:
+            return self._replace_row(key_value, existing_row, data)
+
         row = self.rowCount()
         table_row = TableRow(self.pack_dictionary(data), row)
-        key_value = data[self.key_column]
 
         self.beginInsertRows(QModelIndex(), row, row)
         self.table_data[key_value] = table_row
@@ -60,6 +67,99 @@ class TableModel(BasicModel):
 
         return table_row
 
+    def add_rows(self, data_list):
+        """ Add a number of new rows to the table at once, notifying views with a single ranged insert.
+
+            Rows whose key is already in the table replace the existing row in place instead of being appended.
+
+        :param data_list: A collection of dictionaries mapping to our table header and the values for each column.
+        :return: The list of TableRow instances that were added, in the order of data_list.
+        """
+        first_row = self.rowCount()
+        new_rows = OrderedDictionary()
+        table_rows = []
+
+        for data in data_list:
+            key_value = data[self.key_column]
+            existing_row = self.table_data.get(key_value)
+
+            if existing_row is not None:
+                table_row = self._replace_row(key_value, existing_row, data)
+            else:
+                row = new_rows[key_value].row if key_value in new_rows else first_row + len(new_rows)
+                table_row = new_rows[key_value] = TableRow(self.pack_dictionary(data), row)
+
+            table_rows.append(table_row)
+
+        if new_rows:
+            self.beginInsertRows(QModelIndex(), first_row, first_row + len(new_rows) - 1)
+
+            for key_value, table_row in new_rows.iteritems():
+                self.table_data[key_value] = table_row
+                self._connect_node(table_row)
+
+            self.endInsertRows()
+
+        return table_rows
+
+    def _replace_row(self, key_value, existing_row, data):
+        """ Replace an existing row of the table with a new TableRow at the same row, notifying views that its data
+            changed.
+
+        :param key_value: The key value of the row.
+        :param existing_row: The TableRow being replaced.
+        :param data: A dictionary mapping to our table header and the values for each column.
+        :return: The new TableRow instance.
+        """
+        table_row = TableRow(self.pack_dictionary(data), existing_row.row)
+
+        self._disconnect_node(existing_row)
+        self.table_data[key_value] = table_row
+        self._connect_node(table_row)
+        self._notify_data_changed(table_row)
+
+        return table_row
+
+    def remove_keys(self, key_values):
+        """ Remove the rows with the given key values from the table.
+
+            The rows are grouped into contiguous ranges, each of which is removed with a single
+            beginRemoveRows/endRemoveRows, so views only update the rows that went away.
+
+        :param key_values: The key values of the rows to remove, keys that are not in the table are ignored.
+        :return: The list of TableRow instances that were removed.
+        """
+        key_values = set(key_values)
+        rows = [row for row, key_value in enumerate(self.table_data) if key_value in key_values]
+
+        if not rows:
+            return []
+
+        ranges = []
+
+        for row in rows:
+            if ranges and ranges[-1][1] == row - 1:
+                ranges[-1][1] = row
+            else:
+                ranges.append([row, row])
+
+        keys = self.table_data.keys()
+        removed_rows = [self.table_data[keys[row]] for row in rows]
+
+        # Remove the last range first, so the rows of the ranges before it stay valid.
+        for first, last in reversed(ranges):
+            self.beginRemoveRows(QModelIndex(), first, last)
+
+            for key_value in keys[first:last + 1]:
+                self._disconnect_node(self.table_data.pop(key_value))
+
+            self.endRemoveRows()
+
+        for row, table_row in enumerate(self.table_data.itervalues()):
+            table_row.row = row
+
+        return removed_rows
+
     # noinspection PyUnresolvedReferences,PyUnresolvedReferences
     def remove_table_rows(self, table_rows):
         """ Given a collection of TableRow instances, remove their pointers from our model and emit layoutChanged to update any views.
@@ -71,6 +171,7 @@ class TableModel(BasicModel):
         for table_row in table_rows:
             key_value = table_row[self.key_column]
             del self.table_data[key_value]
+            self._disconnect_node(table_row)
 
         self.layoutChanged.emit()
 
@@ -144,7 +245,7 @@ class TableModel(BasicModel):
         new_data = self.table_data.copy()
 
         for key in new_data.keys()[row:row + count]:
-            del self.table_data[key]
+            self._disconnect_node(self.table_data.pop(key))
 
         self.endRemoveRows()
 
@@ -156,18 +257,46 @@ class TableModel(BasicModel):
         NOTE: This method is automatically called for all TableRow objects added to our model (properly), to support
             updating the model and any views automatically when the data of the TableRow is changed programatically.
 
+        NOTE: All rows share the bound _node_changed slot instead of a lambda closing over each row, which looks the
+            row up through sender(), so the connection does not keep the row alive, and can be undone on removal.
+
         :param node: TableRow instance to connect.
         """
-        node.changed.connect(lambda: self._notify_data_changed(node))
+        node.changed.connect(self._node_changed)
+
+    def _disconnect_node(self, node):
+        """ Disconnect a TableRow that is being removed from the model, so that neither keeps the other alive.
+
+        :param node: TableRow instance to disconnect.
+        """
+        try:
+            node.changed.disconnect(self._node_changed)
+        except TypeError:
+            # The row was never connected (or already disconnected).
+            pass
+
+    def _node_changed(self, keys):
+        """ Slot connected to the changed signal of every TableRow in the model.
+
+        :param keys: The columns whose values changed.
+        """
+        self._notify_data_changed(self.sender(), keys)
 
     # noinspection PyUnresolvedReferences
-    def _notify_data_changed(self, node):
+    def _notify_data_changed(self, node, keys=None):
         """ The data for a given TableRow has been changed, so emit the dataChanged signal to update views.
 
         :param node: The TableRow that was changed.
+        :param keys: Optional columns that changed, to limit the notification to the range of cells between them,
+            otherwise the whole row is notified.
         """
+        first_section, last_section = self._changed_sections(keys)
+
+        if first_section is None:
+            return
+
         row = node.row
-        top_left = self.createIndex(row, 0, node)
-        bottom_right = self.createIndex(row, len(self.header), node)
+        top_left = self.createIndex(row, first_section, node)
+        bottom_right = self.createIndex(row, last_section, node)
         self.dataChanged.emit(top_left, bottom_right)
 
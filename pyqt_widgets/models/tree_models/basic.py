@@ -1,18 +1,271 @@
+import re
+import sre_constants
+
+from bisect import bisect_left
+from collections import deque
 from collections import OrderedDict as OrderedDictionary
+from itertools import islice
 
 from PyQt4.QtCore import QAbstractItemModel
 from PyQt4.QtCore import QModelIndex
+from PyQt4.QtCore import QTimer
 from PyQt4.QtCore import Qt
+from PyQt4.QtCore import pyqtSignal
+
+from pyqt_widgets import widgets
 
 from pyqt_widgets.models.basic import BasicModel
 from pyqt_widgets.models.item_model import ItemModel
+from pyqt_widgets.models.tree_models import json_stream
+
+
+def rollup_value(value):
+    """ Convert a value of a roll-up column to a number, treating empty values as 0.
+
+    :param value: The value to convert (a number, or a string holding one).
+    :return: int or float
+    :raise ValueError: If the value is not numeric.
+    """
+    if not value:
+        return 0
+    elif isinstance(value, (int, long, float)):
+        return value
+
+    try:
+        return int(value)
+    except ValueError:
+        return float(value)
+
+
+def longest_increasing_subsequence(values):
+    """ Find the longest strictly increasing subsequence of a sequence, in O(n log n).
+
+    :param values: A sequence of comparable values.
+    :return: The list of indexes into values of the subsequence, in order.
+    """
+    tails = []
+    tail_indexes = []
+    previous_indexes = []
+
+    for index, value in enumerate(values):
+        position = bisect_left(tails, value)
+
+        if position == len(tails):
+            tails.append(value)
+            tail_indexes.append(index)
+        else:
+            tails[position] = value
+            tail_indexes[position] = index
+
+        previous_indexes.append(tail_indexes[position - 1] if position else None)
+
+    indexes = []
+    index = tail_indexes[-1] if tail_indexes else None
+
+    while index is not None:
+        indexes.append(index)
+        index = previous_indexes[index]
+
+    indexes.reverse()
+    return indexes
+
+
+class TreeChildren(object):
+    """ Ordered mapping of key values to child TreeItems, emulating the OrderedDict interface TreeItem.children used to
+        expose, that also caches the row of every child so that positional lookups do not have to scan the siblings.
+
+        Rows are cached in a dictionary keyed by TreeItem, with every row below _valid_rows known to be correct.
+        Appending keeps the cache valid, while inserting or deleting in the middle only marks the rows after the
+        change as stale, to be recalculated the next time one of them is looked up.
+    """
+
+    def __init__(self):
+        self._keys = []
+        self._nodes = {}
+        self._rows = {}
+        self._valid_rows = 0
+
+    def at(self, row):
+        """ Get the child TreeItem at a given row.
+
+        :param row: The row of the child.
+        :return: TreeItem
+        """
+        return self._nodes[self._keys[row]]
+
+    def row_of(self, node):
+        """ Get the row of a given child TreeItem.
+
+        :param node: The child TreeItem to look up.
+        :return: int
+        :raise KeyError: If the node is not a child of ours.
+        """
+        row = self._rows.get(node)
+
+        if row is None or row >= self._valid_rows:
+            self._reindex()
+            row = self._rows[node]
+
+        return row
+
+    def insert(self, row, key, node):
+        """ Insert a new child TreeItem at the given row, shifting the following children down.
+
+        :param row: The row to insert the child at.
+        :param key: The key value of the child.
+        :param node: The child TreeItem.
+        """
+        if key in self._nodes:
+            raise KeyError('A child with key {key} already exists'.format(key=key))
+
+        self._keys.insert(row, key)
+        self._nodes[key] = node
+        self._valid_rows = min(self._valid_rows, row)
+
+    def remove_range(self, first, last):
+        """ Remove the children from row first to row last (inclusive).
+
+        :param first: The first row to remove.
+        :param last: The last row to remove.
+        :return: The list of TreeItems that were removed.
+        """
+        nodes = self._nodes
+        rows = self._rows
+        removed_keys = self._keys[first:last + 1]
+        removed_nodes = [nodes.pop(key) for key in removed_keys]
+
+        del self._keys[first:last + 1]
+
+        for node in removed_nodes:
+            rows.pop(node, None)
+
+        self._valid_rows = min(self._valid_rows, first)
+        return removed_nodes
+
+    def rekey(self, node, key):
+        """ Change the key value a child is stored under, keeping its row.
+
+        :param node: The child TreeItem whose key value changed.
+        :param key: The new key value of the child.
+        :return: The previous key value of the child.
+        """
+        row = self.row_of(node)
+        previous_key = self._keys[row]
+
+        del self._nodes[previous_key]
+        self._keys[row] = key
+        self._nodes[key] = node
+
+        return previous_key
+
+    def move(self, row, position):
+        """ Move the child at a given row to another row, shifting the children in between.
+
+        :param row: The current row of the child.
+        :param position: The row the child should end up at.
+        """
+        self._keys.insert(position, self._keys.pop(row))
+        self._valid_rows = min(self._valid_rows, row, position)
+
+    def reorder(self, keys):
+        """ Put the children in a new order.
+
+        :param keys: The key values of all of the children, in their new order.
+        """
+        self._keys = list(keys)
+        self._valid_rows = 0
+
+    def get(self, key, default=None):
+        return self._nodes.get(key, default)
+
+    def keys(self):
+        return list(self._keys)
+
+    def values(self):
+        nodes = self._nodes
+        return [nodes[key] for key in self._keys]
+
+    def items(self):
+        nodes = self._nodes
+        return [(key, nodes[key]) for key in self._keys]
+
+    def iterkeys(self):
+        return iter(self._keys)
+
+    def itervalues(self):
+        nodes = self._nodes
+        return (nodes[key] for key in self._keys)
+
+    def iteritems(self):
+        nodes = self._nodes
+        return ((key, nodes[key]) for key in self._keys)
+
+    def _reindex(self):
+        keys = self._keys
+        nodes = self._nodes
+        rows = self._rows
+
+        for row in xrange(self._valid_rows, len(keys)):
+            rows[nodes[keys[row]]] = row
+
+        self._valid_rows = len(keys)
+
+    def __contains__(self, key):
+        return key in self._nodes
+
+    def __getitem__(self, key):
+        return self._nodes[key]
+
+    def __setitem__(self, key, node):
+        """ Set the child for a given key, replacing an existing child in place or appending a new one.
+        """
+        if key in self._nodes:
+            previous_node = self._nodes[key]
+            row = self.row_of(previous_node)
+
+            del self._rows[previous_node]
+            self._nodes[key] = node
+            self._rows[node] = row
+            return
+
+        self._keys.append(key)
+        self._nodes[key] = node
+
+        if self._valid_rows == len(self._keys) - 1:
+            self._rows[node] = self._valid_rows
+            self._valid_rows += 1
+
+    def __delitem__(self, key):
+        node = self._nodes[key]
+        row = self.row_of(node)
+
+        del self._keys[row]
+        del self._nodes[key]
+        del self._rows[node]
+
+        self._valid_rows = min(self._valid_rows, row)
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __len__(self):
+        return len(self._keys)
 
 
 class TreeItem(ItemModel):
+    rolled_up = pyqtSignal(object)
+
+    rollup_columns = frozenset()
+
     def __init__(self, data, parent=None):
         ItemModel.__init__(self, data, parent)
 
-        self.children = OrderedDictionary()
+        self.children = TreeChildren()
+
+        self.child_loader = None
+        self.loaded_by = None
+        self._pending_children = None
+        self._sort_key = None
 
     def remove_child(self, key_value):
         if key_value not in self.children:
@@ -20,6 +273,21 @@ class TreeItem(ItemModel):
 
         del self.children[key_value]
 
+    def roll_up(self, key, delta):
+        """ Add delta to the value of a roll-up column in all of our ancestors, and emit rolled_up.
+
+        :param key: The roll-up column that changed.
+        :param delta: The amount our total for that column changed by.
+        """
+        ancestor = self.parent
+
+        while ancestor is not None:
+            ancestor._data[key] = rollup_value(ancestor._data.get(key)) + delta
+            ancestor._sort_key = None
+            ancestor = ancestor.parent
+
+        self.rolled_up.emit(key)
+
     def row(self):
         """ This method is necessary because of the parent-child node structure of the model, where there is no simple
             way to find the overall relationship of all the items in the database, rather just one items' relationship
@@ -29,7 +297,35 @@ class TreeItem(ItemModel):
         if not self.parent:
             return 0
 
-        return self.parent.children.values().index(self)
+        return self.parent.children.row_of(self)
+
+    def __setitem__(self, key, value):
+        """ Set the value for a column, propagating the change to our ancestors if it is a roll-up column.
+        """
+        if key not in self.rollup_columns:
+            ItemModel.__setitem__(self, key, value)
+            return
+
+        delta = rollup_value(value) - rollup_value(self._data.get(key))
+        ItemModel.__setitem__(self, key, value)
+
+        if delta:
+            self.roll_up(key, delta)
+
+    def update(self, mapping):
+        """ Set the values of a number of columns at once with a single changed signal, propagating the changes of
+            roll-up columns to our ancestors, see ItemModel.update.
+        """
+        previous_totals = dict((key, rollup_value(self._data.get(key))) for key in mapping if key in self.rollup_columns)
+        changed_keys = ItemModel.update(self, mapping)
+
+        for key, previous_total in previous_totals.iteritems():
+            delta = rollup_value(self._data.get(key)) - previous_total
+
+            if delta:
+                self.roll_up(key, delta)
+
+        return changed_keys
 
     def __iter__(self):
         return self.children.itervalues()
@@ -40,133 +336,1628 @@ class TreeModel(BasicModel):
         python dictionaries mapping a column in the table header supplied to a value for said column. The goal here
         is to simplify indexing by being able to manage the data in a table based on string keys instead of arbitrary
         indexes, eliminating the need to cross-reference a header to find where to put a value.
+
+    NOTE: Key values only have to be unique among siblings. Nodes are also indexed by key value across the whole tree
+        (see find_node and path_to), which only works for key values that are unique across the whole tree: a key value
+        shared by nodes under different parents is ambiguous, and can only be looked up under a given parent.
     """
 
-    def __init__(self, header, header_types=None, key_column=None, parent=None):
+    filter_changed = pyqtSignal()
+
+    def __init__(self, header, header_types=None, key_column=None, parent=None, rollup_columns=None):
         """ TreeModel constructor
         :param header: The header to use
         :type header: Iterable
         :param parent: A QWidget that QT will give ownership of this Widget too.
+        :param rollup_columns: Optional collection of numeric columns whose value for every node is kept at the node's
+            own value plus the totals of its children, such as sizes or counts. Changes are propagated up the ancestor
+            chain as deltas, and the resulting repaints of the ancestors are coalesced (see flush_rollups).
         """
         BasicModel.__init__(self, header, header_types, key_column, parent)
 
-        self.root = TreeItem(self.pack_dictionary({}))
+        self.rollup_columns = frozenset(rollup_columns or ())
+        self._rollup_sections = sorted(self.header.index(column) for column in self.rollup_columns)
+        self._rollup_pending = OrderedDictionary()
+        self._rollup_timer = QTimer(self)
+        self._rollup_timer.setSingleShot(True)
+        self._rollup_timer.setInterval(0)
+        self._rollup_timer.timeout.connect(self.flush_rollups)
+
+        self.sort_section = None
+        self.sort_order = Qt.AscendingOrder
+        self.sort_recursive = True
+
+        self.root = self._create_item({})
+        self.nodes_by_key = {}
+        self._duplicate_keys = {}
+
+        self.fetch_batch_size = None
+        self._loaded_nodes = set()
+
+        self.filter_column = None
+        self.filter_pattern = None
+        self._filter_regex = None
+        self._filter_matches = set()
+        self._filter_counts = {}
+        self._filter_cache = OrderedDictionary()
 
     def add_node(self, values, children=None, parent=None):
         """ Add a new root TreeItem to our model, using the values passed as the data.
             Optional args: children, parent
         :param values: A dictionary mapping the model's header to the values to use for this TreeItem.
         :param children: A collection of dictionaries mapping the model's header to the values to use for each child
-            TreeItem.
+            TreeItem, or (values, children) tuples to give the child children of its own.
+            Alternatively, a callable that takes the new TreeItem and returns such a collection, which will not be
+            called until a view first expands the node (see fetchMore).
         :param parent: The parent to give ownership of this TreeItem too, if not given, defaults to the root TreeItem
         :return: The TreeItem instance that was added.
+
+        NOTE: The TreeItem is built along with its whole subtree before it is added, so views only receive a single
+            insert notification for it under parent. Adding a TreeItem with the same key as an existing child of
+            parent replaces that child at the same row, which views see as that row being removed and inserted again.
         """
         if not parent:
             parent = self.root
 
-        key = values[self.key_column]
-        node = TreeItem(self.pack_dictionary(values), parent)
+        node = self._build_node(values, children, parent)
+        self._insert_nodes(parent, [node])
 
-        if children:
-            for values_ in children:
-                self.add_node(values_, parent=node)
+        return node
 
-        parent.children[key] = node
+    def add_nodes(self, parent, values_list):
+        """ Add a number of new TreeItems under the same parent, notifying views with a single ranged insert.
 
-        self._connect_node(node)
-        return node
+        :param parent: The parent to add the TreeItems under, if None, defaults to the root TreeItem.
+        :param values_list: A collection of dictionaries mapping the model's header to the values to use for each
+            TreeItem, or (values, children) tuples to give the TreeItems children of their own.
+        :return: The list of TreeItems that were added.
+        """
+        if not parent:
+            parent = self.root
+
+        nodes = []
+
+        for child in values_list:
+            values, children = self._split_child(child)
+            nodes.append(self._build_node(values, children, parent))
+
+        if nodes:
+            self._insert_nodes(parent, nodes)
+
+        return nodes
 
     def remove_node(self, node):
         """ Remove the given node from the tree view
         :param node: TreeItem to remove
         :return: bool
         """
-        self.layoutAboutToBeChanged.emit()
+        self.remove_nodes([node])
 
-        parent = node.parent
-        parent.remove_child(node[self.key_column])
+    def remove_nodes(self, nodes):
+        """ Remove the given nodes, along with their subtrees, from the tree.
 
-        self.layoutChanged.emit()
+            The nodes are grouped by parent, and the rows of each parent's nodes into contiguous ranges, each of which is
+            removed with a single beginRemoveRows/endRemoveRows, so views only update the affected branches.
+            The removed subtrees are then disconnected from the model and released without recursing, so their memory
+            is returned right away however deep they are.
 
-    def find_node(self, key_value, parent=None):
+        NOTE: Nodes whose ancestor is also being removed are removed along with that ancestor.
+
+        :param nodes: Iterable of TreeItems to remove.
+        :raise KeyError: If any of the nodes is not part of the tree, in which case nothing is removed.
+        """
+        key_column = self.key_column
+        removing = set(nodes)
+        rows_by_parent = {}
+
+        for node in removing:
+            parent = node.parent
+
+            if parent is None or parent.children.get(node[key_column]) is not node:
+                raise KeyError('No such child exists')
+
+        for node in removing:
+            ancestor = node.parent
+
+            while ancestor is not None and ancestor not in removing:
+                ancestor = ancestor.parent
+
+            if ancestor is None:
+                rows_by_parent.setdefault(node.parent, []).append(node.row())
+
+        for parent, rows in rows_by_parent.iteritems():
+            parent_index = self.index_of_node(parent)
+            rows.sort(reverse=True)
+
+            for first, last in self._row_ranges(rows):
+                self.beginRemoveRows(parent_index, first, last)
+                removed_nodes = parent.children.remove_range(first, last)
+                self.endRemoveRows()
+
+                for removed_node in removed_nodes:
+                    self._release_nodes(removed_node)
+
+    def load_json(self, source, children_key='children', max_depth=None, parent=None):
+        """ Add the nodes of a nested JSON document to the tree, parsing the document incrementally.
+
+            The document is either a single node or an array of nodes, where each node is an object mapping the model's
+            header to its values, holding its child nodes in an array under children_key. The document is read a chunk
+            at a time and TreeItems are built directly from the parser's events, with an explicit stack, so neither
+            the document nor an intermediate copy of it is ever held in memory, and deep documents do not recurse.
+
+            With max_depth, only that many levels of nodes are built, and the children of the nodes at the last level
+            are left to lazy loading: each such node gets a child loader that seeks to the offset of its children in
+            the document, and reads that one level when a view expands it (see fetchMore).
+
+        :param source: The path of the JSON document, or a seekable binary file object holding it, which has to stay
+            open for lazy loading.
+        :param children_key: The key holding the array of child nodes in each node.
+        :param max_depth: Optional number of levels to build right away.
+        :param parent: The TreeItem to add the nodes under, if not given, defaults to the root TreeItem.
+        :return: The list of top level TreeItems that were added.
+        """
         if not parent:
             parent = self.root
 
-        for child in parent:
-            if child[self.key_column] == key_value:
-                return child
+        if isinstance(source, basestring):
+            with open(source, 'rb') as stream:
+                nodes = self._read_json_nodes(json_stream.JSONEventReader(stream), source, children_key, max_depth,
+                                              parent)
+        else:
+            nodes = self._read_json_nodes(json_stream.JSONEventReader(source), source, children_key, max_depth, parent)
 
-        raise KeyError('No node matching {key_value} exists'.format(key_value))
+        if nodes:
+            self._insert_nodes(parent, nodes)
 
-    def _connect_node(self, node):
-        """ Helper function used to connect the data changed signals of our TreeItem to the notify_data_changed method.
+        return nodes
 
-        NOTE: This method is automatically called for all TableRow objects added to our model (properly), to support
-            updating the model and any views automatically when the data of the TableRow is changed programatically.
+    def sync(self, nested_records, children_key='children', parent=None):
+        """ Update the tree to match a snapshot of nested records, applying only the differences.
 
-        :param node: TableRow instance to connect.
+            Nodes are matched by key_column within each parent. Within each parent, missing nodes are removed in
+            contiguous ranges, surviving nodes are reordered with the fewest moves (every node outside the longest run
+            already in order is moved, see longest_increasing_subsequence), new nodes are inserted in contiguous runs,
+            and nodes whose values changed are updated with a single change notification each. Views only receive
+            ranged notifications for the differences, so their expanded state, selection and scroll position survive.
+
+            The snapshot is walked level by level with an explicit stack. Apart from reading the snapshot itself, the
+            work done, and the number of notifications, grows with the size of the differences.
+
+        NOTE: A record without children_key (or with None) leaves the children of its node as they are, so unloaded
+            levels of lazily loaded trees can be left out of the snapshot, while an empty list removes them.
+            When the tree is sorted (see sort), the sort order is kept instead of the order of the snapshot.
+
+        :param nested_records: The desired children of parent: dictionaries mapping the model's header to the values
+            of each node, holding the records of its children in a list under children_key.
+        :param children_key: The key holding the records of a node's children.
+        :param parent: The TreeItem to sync the children of, if not given, defaults to the root TreeItem.
         """
-        node.changed.connect(lambda: self._notify_data_changed(node))
+        if not parent:
+            parent = self.root
 
-    # noinspection PyUnresolvedReferences
-    def _notify_data_changed(self, node):
-        """ The data for a given TreeItem has been changed, so emit the dataChanged signal to update views.
+        pending = [(parent, nested_records)]
 
-        :param node: The TreeItem that was changed.
+        while pending:
+            node, records = pending.pop()
+            pending.extend(self._sync_children(node, records, children_key))
+
+    def move_node(self, node, new_parent=None, position=None):
+        """ Move a node, along with its subtree, to a new position in the tree.
+
+            The existing TreeItem is relinked rather than rebuilt, so its subtree keeps its connections and the cost of
+            a move does not depend on the size of the subtree. Views are notified with beginMoveRows/endMoveRows.
+
+        :param node: The TreeItem to move.
+        :param new_parent: The TreeItem to move node under, or None to move it to the top level.
+        :param position: The row node should end up at among the children of new_parent, or None to append it. While
+            the children of new_parent are sorted (see sort), position is ignored and node is put at its sorted row.
+        :raise KeyError: If node is not part of the tree, or new_parent already has a different child with its key.
+        :raise ValueError: If new_parent is node itself or one of its descendants.
+        :raise IndexError: If position is out of range.
         """
+        key = node[self.key_column]
+        old_parent = node.parent
+
+        if new_parent is None:
+            new_parent = self.root
+
+        if old_parent is None or old_parent.children.get(key) is not node:
+            raise KeyError('No such child exists')
+        elif new_parent is node or self.is_ancestor(node, new_parent):
+            raise ValueError('Cannot move a node under itself')
+        elif new_parent is not old_parent and key in new_parent.children:
+            raise KeyError('A child with key {key} already exists'.format(key=key))
+
         row = node.row()
-        top_left = self.createIndex(row, 0, node)
-        bottom_right = self.createIndex(row, len(self.header), node)
-        self.dataChanged.emit(top_left, bottom_right)
+        row_count = len(new_parent.children)
 
-    def flags(self, index):
-        """ QAbstractItemModel override method that is used to set the flags for the item at the given QModelIndex.
-            Here, we just set all indexes to enabled, and selectable.
-        :param index:
+        if new_parent is old_parent:
+            row_count -= 1
+
+        if self.sort_section is not None and (self.sort_recursive or new_parent is self.root):
+            position = self._sorted_row(new_parent.children, self._node_sort_key(node),
+                                        row if new_parent is old_parent else None)
+        elif position is None:
+            position = row_count
+        elif not 0 <= position <= row_count:
+            raise IndexError('Row {position} is out of range'.format(position=position))
+
+        if new_parent is old_parent:
+            if position == row:
+                return
+
+            # Qt expects the destination row as it is before the node is taken out of its siblings.
+            destination = position if position < row else position + 1
+        else:
+            destination = position
+
+        flipped_ancestors = []
+        subtree_matches = 0
+
+        if self._filter_regex is not None:
+            self._filter_cache.clear()
+            subtree_matches = self._filter_counts.get(node, 0) + (node in self._filter_matches)
+
+            if subtree_matches:
+                flipped_ancestors.extend(self._adjust_filter_counts(node, -subtree_matches))
+
+        if self.rollup_columns:
+            self._roll_up_subtree(node, -1)
+
+        self.beginMoveRows(self.index_of_node(old_parent), row, row, self.index_of_node(new_parent), destination)
+        del old_parent.children[key]
+        new_parent.children.insert(position, key, node)
+        node.setParent(new_parent)
+        self.endMoveRows()
+
+        if self.rollup_columns:
+            self._roll_up_subtree(node, 1)
+
+        if subtree_matches:
+            flipped_ancestors.extend(self._adjust_filter_counts(node, subtree_matches))
+
+        for ancestor in flipped_ancestors:
+            self._notify_data_changed(ancestor)
+
+    def build_from_records(self, records, parent_key_column):
+        """ Replace the contents of the tree with the hierarchy described by a flat collection of records, each of
+            which references its parent through the key of that parent.
+
+            The tree is built in linear time by first creating a TreeItem for every record, indexed by key, and then
+            linking each TreeItem to its parent through that index, so records may come in any order. Views are
+            notified with a single model reset once the whole tree is built.
+
+        :param records: An iterable (a generator is fine, it is consumed once) of dictionaries mapping the model's
+            header to the values for a node, plus parent_key_column.
+        :param parent_key_column: The record column holding the key of the node's parent. Records with an empty parent
+            key, or a parent key that matches no other record, become top level nodes.
+        :raise KeyError: If two records have the same key, which would make their children's parent key ambiguous.
+        :raise ValueError: If the parent keys of some records form a cycle.
         """
-        return Qt.ItemIsEnabled | Qt.ItemIsSelectable
+        key_column = self.key_column
+        root = self._create_item({})
+        nodes_by_key = {}
+        links = []
 
-    def index(self, row, col, parent=None):
-        """ Return a QModelIndex instance pointing the row and column underneath the parent given.
-            This method should not be called directly. This method is called implicitly by the QTreeView that is
-            displaying us, as the way of finding out what to display where.
-        :param row:
-        :param col:
-        :param parent:
+        for values in records:
+            key = values[key_column]
+
+            if key in nodes_by_key:
+                raise KeyError('Several records have the key {key}'.format(key=key))
+
+            node = self._create_item(values)
+            nodes_by_key[key] = node
+            links.append((node, key, values.get(parent_key_column)))
+
+        for node, key, parent_key in links:
+            parent = nodes_by_key.get(parent_key, root)
+
+            if parent is node:
+                parent = root
+
+            node.setParent(parent)
+            parent.children[key] = node
+
+        linked_nodes = list(self.iter_subtree(root))
+        reachable_nodes = set(linked_nodes)
+
+        for node, key, parent_key in links:
+            if node not in reachable_nodes and node.parent.children.get(key) is node:
+                raise ValueError('The parent keys of the records form a cycle at {key}'.format(key=key))
+
+        self._sum_rollups(linked_nodes[1:])
+        self._sort_subtree(root)
+
+        previous_root = self.root
+
+        self.beginResetModel()
+
+        self.root = root
+        self.nodes_by_key = nodes_by_key
+        self._duplicate_keys = {}
+        self._loaded_nodes = set()
+
+        for node, key, parent_key in links:
+            self._connect_node(node)
+
+        self.endResetModel()
+
+        if self._filter_regex is not None:
+            self._apply_filter(self.filter_column, self.filter_pattern, self._filter_regex)
+
+        self._release_nodes(previous_root)
+
+    def flush_rollups(self):
+        """ Emit dataChanged over the roll-up columns of every node whose totals changed since the last flush.
+
+            This is called once control returns to the event loop after a change, so that a burst of edits to leaves
+            results in a single repaint per ancestor, and can be called directly to repaint right away. When the tree is
+            sorted by a roll-up column, every level holding changed nodes is sorted again, with a single layout change.
         """
-        if not parent or not parent.isValid():
-            parent = self.root
+        pending = self._rollup_pending
+        self._rollup_pending = OrderedDictionary()
+        self._rollup_timer.stop()
+
+        if not self._rollup_sections:
+            return
+
+        first_section = self._rollup_sections[0]
+        last_section = self._rollup_sections[-1]
+        refilter = self._filter_regex is not None and self.filter_column in self.rollup_columns
+        resort = self.sort_section is not None and self.header[self.sort_section] in self.rollup_columns
+        nodes = [node for node in pending if node.parent is not None]
+
+        if refilter:
+            for node in nodes:
+                self._refilter_node(node)
+
+        if resort:
+            # Several siblings may have changed at once, so their levels are sorted as a whole.
+            parents = OrderedDictionary()
+
+            for node in nodes:
+                node._sort_key = None
+
+                if self.sort_recursive or node.parent is self.root:
+                    parents[node.parent] = None
+
+            self._sort_levels(parents)
+
+        for node in nodes:
+            row = node.row()
+            self.dataChanged.emit(self.createIndex(row, first_section, node), self.createIndex(row, last_section, node))
+
+    def sort(self, column, order=Qt.AscendingOrder, recursive=True):
+        """ Sort the children of every level of the tree (or only the top level) by a given column, using the sort key
+            of the column's type in header_types, see BasicModel.sort_key.
+
+            The sort key of every node is cached until the node changes, and once sorted, the tree stays sorted: an
+            edit moves only the edited node within its siblings, and added nodes only re-sort the level they were
+            added to. Only the persistent indexes of the levels whose order changed are updated.
+
+        :param column: The section of the column to sort by, or -1 to stop keeping the tree sorted.
+        :param order: Qt.AscendingOrder or Qt.DescendingOrder.
+        :param recursive: Whether to sort the children of every node, or only the top level nodes.
+        """
+        if column < 0:
+            self.sort_section = None
+            return
+
+        self.sort_section = column
+        self.sort_order = order
+        self.sort_recursive = recursive
+
+        if recursive:
+            parents = [node for node in self.iter_subtree(self.root) if len(node.children) > 1]
         else:
-            parent = parent.internalPointer()
+            parents = [self.root]
 
-        if row < 0 or row >= len(parent.children.keys()):
-            return QModelIndex()
+        self._sort_levels(parents)
 
-        row_name = parent.children.keys()[row]
+    def filter_nodes(self, section, pattern):
+        """ Filter the tree by matching a given regex pattern against one column, keeping every node that matches along
+            with all of its ancestors, see accepts_node.
 
-        child = parent.children[row_name]
-        return self.createIndex(row, col, child)
+            Whether each node matches, and how many of its descendants match, is cached and kept up to date as nodes
+            are edited, added and removed, so a filter only has to be evaluated against the whole tree once. After that,
+            a pattern that merely extends the current one with more literal characters is only checked against the
+            nodes that currently match, and the results of the last few patterns are remembered until the tree changes.
 
-    def parent(self, index=None):
-        """ Return the index of the parent TreeItem of a given index. If index is not supplied, return an invalid
-                QModelIndex.
-            Optional args: index
+        NOTE: Only nodes that have been loaded are filtered, lazily loaded children are filtered as they are built.
 
-        :param index: QModelIndex
-        :return:
+        :param section: The column in the tree to match against.
+        :param pattern: The regex pattern to match.
+        :return: The set of TreeItems that matched the pattern.
         """
-        if not index:
-            return QModelIndex()
-        elif not index.isValid():
-            return QModelIndex()
+        try:
+            compiled_regex = re.compile(pattern)
+        except sre_constants.error:
+            # This is raised when the regex is invalid (an unclosed escape sequence, etc)
+            return widgets.warning_message('Improper regular expression filter',
+                                           'The filter you entered is not a valid regular expression, please see the manual for more information on filtering.')
 
-        child = index.internalPointer()
-        parent = child.parent
+        column_name = self.header[section]
+        candidates = None
 
-        if parent == self.root:
-            return QModelIndex()
+        if column_name != self.filter_column:
+            self._filter_cache.clear()
+        elif pattern in self._filter_cache:
+            candidates = self._filter_cache[pattern]
+        elif self._is_refinement(self.filter_pattern, pattern):
+            candidates = self._filter_matches
 
-        return self.createIndex(parent.row(), 0, parent)
+        self._apply_filter(column_name, pattern, compiled_regex, candidates)
+        return set(self._filter_matches)
+
+    def clear_filter(self):
+        """ Remove the filter set by filter_nodes, making every node visible again.
+        """
+        self.filter_column = None
+        self.filter_pattern = None
+        self._filter_regex = None
+        self._filter_matches = set()
+        self._filter_counts = {}
+        self._filter_cache.clear()
+
+        self.filter_changed.emit()
+
+    def accepts_node(self, node):
+        """ Get whether a node passes the current filter, which is the case when it matches the filter itself or any of
+            its descendants does.
+
+        :param node: The TreeItem to check.
+        :return: bool
+        """
+        if self._filter_regex is None:
+            return True
+
+        return node in self._filter_matches or node in self._filter_counts
+
+    def find_node(self, key_value, parent=None):
+        """ Find the node with the given key value.
+
+            Without a parent, the node is looked up anywhere in the tree through our key index, otherwise only the
+            direct children of parent are considered.
+
+        :param key_value: The key column value of the node to find.
+        :param parent: Optional TreeItem to restrict the search to the children of.
+        :return: TreeItem
+        :raise KeyError: If no node matching key_value exists, or without a parent, if several nodes under different
+            parents match it.
+        """
+        if not parent:
+            nodes = self.nodes_by_key
+
+            if key_value in self._duplicate_keys:
+                raise KeyError('Several nodes matching {key_value} exist'.format(key_value=key_value))
+        else:
+            nodes = parent.children
+
+        if key_value not in nodes:
+            raise KeyError('No node matching {key_value} exists'.format(key_value=key_value))
+
+        return nodes[key_value]
+
+    def path_to(self, key_value):
+        """ Get the chain of QModelIndexes leading from the top level of the tree down to the node with the given key.
+
+        :param key_value: The key column value of the node to find the path to.
+        :return: A list of QModelIndex instances, the last of which points at the node itself.
+        :raise KeyError: If no node, or several nodes under different parents, match key_value.
+        """
+        node = self.find_node(key_value)
+        path = []
+
+        while node is not self.root:
+            path.append(self.createIndex(node.row(), 0, node))
+            node = node.parent
+
+        path.reverse()
+        return path
+
+    def node_path(self, node):
+        """ Get the path of a node: the tuple of key values leading from the top level of the tree down to the node,
+            () for the root.
+
+        :param node: The TreeItem to get the path of.
+        :return: tuple
+        :raise KeyError: If the node is not part of the tree.
+        """
+        key_column = self.key_column
+        path = []
+
+        for ancestor in self._iter_ancestors(node):
+            path.append(ancestor[key_column])
+
+        path.reverse()
+        return tuple(path)
+
+    def depth(self, node):
+        """ Get the depth of a node in the tree, where top level nodes have a depth of 0.
+
+        :param node: The TreeItem to get the depth of.
+        :return: int
+        :raise KeyError: If the node is not part of the tree.
+        """
+        depth = -1
+
+        for ancestor in self._iter_ancestors(node):
+            depth += 1
+
+        return depth
+
+    def is_ancestor(self, ancestor, node):
+        """ Get whether a node is a (proper) ancestor of another, by walking up the parents of the other node.
+
+        :param ancestor: The TreeItem that might be an ancestor of node.
+        :param node: The TreeItem that might be a descendant of ancestor.
+        :return: bool
+        """
+        if node is self.root:
+            return False
+
+        parent = node.parent
+
+        while parent is not None:
+            if parent is ancestor:
+                return True
+
+            parent = parent.parent
+
+        return False
+
+    def descendants(self, node):
+        """ Get all of the descendants of a node, in pre-order.
+
+        :param node: The TreeItem to get the descendants of.
+        :return: A list of TreeItems, not including node itself.
+        """
+        subtree = self.iter_subtree(node)
+        next(subtree)
+
+        return list(subtree)
+
+    def unload_node(self, node):
+        """ Drop the children of a node that were built by its child loader, restoring the loader so that they will be
+            built again the next time a view expands the node.
+
+        :param node: The TreeItem to unload the children of.
+        """
+        if node.loaded_by is None:
+            return
+
+        if node.children:
+            children = node.children.values()
+
+            self.beginRemoveRows(self.index_of_node(node), 0, len(children) - 1)
+            node.children = TreeChildren()
+            self.endRemoveRows()
+
+            for child in children:
+                self._release_nodes(child)
+
+        node.child_loader = node.loaded_by
+        node.loaded_by = None
+        node._pending_children = None
+
+        self._loaded_nodes.discard(node)
+
+    def evict_stale(self, is_expanded, keep=None):
+        """ Unload every lazily loaded node that is collapsed in a view, along with the loaded nodes below it.
+
+        :param is_expanded: Callable taking a QModelIndex of this model, returning whether a view shows the node
+            expanded, such as QTreeView.isExpanded (map the index through mapFromSource first for a view on a proxy).
+        :param keep: Optional callable taking a TreeItem, returning True for nodes that should be kept loaded even
+            though they are collapsed.
+        """
+        for node in list(self._loaded_nodes):
+            if node not in self._loaded_nodes:
+                # Already unloaded along with one of its ancestors.
+                continue
+            elif is_expanded(self.index_of_node(node)):
+                continue
+            elif keep and keep(node):
+                continue
+
+            self.unload_node(node)
+
+    def index_of_node(self, node, column=0):
+        """ Get a QModelIndex pointing at the given TreeItem, an invalid QModelIndex for the root.
+
+        :param node: The TreeItem to point at.
+        :param column: The column of the index.
+        :return: QModelIndex
+        """
+        if node is self.root:
+            return QModelIndex()
+
+        return self.createIndex(node.row(), column, node)
+
+    def _iter_ancestors(self, node):
+        """ Iterate over a node and its ancestors, from the node up to the top level of the tree, excluding the root.
+
+        :raise KeyError: If the node is not part of the tree.
+        """
+        root = self.root
+
+        while node is not root:
+            yield node
+            node = node.parent
+
+            if node is None:
+                raise KeyError('The node is not part of the tree')
+
+    def iter_subtree(self, node):
+        """ Iterate over a node and all of its descendants in pre-order, without recursing.
+
+        :param node: The TreeItem at the top of the subtree.
+        """
+        stack = [node]
+
+        while stack:
+            node = stack.pop()
+            yield node
+
+            children = node.children.values()
+            children.reverse()
+            stack.extend(children)
+
+    def _apply_filter(self, column_name, pattern, compiled_regex, candidates=None):
+        """ Set the current filter, and recalculate which nodes match it and how many matching descendants each has.
+
+        :param column_name: The column to match against.
+        :param pattern: The regex pattern being matched.
+        :param compiled_regex: The compiled pattern.
+        :param candidates: Optional collection of the only TreeItems that can possibly match, defaults to all of them.
+        """
+        if candidates is None:
+            candidates = self.iter_subtree(self.root)
+
+        root = self.root
+        filter_text = self._filter_text
+        matches = set(node for node in candidates
+                      if node is not root and compiled_regex.match(filter_text(node[column_name])))
+
+        self.filter_column = column_name
+        self.filter_pattern = pattern
+        self._filter_regex = compiled_regex
+        self._filter_matches = matches
+        self._filter_counts = {}
+
+        for node in matches:
+            self._adjust_filter_counts(node, 1)
+
+        self._filter_cache[pattern] = frozenset(matches)
+
+        while len(self._filter_cache) > 4:
+            self._filter_cache.popitem(last=False)
+
+        self.filter_changed.emit()
+
+    def _adjust_filter_counts(self, node, delta):
+        """ Add delta to the matching descendant count of every ancestor of a node.
+
+        :param node: The TreeItem whose ancestors to update.
+        :param delta: The change in the number of matching nodes in the subtree of node.
+        :return: The list of ancestors whose visibility flipped, from the top of the tree down.
+        """
+        counts = self._filter_counts
+        matches = self._filter_matches
+        root = self.root
+        flipped = []
+        ancestor = node.parent
+
+        while ancestor is not None and ancestor is not root:
+            count = counts.get(ancestor, 0) + delta
+
+            if count > 0:
+                counts[ancestor] = count
+            else:
+                counts.pop(ancestor, None)
+
+            if (count == delta or count == 0) and ancestor not in matches:
+                flipped.append(ancestor)
+
+            ancestor = ancestor.parent
+
+        flipped.reverse()
+        return flipped
+
+    def _filter_added_nodes(self, node):
+        """ Evaluate the current filter for a subtree that is about to be added to the tree.
+
+        :param node: The TreeItem at the top of the new subtree, already linked to its parent.
+        :return: The list of ancestors of node whose visibility flips, to be notified once node has been added.
+        """
+        column_name = self.filter_column
+        compiled_regex = self._filter_regex
+        counts = self._filter_counts
+        matches = self._filter_matches
+        top_parent = node.parent
+        subtree_matches = 0
+
+        for descendant in self.iter_subtree(node):
+            if not compiled_regex.match(self._filter_text(descendant[column_name])):
+                continue
+
+            matches.add(descendant)
+            subtree_matches += 1
+            ancestor = descendant.parent
+
+            while ancestor is not top_parent:
+                counts[ancestor] = counts.get(ancestor, 0) + 1
+                ancestor = ancestor.parent
+
+        if not subtree_matches:
+            return []
+
+        return self._adjust_filter_counts(node, subtree_matches)
+
+    def _refilter_node(self, node):
+        """ Re-evaluate the current filter for a node whose data changed, updating its ancestors if the result flipped.
+
+        :param node: The TreeItem that changed.
+        """
+        self._filter_cache.clear()
+
+        matched = bool(self._filter_regex.match(self._filter_text(node[self.filter_column])))
+
+        if matched == (node in self._filter_matches):
+            return
+
+        if matched:
+            self._filter_matches.add(node)
+        else:
+            self._filter_matches.discard(node)
+
+        for ancestor in self._adjust_filter_counts(node, 1 if matched else -1):
+            self._notify_data_changed(ancestor)
+
+    @staticmethod
+    def _filter_text(data):
+        """ Get the text a filter is matched against for a value, which is the text data() displays for it.
+        """
+        if not data:
+            return u''
+
+        return unicode(data)
+
+    @staticmethod
+    def _is_refinement(previous_pattern, pattern):
+        """ Get whether everything matching pattern is guaranteed to match previous_pattern, which is the case when both
+            are literal text, and pattern starts with previous_pattern.
+        """
+        if previous_pattern is None:
+            return False
+        elif re.escape(previous_pattern) != previous_pattern or re.escape(pattern) != pattern:
+            return False
+
+        return pattern.startswith(previous_pattern)
+
+    def _build_node(self, values, children=None, parent=None, children_key=None):
+        """ Build a new TreeItem and the subtree described by children, level by level, without adding it to the
+            model.
+
+        :param values: A dictionary mapping the model's header to the values to use for the TreeItem.
+        :param children: The children of the TreeItem, in any of the forms accepted by add_node.
+        :param parent: The TreeItem that will be the parent of the new TreeItem.
+        :param children_key: Optional key holding the children of child dictionaries, see sync.
+        :return: The new TreeItem.
+        """
+        node = self._create_item(values, parent)
+        built_nodes = [node]
+        pending = deque([(node, children)])
+
+        while pending:
+            item, children = pending.popleft()
+
+            if not children:
+                continue
+            elif callable(children):
+                item.child_loader = children
+                continue
+
+            for child in children:
+                child_values, grandchildren = self._split_child(child, children_key)
+                child_item = self._create_item(child_values, item)
+                item.children[child_values[self.key_column]] = child_item
+
+                built_nodes.append(child_item)
+                pending.append((child_item, grandchildren))
+
+        self._sum_rollups(built_nodes[1:])
+        return node
+
+    def _read_json_nodes(self, reader, source, children_key, max_depth, parent):
+        """ Build the TreeItems of a JSON document from the events of a JSONEventReader, see load_json.
+
+        :return: The list of top level TreeItems, linked to parent but not yet added to its children.
+        """
+        events = iter(reader)
+        top_nodes = []
+        built_nodes = [] if self.rollup_columns else None
+        key_column = self.key_column
+
+        # Each frame is [parent TreeItem, depth of the nodes, values of the node being read, its TreeItem once built].
+        frames = []
+
+        for event, value, offset in events:
+            if event == json_stream.START_ARRAY and not frames:
+                continue
+            elif event == json_stream.END_ARRAY:
+                if frames:
+                    frames.pop()
+
+                continue
+            elif event == json_stream.START_MAP:
+                if frames:
+                    frames.append([frames[-1][3], frames[-1][1] + 1, {}, None])
+                else:
+                    frames.append([parent, 0, {}, None])
+
+                continue
+            elif event == json_stream.END_MAP:
+                item_parent, depth, values, item = frames.pop()
+
+                if item is None:
+                    item = self._create_item(values, item_parent)
+
+                if depth == 0:
+                    top_nodes.append(item)
+                else:
+                    item_parent.children[item[key_column]] = item
+
+                    if built_nodes is not None:
+                        built_nodes.append(item)
+
+                continue
+            elif event != json_stream.MAP_KEY:
+                raise ValueError('Expected a JSON object for a node at offset {offset}'.format(offset=offset))
+
+            frame = frames[-1]
+            event, field_value, offset = next(events)
+
+            if value != children_key:
+                field_value = json_stream.read_value(events, event, field_value)
+
+                if frame[3] is None:
+                    frame[2][value] = field_value
+                elif value in frame[3]:
+                    frame[3]._data[value] = field_value
+
+                continue
+
+            # The node is built as soon as its children are reached, so that they can be linked to it.
+            if frame[3] is None:
+                frame[3] = self._create_item(frame[2], frame[0])
+
+            if event != json_stream.START_ARRAY:
+                json_stream.skip_value(events, event)
+            elif max_depth is not None and frame[1] + 1 >= max_depth:
+                if not json_stream.skip_value(events, event):
+                    frame[3].child_loader = json_stream.JSONChildLoader(source, offset, children_key)
+            else:
+                # Mark that the child nodes of this frame's node are being read.
+                frames.append([frame[3], frame[1], None, frame[3]])
+
+        if built_nodes:
+            # Nodes are built in post-order, so reversing them puts parents before their children.
+            self._sum_rollups(built_nodes[::-1])
+
+        return top_nodes
+
+    def _create_item(self, values, parent=None):
+        """ Create a new TreeItem holding values packed to our header.
+
+        :param values: A dictionary mapping the model's header to the values to use for the TreeItem.
+        :param parent: The parent of the TreeItem.
+        :return: TreeItem
+        """
+        item = TreeItem(self.pack_dictionary(values), parent)
+
+        if self.rollup_columns:
+            item.rollup_columns = self.rollup_columns
+
+        return item
+
+    def _sum_rollups(self, nodes):
+        """ Add the roll-up column values of freshly built nodes into their parents, bottom up, so that every parent
+            ends up holding its own value plus the totals of its children.
+
+        :param nodes: The new TreeItems, ordered so that parents come before their children (level or pre-order).
+        """
+        if not self.rollup_columns:
+            return
+
+        for node in reversed(nodes):
+            parent = node.parent
+            parent_data = parent._data
+
+            for column in self.rollup_columns:
+                parent_data[column] = rollup_value(parent_data.get(column)) + rollup_value(node._data.get(column))
+
+    def _roll_up_subtree(self, node, sign):
+        """ Add the totals of a subtree to its ancestors, or subtract them with a negative sign, and schedule the
+            repaint of those ancestors.
+
+        :param node: The TreeItem at the top of the subtree, still linked to its parent.
+        :param sign: 1 when the subtree was added, -1 when it was removed.
+        """
+        for column in self.rollup_columns:
+            delta = sign * rollup_value(node._data.get(column))
+
+            if not delta:
+                continue
+
+            ancestor = node.parent
+
+            while ancestor is not None:
+                ancestor._data[column] = rollup_value(ancestor._data.get(column)) + delta
+                ancestor._sort_key = None
+                ancestor = ancestor.parent
+
+        self._schedule_rollup_repaint(node.parent)
+
+    def _schedule_rollup_repaint(self, node):
+        """ Queue a node and its ancestors to have their roll-up columns repainted by the next flush_rollups.
+
+        :param node: The lowest TreeItem whose roll-up values changed.
+        """
+        pending = self._rollup_pending
+        root = self.root
+
+        while node is not None and node is not root:
+            pending[node] = None
+            node = node.parent
+
+        if pending and not self._rollup_timer.isActive():
+            self._rollup_timer.start()
+
+    @staticmethod
+    def _split_child(child, children_key=None):
+        """ Split a child description, which is either a values dictionary or a (values, children) tuple.
+
+        :param children_key: Optional key holding the children of a values dictionary.
+        :return: A (values, children) tuple.
+        """
+        if isinstance(child, tuple):
+            return child
+        elif children_key is not None:
+            return child, child.get(children_key)
+
+        return child, None
+
+    def _sync_children(self, parent, records, children_key):
+        """ Apply the differences between the children of a node and the records of its children, see sync.
+
+        :param parent: The TreeItem to sync the children of.
+        :param records: The records of the children of parent.
+        :param children_key: The key holding the records of a node's children.
+        :return: A list of (TreeItem, records) tuples for the children of parent whose own children need syncing.
+        """
+        key_column = self.key_column
+        children = parent.children
+        records_by_key = OrderedDictionary()
+
+        for record in records:
+            records_by_key[record[key_column]] = record
+
+        if parent.child_loader is not None:
+            # The snapshot takes over from the child loader.
+            parent.child_loader = None
+            parent._pending_children = None
+
+        removed_nodes = [node for key, node in children.iteritems() if key not in records_by_key]
+
+        if removed_nodes:
+            self.remove_nodes(removed_nodes)
+
+        if self.sort_section is None:
+            self._reorder_children(parent, [key for key in records_by_key if key in children])
+
+        pending = []
+        new_records = []
+        first = 0
+
+        for row, (key, record) in enumerate(records_by_key.iteritems()):
+            node = children.get(key)
+
+            if node is None:
+                if not new_records:
+                    first = row
+
+                new_records.append(record)
+                continue
+            elif new_records:
+                self._insert_records(parent, new_records, first, children_key)
+                new_records = []
+
+            self._sync_values(node, record)
+
+            if record.get(children_key) is not None:
+                pending.append((node, record[children_key]))
+
+        if new_records:
+            self._insert_records(parent, new_records, first, children_key)
+
+        return pending
+
+    def _reorder_children(self, parent, keys):
+        """ Put the children of a node in a new order, moving only the children outside the longest run of children
+            that are already in order, each with a single beginMoveRows/endMoveRows.
+
+        :param parent: The TreeItem whose children to reorder.
+        :param keys: The keys of all of the children of parent, in their new order.
+        """
+        children = parent.children
+        current_keys = children.keys()
+
+        if keys == current_keys:
+            return
+
+        current_rows = dict((key, row) for row, key in enumerate(current_keys))
+        sequence = [current_rows[key] for key in keys]
+        in_order = set(keys[index] for index in longest_increasing_subsequence(sequence))
+        parent_index = self.index_of_node(parent)
+        previous_node = None
+
+        for key in keys:
+            node = children[key]
+
+            if key not in in_order:
+                row = children.row_of(node)
+
+                if previous_node is None:
+                    position = 0
+                else:
+                    previous_row = children.row_of(previous_node)
+                    position = previous_row + 1 if previous_row < row else previous_row
+
+                if position != row:
+                    self.beginMoveRows(parent_index, row, row, parent_index, position if position < row else position + 1)
+                    children.move(row, position)
+                    self.endMoveRows()
+
+            previous_node = node
+
+    def _insert_records(self, parent, records, row, children_key):
+        """ Build the subtrees of a run of new records and insert them at a given row, see sync.
+        """
+        nodes = [self._build_node(record, record.get(children_key), parent, children_key) for record in records]
+        self._insert_nodes(parent, nodes, row)
+
+    def _sync_values(self, node, record):
+        """ Update the values of a node from a record, emitting a single change notification if any of them changed.
+
+            The record holds the node's own value for roll-up columns, which is compared to the node's total minus the
+            totals of its children, and any difference is rolled up to the node's ancestors.
+
+        :param node: The TreeItem to update.
+        :param record: The record to update it from.
+        """
+        values = self.pack_dictionary(record)
+        data = node._data
+        changed_keys = []
+
+        for column, value in values.iteritems():
+            if column not in self.rollup_columns:
+                if data.get(column) != value:
+                    data[column] = value
+                    changed_keys.append(column)
+
+                continue
+
+            children_total = sum(rollup_value(child._data.get(column)) for child in node.children.itervalues())
+            delta = rollup_value(value) - (rollup_value(data.get(column)) - children_total)
+
+            if delta:
+                data[column] = rollup_value(data.get(column)) + delta
+                node.roll_up(column, delta)
+                changed_keys.append(column)
+
+        if changed_keys:
+            node.changed.emit(changed_keys)
+
+    def _insert_nodes(self, parent, nodes, row=None):
+        """ Add already built TreeItems to the children of parent, emitting a single ranged insert notification.
+
+        NOTE: A node with the same key as an existing child of parent replaces that child at its row (unless row is
+            given), which is removed first.
+
+        :param parent: The TreeItem to add the nodes under.
+        :param nodes: A list of TreeItems built by _build_node.
+        :param row: The row to insert the nodes at, if not given, they are appended.
+        """
+        children = parent.children
+        new_nodes = OrderedDictionary()
+
+        for node in nodes:
+            new_nodes[node[self.key_column]] = node
+
+        replaced_nodes = [children[key] for key in new_nodes if key in children]
+
+        if replaced_nodes and row is None:
+            # Put each replacement at the row of the child it replaces, only nodes with new keys are appended.
+            for replaced_node in replaced_nodes:
+                replaced_row = replaced_node.row()
+                self.remove_nodes([replaced_node])
+                self._insert_nodes(parent, [new_nodes.pop(replaced_node[self.key_column])], replaced_row)
+        elif replaced_nodes:
+            self.remove_nodes(replaced_nodes)
+
+        if not new_nodes:
+            return
+
+        flipped_ancestors = []
+
+        if self.sort_section is not None and self.sort_recursive:
+            for node in new_nodes.itervalues():
+                self._sort_subtree(node)
+
+        if self._filter_regex is not None:
+            self._filter_cache.clear()
+
+            for node in new_nodes.itervalues():
+                flipped_ancestors.extend(self._filter_added_nodes(node))
+
+        sort_level = self.sort_section is not None and (self.sort_recursive or parent is self.root)
+
+        if sort_level and len(new_nodes) == 1:
+            # Insert a single node straight at its sorted position, instead of re-sorting all of its siblings.
+            row = self._sorted_row(children, self._node_sort_key(next(new_nodes.itervalues())))
+            sort_level = False
+        elif sort_level and not children:
+            node_sort_key = self._node_sort_key
+            sorted_keys = sorted(new_nodes, key=lambda key: node_sort_key(new_nodes[key]),
+                                 reverse=self.sort_order == Qt.DescendingOrder)
+            new_nodes = OrderedDictionary((key, new_nodes[key]) for key in sorted_keys)
+            sort_level = False
+
+        first = len(children) if row is None else row
+        self.beginInsertRows(self.index_of_node(parent), first, first + len(new_nodes) - 1)
+
+        for offset, (key, node) in enumerate(new_nodes.iteritems()):
+            if row is None:
+                children[key] = node
+            else:
+                children.insert(first + offset, key, node)
+
+            self._register_nodes(node)
+
+        self.endInsertRows()
+
+        if self.rollup_columns:
+            for node in new_nodes.itervalues():
+                self._roll_up_subtree(node, 1)
+
+        if sort_level:
+            self._sort_levels([parent])
+
+        for ancestor in flipped_ancestors:
+            self._notify_data_changed(ancestor)
+
+    def _register_nodes(self, node):
+        """ Add a node and all of its descendants to our key index, and connect their data changed signals.
+
+        :param node: The TreeItem at the top of the subtree being added.
+        """
+        key_column = self.key_column
+
+        for descendant in self.iter_subtree(node):
+            self._index_node(descendant, descendant[key_column])
+            self._connect_node(descendant)
+
+    def _index_node(self, node, key):
+        """ Add a node to our key index, keeping track of the other nodes that already hold its key, see find_node.
+        """
+        existing = self.nodes_by_key.setdefault(key, node)
+
+        if existing is not node:
+            self._duplicate_keys.setdefault(key, []).append(node)
+
+    def _unindex_node(self, node, key):
+        """ Remove a node from our key index, handing the key over to another node holding it, if there is one.
+        """
+        duplicates = self._duplicate_keys.get(key)
+
+        if self.nodes_by_key.get(key) is node:
+            if duplicates:
+                self.nodes_by_key[key] = duplicates.pop(0)
+            else:
+                del self.nodes_by_key[key]
+        elif duplicates:
+            self._duplicate_keys[key] = duplicates = [duplicate for duplicate in duplicates if duplicate is not node]
+
+        if duplicates is not None and not duplicates:
+            del self._duplicate_keys[key]
+
+    def _release_nodes(self, node):
+        """ Tear down a subtree that has been removed from the tree: remove its nodes from our key index, disconnect
+            their signals from the model, and break the parent-child links between them so that they can be freed as
+            soon as nothing else references them.
+
+        NOTE: The subtree is walked iteratively, and the links are broken from the bottom up, so that releasing a very
+            deep subtree never recurses.
+
+        :param node: The TreeItem at the top of the removed subtree.
+        """
+        loaded_nodes = self._loaded_nodes
+        rollup_pending = self._rollup_pending
+        key_column = self.key_column
+        descendants = list(self.iter_subtree(node))
+
+        if self.rollup_columns:
+            self._roll_up_subtree(node, -1)
+
+        flipped_ancestors = []
+
+        for descendant in descendants:
+            self._unindex_node(descendant, descendant[key_column])
+            loaded_nodes.discard(descendant)
+            rollup_pending.pop(descendant, None)
+            self._disconnect_node(descendant)
+
+        if self._filter_regex is not None:
+            self._filter_cache.clear()
+            removed_matches = 0
+
+            for descendant in descendants:
+                if descendant in self._filter_matches:
+                    self._filter_matches.discard(descendant)
+                    removed_matches += 1
+
+                self._filter_counts.pop(descendant, None)
+
+            if removed_matches:
+                flipped_ancestors = self._adjust_filter_counts(node, -removed_matches)
+
+        for descendant in reversed(descendants):
+            descendant.children = TreeChildren()
+            descendant.child_loader = None
+            descendant.loaded_by = None
+            descendant._pending_children = None
+            descendant.setParent(None)
+
+        for ancestor in flipped_ancestors:
+            self._notify_data_changed(ancestor)
+
+    @staticmethod
+    def _row_ranges(rows):
+        """ Group rows, sorted in descending order, into contiguous (first, last) ranges, last ranges first.
+
+        :param rows: A list of rows sorted in descending order.
+        """
+        last = first = rows[0]
+
+        for row in rows[1:]:
+            if row == first - 1:
+                first = row
+                continue
+
+            yield first, last
+            last = first = row
+
+        yield first, last
+
+    def _node_sort_key(self, node):
+        """ Get the cached key to sort a node by within its siblings, computing it if the node changed since.
+
+        :param node: The TreeItem to get the sort key of.
+        :return: The sort key, see BasicModel.sort_key.
+        """
+        column_name = self.header[self.sort_section]
+        cached_key = node._sort_key
+
+        if cached_key is None or cached_key[0] != column_name:
+            cached_key = node._sort_key = (column_name, self.sort_key(column_name, node._data.get(column_name)))
+
+        return cached_key[1]
+
+    def _sorted_keys(self, parent):
+        """ Get the keys of the children of a node, in sorted order.
+
+        :param parent: The TreeItem whose children to sort.
+        :return: list
+        """
+        children = parent.children
+        node_sort_key = self._node_sort_key
+
+        return sorted(children, key=lambda key: node_sort_key(children[key]),
+                      reverse=self.sort_order == Qt.DescendingOrder)
+
+    def _sort_levels(self, parents):
+        """ Sort the children of the given nodes, notifying views with a single layout change if any of them changed
+            order, and updating only the persistent indexes of those children.
+
+        :param parents: The TreeItems whose children to sort.
+        """
+        reordered = []
+
+        for parent in parents:
+            sorted_keys = self._sorted_keys(parent)
+
+            if sorted_keys != parent.children.keys():
+                reordered.append((parent, sorted_keys))
+
+        if not reordered:
+            return
+
+        self.layoutAboutToBeChanged.emit()
+
+        for parent, sorted_keys in reordered:
+            parent.children.reorder(sorted_keys)
+
+        reordered_parents = set(parent for parent, sorted_keys in reordered)
+
+        for index in self.persistentIndexList():
+            node = index.internalPointer()
+
+            if node is not None and node.parent in reordered_parents:
+                self.changePersistentIndex(index, self.createIndex(node.row(), index.column(), node))
+
+        self.layoutChanged.emit()
+
+    def _sort_subtree(self, node):
+        """ Sort the children of every level of a subtree that views do not know about yet, without notifying them.
+
+        :param node: The TreeItem at the top of the subtree.
+        """
+        if self.sort_section is None:
+            return
+
+        for descendant in self.iter_subtree(node):
+            if len(descendant.children) > 1:
+                descendant.children.reorder(self._sorted_keys(descendant))
+
+    def _resort_node(self, node):
+        """ Move a node whose sort key may have changed to its sorted position within its siblings, which are sorted.
+
+        :param node: The TreeItem that changed.
+        """
+        parent = node.parent
+
+        if parent is None or not (self.sort_recursive or parent is self.root):
+            return
+
+        previous_key = node._sort_key
+        node._sort_key = None
+        sort_key = self._node_sort_key(node)
+
+        if previous_key is not None and previous_key == node._sort_key:
+            return
+
+        children = parent.children
+        row = node.row()
+        low = self._sorted_row(children, sort_key, row)
+
+        if low == row:
+            return
+
+        parent_index = self.index_of_node(parent)
+        self.beginMoveRows(parent_index, row, row, parent_index, low if low < row else low + 1)
+        children.move(row, low)
+        self.endMoveRows()
+
+    def _sorted_row(self, children, sort_key, skip_row=None):
+        """ Binary search sorted children for the row a node with a given sort key belongs at, which is before the first
+            child that sorts after it.
+
+        :param children: The TreeChildren to search, which are sorted.
+        :param sort_key: The sort key of the node, see _node_sort_key.
+        :param skip_row: Optional row of the node itself among the children, which is ignored.
+        :return: The row, counted without skip_row.
+        """
+        descending = self.sort_order == Qt.DescendingOrder
+        low = 0
+        high = len(children) if skip_row is None else len(children) - 1
+
+        while low < high:
+            middle = (low + high) // 2
+            sibling_row = middle if skip_row is None or middle < skip_row else middle + 1
+            sibling_key = self._node_sort_key(children.at(sibling_row))
+
+            if (sibling_key < sort_key) if descending else (sibling_key > sort_key):
+                high = middle
+            else:
+                low = middle + 1
+
+        return low
+
+    def _node_from_index(self, index):
+        if not index or not index.isValid():
+            return self.root
+
+        return index.internalPointer()
+
+    def _connect_node(self, node):
+        """ Helper function used to connect the data changed signals of our TreeItem to the notify_data_changed method.
+
+        NOTE: This method is automatically called for all TableRow objects added to our model (properly), to support
+            updating the model and any views automatically when the data of the TableRow is changed programatically.
+
+        NOTE: All nodes share the bound _node_changed slot instead of a lambda closing over each node, which looks the
+            node up through sender(), so connecting a node costs no extra python objects.
+
+        :param node: TableRow instance to connect.
+        """
+        node.changed.connect(self._node_changed)
+
+        if self.rollup_columns:
+            node.rolled_up.connect(self._node_rolled_up)
+
+    def _disconnect_node(self, node):
+        """ Undo _connect_node for a TreeItem that is being removed from our model.
+
+        :param node: TreeItem instance to disconnect.
+        """
+        try:
+            node.changed.disconnect(self._node_changed)
+
+            if self.rollup_columns:
+                node.rolled_up.disconnect(self._node_rolled_up)
+        except TypeError:
+            # The node was never connected (or already disconnected).
+            pass
+
+    def _node_changed(self, keys):
+        """ Slot connected to the changed signal of every TreeItem in the model.
+
+        :param keys: The columns whose values changed.
+        """
+        node = self.sender()
+
+        if self.key_column in keys:
+            self._rekey_node(node)
+
+        if self._filter_regex is not None and self.filter_column in keys:
+            self._refilter_node(node)
+
+        if self.sort_section is not None and self.header[self.sort_section] in keys:
+            self._resort_node(node)
+
+        self._notify_data_changed(node, keys)
+
+    def _rekey_node(self, node):
+        """ Update our key index, and the children of the node's parent, after the key value of a node was changed.
+
+        NOTE: If a sibling of the node already has the new key value, the node stays indexed by its previous key value.
+
+        :param node: The TreeItem whose key value changed.
+        """
+        parent = node.parent
+        key = node[self.key_column]
+
+        if parent is None or key in parent.children:
+            return
+
+        previous_key = parent.children.rekey(node, key)
+
+        self._unindex_node(node, previous_key)
+        self._index_node(node, key)
+
+    def _node_rolled_up(self, key):
+        """ Slot connected to the rolled_up signal of every TreeItem in the model, when it has roll-up columns.
+
+        :param key: The roll-up column that changed.
+        """
+        self._schedule_rollup_repaint(self.sender().parent)
+
+    # noinspection PyUnresolvedReferences
+    def _notify_data_changed(self, node, keys=None):
+        """ The data for a given TreeItem has been changed, so emit the dataChanged signal to update views.
+
+        :param node: The TreeItem that was changed.
+        :param keys: Optional columns that changed, to limit the notification to the range of cells between them,
+            otherwise the whole row is notified.
+        """
+        first_section, last_section = self._changed_sections(keys)
+
+        if first_section is None:
+            return
+
+        row = node.row()
+        top_left = self.createIndex(row, first_section, node)
+        bottom_right = self.createIndex(row, last_section, node)
+        self.dataChanged.emit(top_left, bottom_right)
+
+    def flags(self, index):
+        """ QAbstractItemModel override method that is used to set the flags for the item at the given QModelIndex.
+            Here, we just set all indexes to enabled, and selectable.
+        :param index:
+        """
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable
+
+    def index(self, row, col, parent=None):
+        """ Return a QModelIndex instance pointing the row and column underneath the parent given.
+            This method should not be called directly. This method is called implicitly by the QTreeView that is
+            displaying us, as the way of finding out what to display where.
+        :param row:
+        :param col:
+        :param parent:
+        """
+        if not parent or not parent.isValid():
+            parent = self.root
+        else:
+            parent = parent.internalPointer()
+
+        if row < 0 or row >= len(parent.children):
+            return QModelIndex()
+
+        child = parent.children.at(row)
+        return self.createIndex(row, col, child)
+
+    def parent(self, index=None):
+        """ Return the index of the parent TreeItem of a given index. If index is not supplied, return an invalid
+                QModelIndex.
+            Optional args: index
+
+        :param index: QModelIndex
+        :return:
+        """
+        if not index:
+            return QModelIndex()
+        elif not index.isValid():
+            return QModelIndex()
+
+        child = index.internalPointer()
+        parent = child.parent
+
+        if parent == self.root:
+            return QModelIndex()
+
+        return self.createIndex(parent.row(), 0, parent)
+
+    def hasChildren(self, index=None):
+        """ Return whether a given index has children, including children that have not been loaded yet.
+
+        :param index: QModelIndex
+        """
+        if index and index.isValid() and index.column() > 0:
+            return False
+
+        node = self._node_from_index(index)
+        return len(node.children) > 0 or node.child_loader is not None
+
+    def canFetchMore(self, index):
+        """ Return whether the node at a given index still has children waiting to be built by its child loader.
+
+        :param index: QModelIndex
+        """
+        return self._node_from_index(index).child_loader is not None
+
+    def fetchMore(self, index):
+        """ Build the children of the node at a given index from its child loader, fetch_batch_size children at a time
+            if set, otherwise all of them at once.
+
+        :param index: QModelIndex
+        """
+        node = self._node_from_index(index)
+
+        if node.child_loader is None:
+            return
+
+        if node._pending_children is None:
+            node._pending_children = iter(node.child_loader(node))
+            node.loaded_by = node.child_loader
+            self._loaded_nodes.add(node)
+
+        if self.fetch_batch_size:
+            batch = list(islice(node._pending_children, self.fetch_batch_size))
+        else:
+            batch = list(node._pending_children)
+
+        if not self.fetch_batch_size or len(batch) < self.fetch_batch_size:
+            node.child_loader = None
+            node._pending_children = None
+
+        nodes = []
+
+        for child in batch:
+            values, children = self._split_child(child)
+            nodes.append(self._build_node(values, children, node))
+
+        if nodes:
+            self._insert_nodes(node, nodes)
 
     def rowCount(self, index=None):
         """ Return the number of rows a given index has under it. If an invalid QModelIndex is supplied, return the
@@ -0,0 +1,310 @@
+# coding=utf-8
+""" Define an incremental, event based JSON parser, used by TreeModel.load_json to build trees from large documents
+without loading the whole document into memory.
+
+Author: Ian Davis
+"""
+
+import re
+
+from json.decoder import scanstring
+
+
+WHITESPACE = re.compile(r'[ \t\n\r]*')
+NUMBER = re.compile(r'(-?(?:0|[1-9]\d*))(\.\d+)?([eE][-+]?\d+)?')
+NUMBER_CHARACTERS = re.compile(r'[-+.eE0-9]*')
+LITERALS = (('true', True), ('false', False), ('null', None))
+
+START_MAP = 'start_map'
+MAP_KEY = 'map_key'
+END_MAP = 'end_map'
+START_ARRAY = 'start_array'
+END_ARRAY = 'end_array'
+VALUE = 'value'
+
+
+class JSONEventReader(object):
+    """ Parse a single JSON value from a binary stream a chunk at a time, as a sequence of (event, value, offset) tuples,
+        where event is one of START_MAP, MAP_KEY, END_MAP, START_ARRAY, END_ARRAY or VALUE, value is the key for
+        MAP_KEY, the parsed scalar for VALUE and None otherwise, and offset is the position in the stream of the token.
+
+        Only the chunk being parsed is held in memory (plus any token that spans chunks), so documents of any size can
+        be read in constant memory. The offsets of containers can be used to start a new reader at that container later.
+
+        The stream is seeked to the reader's own position before each chunk is read, so several readers can share a
+        stream, and a path is only opened for as long as it takes to read a chunk, so an unfinished reader holds no
+        file open.
+    """
+
+    def __init__(self, stream, offset=None, chunk_size=64 * 1024):
+        """ JSONEventReader initializer
+
+        :param stream: The seekable binary file object to read the JSON document from, or the path of the document.
+        :param offset: Optional position to start parsing at, defaults to the current position of the stream (or the
+            start of the document for a path).
+        :param chunk_size: The number of bytes to read at a time.
+        """
+        if offset is None:
+            offset = 0 if isinstance(stream, basestring) else stream.tell()
+
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self._buffer = ''
+        self._position = 0
+        self._base = offset
+        self._eof = False
+
+    def __iter__(self):
+        containers = []
+        expecting_key = False
+
+        while True:
+            character = self._next_character()
+
+            if character is None:
+                if containers:
+                    raise ValueError('Unexpected end of JSON document')
+
+                return
+
+            offset = self._base + self._position
+
+            if character == '{':
+                self._position += 1
+                containers.append(END_MAP)
+                expecting_key = True
+                yield START_MAP, None, offset
+                continue
+            elif character == '[':
+                self._position += 1
+                containers.append(END_ARRAY)
+                yield START_ARRAY, None, offset
+                continue
+            elif character in '}]':
+                self._position += 1
+                yield containers.pop(), None, offset
+            elif character == ',':
+                self._position += 1
+                expecting_key = containers[-1] == END_MAP
+                continue
+            elif character == ':':
+                self._position += 1
+                continue
+            elif character == '"':
+                value = self._read_string()
+
+                if expecting_key:
+                    expecting_key = False
+                    yield MAP_KEY, value, offset
+                    continue
+
+                yield VALUE, value, offset
+            else:
+                yield VALUE, self._read_scalar(), offset
+
+            if not containers:
+                return
+
+    def _next_character(self):
+        """ Skip whitespace, returning the next character or None at the end of the stream.
+        """
+        while True:
+            self._position = WHITESPACE.match(self._buffer, self._position).end()
+
+            if self._position < len(self._buffer):
+                return self._buffer[self._position]
+            elif not self._fill():
+                return None
+
+    def _fill(self):
+        """ Read the next chunk from the stream, discarding the part of the buffer that has been parsed.
+
+        :return: False at the end of the stream.
+        """
+        if self._eof:
+            return False
+
+        chunk = self._read_chunk(self._base + len(self._buffer))
+
+        if not chunk:
+            self._eof = True
+            return False
+
+        self._base += self._position
+        self._buffer = self._buffer[self._position:] + chunk
+        self._position = 0
+        return True
+
+    def _read_chunk(self, position):
+        """ Read the chunk of the stream starting at a given position.
+        """
+        if isinstance(self.stream, basestring):
+            with open(self.stream, 'rb') as stream:
+                stream.seek(position)
+                return stream.read(self.chunk_size)
+
+        self.stream.seek(position)
+        return self.stream.read(self.chunk_size)
+
+    def _read_string(self):
+        while True:
+            try:
+                value, self._position = scanstring(self._buffer, self._position + 1, 'utf-8', True)
+                return value
+            except ValueError:
+                # The string may continue in the next chunk.
+                if not self._fill():
+                    raise
+
+    def _read_scalar(self):
+        while True:
+            buffer = self._buffer
+            position = self._position
+
+            for literal, value in LITERALS:
+                if buffer.startswith(literal, position):
+                    self._position += len(literal)
+                    return value
+
+            # A literal or a number may continue in the next chunk.
+            if len(buffer) - position < 5 and self._fill():
+                continue
+
+            token_end = NUMBER_CHARACTERS.match(buffer, position).end()
+
+            if token_end == len(buffer) and self._fill():
+                continue
+
+            match = NUMBER.match(buffer, position)
+
+            if not match or match.end() != token_end:
+                raise ValueError('Invalid JSON value at offset {offset}'.format(offset=self._base + position))
+
+            self._position = match.end()
+            integer, fraction, exponent = match.groups()
+
+            if fraction or exponent:
+                return float(match.group())
+
+            return int(integer)
+
+
+def read_value(events, event, value):
+    """ Build the python value of a JSON value whose first event has already been read, without recursing.
+
+    :param events: The iterator of JSONEventReader events the value is being read from.
+    :param event: The first event of the value.
+    :param value: The value of the first event.
+    :return: The dictionary, list or scalar.
+    """
+    if event == VALUE:
+        return value
+
+    result = {} if event == START_MAP else []
+    containers = [result]
+    key = None
+
+    for event, value, offset in events:
+        container = containers[-1]
+
+        if event == MAP_KEY:
+            key = value
+            continue
+        elif event in (END_MAP, END_ARRAY):
+            containers.pop()
+
+            if not containers:
+                return result
+
+            continue
+        elif event == VALUE:
+            item = value
+        else:
+            item = {} if event == START_MAP else []
+
+        if isinstance(container, dict):
+            container[key] = item
+        else:
+            container.append(item)
+
+        if event != VALUE:
+            containers.append(item)
+
+    raise ValueError('Unexpected end of JSON document')
+
+
+def skip_value(events, event):
+    """ Skip over a JSON value whose first event has already been read.
+
+    :param events: The iterator of JSONEventReader events the value is being read from.
+    :param event: The first event of the value.
+    :return: True if the value is an empty container (or a scalar), False otherwise.
+    """
+    if event not in (START_MAP, START_ARRAY):
+        return True
+
+    depth = 1
+    empty = True
+
+    for event, value, offset in events:
+        if event in (START_MAP, START_ARRAY):
+            depth += 1
+        elif event in (END_MAP, END_ARRAY):
+            depth -= 1
+
+            if not depth:
+                return empty
+
+        empty = False
+
+    raise ValueError('Unexpected end of JSON document')
+
+
+class JSONChildLoader(object):
+    """ Child loader (see TreeModel.add_node) that reads the array of child nodes found at a given offset of a JSON
+        document, yielding each child's values along with a JSONChildLoader for its own children, so that a tree is
+        loaded from the document one level at a time as it is expanded.
+    """
+
+    def __init__(self, source, offset, children_key='children'):
+        """ JSONChildLoader initializer
+
+        :param source: The path of the JSON document, or a seekable binary file object holding it, which other readers
+            of the document may share, see JSONEventReader.
+        :param offset: The offset of the array of child nodes in the document.
+        :param children_key: The key holding the array of child nodes in each node.
+        """
+        self.source = source
+        self.offset = offset
+        self.children_key = children_key
+
+    def __call__(self, node):
+        events = iter(JSONEventReader(self.source, self.offset))
+        next(events)
+
+        for event, value, offset in events:
+            if event == END_ARRAY:
+                return
+
+            yield self._read_child(events)
+
+    def _read_child(self, events):
+        """ Read the values of a child node whose START_MAP event has already been read, skipping its children.
+
+        :return: A (values, children) tuple, where children is a JSONChildLoader, or None without any children.
+        """
+        values = {}
+        children = None
+
+        for event, key, offset in events:
+            if event == END_MAP:
+                return values, children
+
+            event, value, offset = next(events)
+
+            if key != self.children_key:
+                values[key] = read_value(events, event, value)
+            elif not skip_value(events, event):
+                children = JSONChildLoader(self.source, offset, self.children_key)
+
+        raise ValueError('Unexpected end of JSON document')
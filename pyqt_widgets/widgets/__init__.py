@@ -1,15 +1,22 @@
 # coding=utf-8
 """ Module Docstring.
 
+The widget modules are imported the first time one of their names is used, see pyqt_widgets.lazy.
+
 Author: Ian Davis
 """
 
-from collapsible_widget import *
-from context_menu import *
+import sys
 
-from image_view import *
+from pyqt_widgets.lazy import LazyModule
 
-from message_boxes import *
 
-from prompts import *
-from progress_dialog import *
+sys.modules[__name__] = LazyModule(sys.modules[__name__], (
+    ('collapsible_widget', ('CollapsibleWidget', )),
+    ('context_menu', ('ContextAction', 'ContextMenu', 'show_menu', )),
+    ('image_view', ('image_view', 'ImageLabel', )),
+    ('message_boxes', ('information_message', 'warning_message', 'confirmation_dialog', 'background_message', )),
+    ('prompts', ('UserCancelledPromptException', 'MultipleChoicePrompt', 'text_prompt', 'multiple_choice_prompt',
+                 'save_file_prompt', 'open_file_prompt', 'open_files_prompt', )),
+    ('progress_dialog', ('QProgressNotifier', 'ProgressDialog', )),
+))
@@ -5,8 +5,15 @@ Author: Ian Davis
 Last Updated: 10/13/2015
 """
 
+from PyQt4.QtCore import Qt
 from PyQt4.QtGui import QPixmap
 from PyQt4.QtGui import QLabel
+from PyQt4.QtGui import QWidget
+
+from thumbnails import LRUCache
+from thumbnails import SIZE_BUCKETS
+from thumbnails import size_bucket
+from thumbnails import thumbnail_service
 
 
 def image_view(image_path):
@@ -17,23 +24,61 @@ def image_view(image_path):
     return ImageLabel(image_path)
 
 
+def pixmap_cost(pixmap):
+    return pixmap.width() * pixmap.height() * pixmap.depth() // 8
+
+
+def _bucket_order(bucket):
+    """ Sort key of a size bucket, where None (full resolution) is the largest.
+    """
+    return float('inf') if bucket is None else bucket
+
+
 class ImageLabel(QLabel):
     """ Custom QLabel implementation to make a label that manages displaying an image sized to fit the geometry given to the label.
+
+        Images are decoded in the background by the shared ThumbnailService at about the size the label shows them at,
+        and decoded again at a higher resolution only when the label grows past it, so the label never holds pixels it
+        cannot show. The best image already decoded (or a cached thumbnail) is shown in the meantime, or a loading
+        placeholder when there is none. The decoded pixmaps are kept in pixmap_cache, shared by every ImageLabel.
     """
 
-    def __init__(self, image_path):
-        QLabel.__init__(self)
+    LOADING_TEXT = 'Loading...'
+    FAILED_TEXT = 'Unable to load image'
 
-        self._image_path = image_path
+    # The decoded pixmaps, keyed by (image key, size bucket), see ThumbnailService.image_key.
+    pixmap_cache = LRUCache(32 * 1024 * 1024, cost=pixmap_cost)
+
+    def __init__(self, image_path=None, parent=None):
+        if isinstance(image_path, QWidget):
+            # Created by a .ui form, which only passes the parent.
+            image_path, parent = None, image_path
+
+        QLabel.__init__(self, parent)
+
+        self._image_path = None
+        # The ThumbnailService.image_key of the image when it was last requested.
+        self._image_key = None
+        # The size bucket of the pixmap being shown, and of the decode we are waiting for (None is full resolution).
+        self._shown_bucket = None
+        self._wanted_bucket = None
+        self._waiting = False
+        # Whether the pixmap being shown is the whole image, so decoding it larger would not add anything.
+        self._full_resolution = False
 
         self.setMinimumWidth(1)
         self.setMinimumHeight(1)
 
         self.setFrameStyle(self.Box | self.Plain)
+        self.setAlignment(Qt.AlignCenter)
 
-        self.pixmap = QPixmap(image_path)
+        self.pixmap = QPixmap()
         self.setScaledContents(True)
-        self.setPixmap(self.pixmap)
+
+        self.service = thumbnail_service()
+        self.service.image_ready.connect(self._image_ready)
+
+        self.image_path = image_path
 
     @property
     def image_path(self):
@@ -47,6 +92,131 @@ class ImageLabel(QLabel):
 
         :param new_image_path: The path to the new image to be displayed.
         """
+        self._cancel_request()
+
         self._image_path = new_image_path
-        self.pixmap = QPixmap(new_image_path)
+        self._shown_bucket = None
+        self._waiting = False
+        self._full_resolution = False
+
+        self.pixmap = QPixmap()
+
+        if not new_image_path:
+            self.clear()
+            return
+
+        self.setText(self.LOADING_TEXT)
+        self._request_display_size()
+
+    def display_bucket(self):
+        """ Get the size bucket the image would be decoded at for the label's current size.
+        """
+        contents = self.contentsRect()
+        return size_bucket(max(contents.width(), contents.height(), 1))
+
+    def resizeEvent(self, event):
+        """ Reimplemented from QLabel, to decode the image again when the label grows past the size it was decoded at.
+
+        :param event: The QResizeEvent.
+        """
+        QLabel.resizeEvent(self, event)
+
+        if self._image_path:
+            self._request_display_size()
+
+    def _request_display_size(self):
+        """ Show the image at the label's current size, asking for it to be decoded unless a large enough pixmap is
+            already shown, cached, or on its way.
+        """
+        bucket = self.display_bucket()
+
+        if not self.pixmap.isNull() and (
+                self._full_resolution or _bucket_order(bucket) <= _bucket_order(self._shown_bucket)):
+            return
+
+        if self._waiting and _bucket_order(bucket) <= _bucket_order(self._wanted_bucket):
+            return
+
+        # Stop waiting for a smaller decode in favour of this one.
+        self._cancel_request()
+
+        path = self._image_path
+        image_key = self._image_key = self.service.image_key(path)
+        pixmap = self.pixmap_cache.get((image_key, bucket))
+
+        if pixmap is not None:
+            self._show(bucket, pixmap)
+            return
+
+        self._waiting = True
+        self._wanted_bucket = bucket
+        image = self.service.request(path, bucket)
+
+        if image is not None:
+            self._add_image(bucket, image, (image_key, bucket) in self.service.memory_cache)
+
+        if not self.pixmap.isNull():
+            return
+
+        # Show a smaller pixmap while the larger one is decoded.
+        for smaller in reversed(SIZE_BUCKETS):
+            if _bucket_order(smaller) >= _bucket_order(bucket):
+                continue
+
+            pixmap = self.pixmap_cache.get((image_key, smaller))
+
+            if pixmap is not None:
+                self._show(smaller, pixmap)
+                break
+
+    def _cancel_request(self):
+        """ Withdraw the decode we are waiting for, so the service drops it unless another label wants it too.
+        """
+        if self._waiting:
+            self._waiting = False
+            self.service.cancel(self._image_path, self._wanted_bucket)
+
+    def _image_ready(self, path, bucket, image):
+        if not self._waiting or path != self._image_path or bucket != self._wanted_bucket:
+            # An image we no longer want, or that another label asked for.
+            return
+
+        if image is None:
+            self._waiting = False
+
+            if self.pixmap.isNull():
+                self.setText(self.FAILED_TEXT)
+
+            return
+
+        self._add_image(bucket, image, True)
+
+    def _add_image(self, bucket, image, decoded):
+        """ Convert an image from the ThumbnailService to a pixmap, and show it.
+
+        :param bucket: The size bucket the image was asked for at.
+        :param image: The QImage.
+        :param decoded: Whether the image was decoded at that size, in which case it is moved to the shared pixmap
+            cache, rather than being a smaller image to show until then.
+        """
+        pixmap = QPixmap.fromImage(image)
+
+        if decoded:
+            if self._image_key is not None:
+                self.service.memory_cache.discard((self._image_key, bucket))
+                self.pixmap_cache.put((self._image_key, bucket), pixmap)
+
+            self._waiting = False
+            self._show(bucket, pixmap)
+        elif self.pixmap.isNull():
+            # A cached thumbnail, shown until the requested size arrives.
+            self._show(size_bucket(max(image.width(), image.height())), pixmap)
+
+    def _show(self, bucket, pixmap):
+        self.pixmap = pixmap
+        self._shown_bucket = bucket
+
+        full_size = max(pixmap.width(), pixmap.height())
+        self._full_resolution = bucket is None or full_size < bucket
+
         self.setPixmap(self.pixmap)
@@ -5,13 +5,17 @@ Author: Ian Davis
 Last Updated: 12/7/2015
 """
 
+import os
+
+from PyQt4 import QtCore
 from PyQt4 import QtGui
 
 import message_boxes
 import prompts
 
+from media_scanner import MediaScanner, extension_set, media_changes
+
 from pyqt_widgets import os_util
-from pyqt_widgets.util import list_util
 from pyqt_widgets.models import TableModel
 
 from ui.Ui_media_manager import Ui_MediaManagerWindow as MediaManagerInterface
@@ -31,11 +35,16 @@ class MediaManager(QtGui.QWidget):
     :param parent: The qt widget parent of the interface.
     :param interface_class: The compiled ui class to use to display our manager (blank for the default manager ui).
     """
+
+    # The number of milliseconds the media root has to stay unchanged before its changes are applied, see sync_media.
+    SYNC_DELAY = 500
+
     def __init__(self, media_root, table_model=None, supported_extensions=None, parent=None, interface_class=MediaManagerInterface):
         QtGui.QWidget.__init__(self, parent)
 
         self._media_root = media_root
         self._supported_extensions = supported_extensions
+        self._scanner = None
 
         self.ui = interface_class()
         self.ui.setupUi(self)
@@ -51,6 +60,13 @@ class MediaManager(QtGui.QWidget):
 
         self.delete_shortcut = QtGui.QShortcut(QtGui.QKeySequence('Del'), self.ui.media_table_view)
 
+        self._watcher = QtCore.QFileSystemWatcher(self)
+        self._sync_timer = QtCore.QTimer(self)
+        self._sync_timer.setSingleShot(True)
+        self._sync_timer.setInterval(self.SYNC_DELAY)
+        self._synced_files = set()
+
+        self._watch(media_root)
         self._connect_slots()
 
     @property
@@ -61,12 +77,19 @@ class MediaManager(QtGui.QWidget):
 
     @media_root.setter
     def media_root(self, new_root):
-        """ Set the media root, and reload the list view from the new root.
+        """ Set the media root, and reload the list view from the new root, watching it for changes instead of the
+            previous root.
 
         :param new_root: The filepath to use as the new media root.
         :return: None.
         """
+        self.cancel_load()
+        self._sync_timer.stop()
+
         self._media_root = new_root
+        self._watch(new_root)
+
+        self.media_table_model.remove_keys(list(self.media_table_model.table_data))
         self.load_media()
 
     def insert_into_view(self, filename):
@@ -135,22 +158,115 @@ class MediaManager(QtGui.QWidget):
     def load_media(self):
         """ Load supported media files from the media root into our list view.
 
+            The media root is listed on a worker thread (see MediaScanner), with the files added to the model in batches
+            as they are found, so the interface stays responsive on large or slow folders. Loading again cancels a load
+            that is still running, and files that are already in the model are updated in place rather than added twice.
+
         :return: None
         """
-        media_files = os_util.filenames(os_util.list_files(self._media_root))
+        self._start_scan(self._add_scanned_files, self._scan_finished, self._scan_failed)
+
+    def sync_media(self):
+        """ List the media root again, and apply only the files that were added to or removed from it since it was
+            loaded to our model, with a renamed file being removed under its old name and added under its new one.
+
+            This is called automatically once the media root has not changed on disk for SYNC_DELAY milliseconds, with
+            all the changes made until then (a bulk copy, for example) applied together. The directory watcher only
+            reports that the media root changed, not which files did, so the names in the media root are listed again
+            on a worker thread (see MediaScanner), and only the differences reach the model.
+        """
+        if self._scanner is not None:
+            # A load or sync is still running, try again once it is done.
+            self._sync_timer.start()
+            return
 
-        if self._supported_extensions:
-            media_files = list_util.filter_by_value(media_files,
-                                                    list_util.flatten(self._supported_extensions.itervalues()))
+        self._synced_files = set()
+        self._start_scan(self._collect_synced_files, self._sync_finished)
 
-        for filename in media_files:
-            data = {'Name': filename}
-            self.media_table_model.add_row(data)
+    def cancel_load(self):
+        """ Cancel a load_media (or sync_media) that is still running, keeping the files it already added.
+        """
+        if self._scanner is not None:
+            self._scanner.cancel()
+            self._scanner = None
+
+    def is_loading(self):
+        return self._scanner is not None
 
     def load_media_preview(self, table_row):
         file_path = os_util.make_path(self.media_root, table_row['Name'])
         self.ui.media_preview_label.image_path = file_path
 
+    def _watch(self, media_root):
+        """ Watch a media root for changes instead of the directory we were watching.
+        """
+        watched_directories = self._watcher.directories()
+
+        if watched_directories:
+            self._watcher.removePaths(watched_directories)
+
+        if media_root and os.path.isdir(media_root):
+            self._watcher.addPath(media_root)
+
+    def _media_root_changed(self, path):
+        # Every change restarts the timer, so that a bulk copy is applied once it is over instead of once per file.
+        self._sync_timer.start()
+
+    def _start_scan(self, batch_slot, finished_slot, failed_slot=None):
+        """ Start listing the media root on a worker thread, cancelling any listing that is still running.
+
+        :param batch_slot: The slot to call with each batch of filenames found.
+        :param finished_slot: The slot to call when the listing is done.
+        :param failed_slot: Optional slot to call with the error message if the media root cannot be listed.
+        """
+        self.cancel_load()
+
+        self._scanner = MediaScanner(self._media_root, extension_set(self._supported_extensions))
+        self._scanner.files_found.connect(batch_slot)
+        self._scanner.finished.connect(finished_slot)
+
+        if failed_slot is not None:
+            self._scanner.scan_failed.connect(failed_slot)
+
+        self._scanner.start()
+
+    def _collect_synced_files(self, filenames):
+        if self.sender() is self._scanner:
+            self._synced_files.update(filenames)
+
+    def _sync_finished(self):
+        scanner = self.sender()
+
+        if scanner is not self._scanner:
+            return
+
+        self._scanner = None
+
+        if scanner.failed:
+            # Only part of the media root was listed, so the files missing from the listing may still be there.
+            return
+
+        added_files, removed_files = media_changes(self.media_table_model.table_data, self._synced_files)
+        self._synced_files = set()
+
+        self.media_table_model.remove_keys(removed_files)
+        self.media_table_model.add_rows([{'Name': filename} for filename in added_files])
+
+    def _add_scanned_files(self, filenames):
+        if self.sender() is not self._scanner:
+            # A batch from a load that has since been cancelled.
+            return
+
+        self.media_table_model.add_rows([{'Name': filename} for filename in filenames])
+
+    def _scan_failed(self, message):
+        if self.sender() is self._scanner:
+            message_boxes.warning_message('Unable to load media', unicode(message))
+
+    def _scan_finished(self):
+        if self.sender() is self._scanner:
+            self._scanner = None
+
     def _create_file_extension_spec(self):
         file_extension_template = '{description} ({extensions})'
         file_extension_strings = []
@@ -168,3 +284,5 @@ class MediaManager(QtGui.QWidget):
         self.ui.delete_media_button.clicked.connect(self.delete_selected_media)
         self.delete_shortcut.activated.connect(self.delete_selected_media)
         self.ui.media_table_view.row_selected.connect(self.load_media_preview)
+        self._watcher.directoryChanged.connect(self._media_root_changed)
+        self._sync_timer.timeout.connect(self.sync_media)
@@ -0,0 +1,167 @@
+# coding=utf-8
+""" Define a QThread that lists the media files of a directory off the GUI thread, streaming them back in batches.
+
+Author: Ian Davis
+"""
+
+import os
+
+from timeit import default_timer
+
+from PyQt4.QtCore import QThread
+from PyQt4.QtCore import pyqtSignal
+
+try:
+    from os import scandir
+except ImportError:
+    try:
+        from scandir import scandir
+    except ImportError:
+        scandir = None
+
+
+def extension_set(supported_extensions):
+    """ Flatten a dictionary mapping media type descriptions to their extensions into a set of lowercase extensions.
+
+    :param supported_extensions: The dictionary, or None to support every extension.
+    :return: A frozenset of extensions (including their leading dot), or None to support every extension.
+    """
+    if not supported_extensions:
+        return None
+
+    return frozenset(extension.lower() for extensions in supported_extensions.itervalues() for extension in extensions)
+
+
+def is_supported(filename, extensions):
+    """ Get whether a filename has one of a set of extensions, see extension_set.
+    """
+    return extensions is None or os.path.splitext(filename)[1].lower() in extensions
+
+
+def list_filenames(directory):
+    """ Iterate over the names of the files (not directories) in a directory, with os.scandir where it is available so
+        that no extra stat call is made per file on most platforms.
+
+    :param directory: The directory to list.
+    """
+    if scandir is not None:
+        for entry in scandir(directory):
+            try:
+                if entry.is_file():
+                    yield entry.name
+            except OSError:
+                # The file was removed (or cannot be read) since the directory was listed.
+                continue
+
+        return
+
+    for filename in os.listdir(directory):
+        if os.path.isfile(os.path.join(directory, filename)):
+            yield filename
+
+
+def media_changes(loaded_files, listed_files):
+    """ Work out the changes that turn the files loaded in a model into the files listed in the media root, with a
+        renamed file being removed under its old name and added under its new one.
+
+    :param loaded_files: The filenames in the model.
+    :param listed_files: The filenames found in the media root.
+    :return: An (added, removed) tuple of sorted lists of filenames.
+    """
+    loaded_files = set(loaded_files)
+    listed_files = set(listed_files)
+
+    return sorted(listed_files - loaded_files), sorted(loaded_files - listed_files)
+
+
+class MediaScanner(QThread):
+    """ List the supported media files of a directory on a worker thread, emitting the filenames found in batches so
+        that they can be added to a model as they arrive, and stopping early when cancelled.
+
+        A batch is emitted once it holds batch_size filenames, or batch_interval seconds after the last batch, so that
+        the first files show up quickly even on a slow network share.
+    """
+
+    # Emitted with a list of the filenames found since the last batch.
+    files_found = pyqtSignal(object)
+    # Emitted with the error message when the directory cannot be listed.
+    scan_failed = pyqtSignal(str)
+
+    # The scanners that are running, so that a scanner (and its thread) is not destroyed while it runs when whatever
+    # started it goes away.
+    _running = set()
+
+    def __init__(self, directory, extensions=None, batch_size=1000, batch_interval=0.1, parent=None):
+        """ MediaScanner initializer
+
+        :param directory: The directory to list.
+        :param extensions: Optional set of lowercase extensions to list the files of, see extension_set.
+        :param batch_size: The largest number of filenames to emit at a time.
+        :param batch_interval: The longest time in seconds to hold the filenames found before emitting them.
+        :param parent: The QT Parent object.
+        """
+        QThread.__init__(self, parent)
+
+        self.directory = directory
+        self.extensions = extensions
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
+
+        self._cancelled = False
+        self._failed = False
+
+    @property
+    def cancelled(self):
+        return self._cancelled
+
+    @property
+    def failed(self):
+        """ Whether the directory could not be listed (see scan_failed), in which case only part of it was listed.
+        """
+        return self._failed
+
+    def start(self):
+        """ Start the scan on a new thread.
+        """
+        MediaScanner._running.add(self)
+        self.finished.connect(self._release)
+
+        QThread.start(self)
+
+    def cancel(self):
+        """ Stop the scan at the next file. Batches that were emitted before then may still be delivered to slots in
+            other threads, so receivers should check that sender() is the scan they are waiting for.
+        """
+        self._cancelled = True
+
+    def run(self):
+        batch = []
+        last_batch = default_timer()
+
+        try:
+            for filename in list_filenames(self.directory):
+                if self._cancelled:
+                    return
+
+                if not is_supported(filename, self.extensions):
+                    continue
+
+                batch.append(filename)
+
+                if len(batch) >= self.batch_size or default_timer() - last_batch >= self.batch_interval:
+                    self.files_found.emit(batch)
+                    batch = []
+                    last_batch = default_timer()
+        except OSError as error:
+            self._failed = True
+
+            if not self._cancelled:
+                self.scan_failed.emit(str(error))
+
+            return
+
+        if batch and not self._cancelled:
+            self.files_found.emit(batch)
+
+    def _release(self):
+        MediaScanner._running.discard(self)
@@ -8,7 +8,7 @@ Last Updated: 11/13/2015
 from PyQt4 import QtGui
 from PyQt4 import QtCore
 
-from ui.Ui_progress_dialog import Ui_progress_dialog as ProgressDialogInterface
+from ui.form_loader import DeferredForm
 
 
 class QProgressNotifier(QtCore.QObject):
@@ -79,33 +79,47 @@ class QProgressNotifier(QtCore.QObject):
         self.reset_.emit()
 
 
-class ProgressDialog(QtGui.QWidget):
+class ProgressDialog(DeferredForm, QtGui.QWidget):
     """ Manage a popup dialog with a progress bar and log window to display status of a long-running operation.
 
+        The widgets of the dialog are not built until it is first shown (see DeferredForm), with the progress and log
+        lines reported before then kept until they are.
+
     :param total_steps: The number of steps that will be executed in the operation.
     :param parent: The parent object of the QWidget.
     """
     operation_cancelled = QtCore.pyqtSignal()
 
+    form_name = 'progress_dialog'
+
     def __init__(self, operation_description=None, total_steps=100, parent=None):
         QtGui.QWidget.__init__(self, parent)
 
-        self.ui = ProgressDialogInterface()
-        self.ui.setupUi(self)
-
         self.setWindowFlags(QtCore.Qt.CustomizeWindowHint | QtCore.Qt.WindowTitleHint)
 
-        if operation_description:
-            self.setWindowTitle(operation_description)
-
+        self._operation_description = operation_description
         self._current_step = 0
         self._total_steps = total_steps
-
-        self.ui.progress_bar.setMaximum(self._total_steps)
+        self._finished = False
+        self._pending_log = []
 
         # self.close_timer = QtCore.QTimer()
         # self.auto_close_seconds = 5
 
+    def setup_form(self):
+        """ Apply the progress and log lines reported so far to the widgets of the dialog, once they are built.
+        """
+        if self._operation_description:
+            self.setWindowTitle(self._operation_description)
+
+        self.ui.progress_bar.setMaximum(self._total_steps)
+        self.ui.progress_bar.setValue(self._current_step)
+
+        for line in self._pending_log:
+            self.ui.log_window.append(line)
+
+        self._pending_log = []
+        self._update_buttons()
         self._connect_slots()
 
     @property
@@ -121,7 +135,9 @@ class ProgressDialog(QtGui.QWidget):
         :param new_step: The new step number to jump too.
         """
         self._current_step = new_step
-        self.ui.progress_bar.setValue(self._current_step)
+
+        if self.form_built:
+            self.ui.progress_bar.setValue(self._current_step)
 
     @property
     def total_steps(self):
@@ -136,7 +152,9 @@ class ProgressDialog(QtGui.QWidget):
         :param new_steps: The total number of steps for the operation.
         """
         self._total_steps = new_steps
-        self.ui.progress_bar.setMaximum(self._total_steps)
+
+        if self.form_built:
+            self.ui.progress_bar.setMaximum(self._total_steps)
 
     def notify_operation(self, operation_description):
         """ Append a line of text to the log window
@@ -148,7 +166,10 @@ class ProgressDialog(QtGui.QWidget):
         else:
             shortened_message = operation_description
 
-        self.ui.log_window.append(shortened_message)
+        if self.form_built:
+            self.ui.log_window.append(shortened_message)
+        else:
+            self._pending_log.append(shortened_message)
 
     def complete_step(self, operation_description=None):
         """ Complete the next step in the operation, writing an optional step description to the log window.
@@ -168,11 +189,10 @@ class ProgressDialog(QtGui.QWidget):
             self.notify_operation(finished_message)
 
         self.current_step = self.total_steps
+        self._finished = True
 
         # self.ui.background_button.setText("Finish (Auto-close in 5)")
-        self.ui.background_button.setText("Finish")
-
-        self.ui.cancel_button.setEnabled(False)
+        self._update_buttons()
         # self.close_timer.start(1000)
 
     def reset(self):
@@ -181,8 +201,19 @@ class ProgressDialog(QtGui.QWidget):
         # self.close_timer.stop()
         # self.auto_close_seconds = 5
         self.current_step = 0
-        self.ui.cancel_button.setEnabled(True)
-        self.ui.background_button.setText("Background")
+        self._finished = False
+        self._update_buttons()
+
+    def _update_buttons(self):
+        if not self.form_built:
+            return
+
+        if self._finished:
+            self.ui.background_button.setText("Finish")
+            self.ui.cancel_button.setEnabled(False)
+        else:
+            self.ui.background_button.setText("Background")
+            self.ui.cancel_button.setEnabled(True)
 
     def _update_button_timer(self):
         self.auto_close_seconds -= 1
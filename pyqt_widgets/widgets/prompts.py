@@ -10,15 +10,15 @@ from PyQt4.QtGui import QInputDialog, QLineEdit
 from PyQt4.QtCore import QDir
 from PyQt4.QtGui import QFileDialog
 
-from ui.Ui_multiple_choice import Ui_MultipleChoiceDialog as MultipleChoiceInterface
+from ui.form_loader import DeferredForm
 
 
 class UserCancelledPromptException(Exception):
     pass
 
 
-class MultipleChoicePrompt(QDialog):
-    """
+class MultipleChoicePrompt(DeferredForm, QDialog):
+    """ The widgets of the prompt are not built until it is first shown (see DeferredForm).
 
     :param title:
     :param message:
@@ -26,6 +26,8 @@ class MultipleChoicePrompt(QDialog):
     :param parent:
     """
 
+    form_name = 'multiple_choice'
+
     def __init__(self, title, message, options, parent=None):
         QDialog.__init__(self, parent)
 
@@ -33,12 +35,14 @@ class MultipleChoicePrompt(QDialog):
         self._message = message
         self._options = options
 
-        self.ui = MultipleChoiceInterface()
-        self.ui.setupUi(self)
-
         self.title = title
-        self.message = message
-        self.options = options
+
+    def setup_form(self):
+        """ Apply the title, message and options to the widgets of the prompt, once they are built.
+        """
+        self.title = self._title
+        self.message = self._message
+        self.options = self._options
 
         self._connect_slots()
 
@@ -80,7 +84,9 @@ class MultipleChoicePrompt(QDialog):
 
         :param new_message:
         """
-        self.ui.combo_label.setText(new_message)
+        if self.form_built:
+            self.ui.combo_label.setText(new_message)
+
         self._message = new_message
 
     @property
@@ -96,8 +102,10 @@ class MultipleChoicePrompt(QDialog):
 
         :param new_options:
         """
-        self.ui.main_combo.clear()
-        self.ui.main_combo.addItems(new_options)
+        if self.form_built:
+            self.ui.main_combo.clear()
+            self.ui.main_combo.addItems(new_options)
+
         self._options = new_options
 
     def selected_option(self):
@@ -0,0 +1,447 @@
+# coding=utf-8
+""" Define a service that decodes and downscales images on a pool of worker threads, keeping the results in a memory LRU
+cache and small thumbnails in an LRU cache on disk, so previews of large images never decode them on the GUI thread.
+
+Author: Ian Davis
+"""
+
+import hashlib
+import os
+import threading
+
+from collections import OrderedDict as OrderedDictionary
+
+from PyQt4.QtCore import QObject
+from PyQt4.QtCore import QRunnable
+from PyQt4.QtCore import QSize
+from PyQt4.QtCore import QThreadPool
+from PyQt4.QtCore import Qt
+from PyQt4.QtCore import pyqtSignal
+from PyQt4.QtGui import QImage
+from PyQt4.QtGui import QImageReader
+
+
+# The largest edge of the thumbnails that are kept on disk.
+THUMBNAIL_SIZE = 256
+
+# Sizes are rounded up to one of these (or to full resolution past the last one), so that requests for similar sizes
+# share their decoded images.
+SIZE_BUCKETS = (THUMBNAIL_SIZE, 512, 1024, 2048, 4096, )
+
+
+def size_bucket(size):
+    """ Round the largest edge an image is wanted at up to the size it will be decoded at.
+
+    :param size: The largest edge in pixels, or None for full resolution.
+    :return: One of SIZE_BUCKETS, or None for full resolution.
+    """
+    if size is None:
+        return None
+
+    for bucket in SIZE_BUCKETS:
+        if size <= bucket:
+            return bucket
+
+    return None
+
+
+def image_cost(image):
+    return image.byteCount()
+
+
+class LRUCache(object):
+    """ Least recently used cache holding values up to a total cost, such as the bytes of a number of images.
+    """
+
+    def __init__(self, limit, cost=image_cost):
+        """ LRUCache initializer
+
+        :param limit: The total cost of the values to keep.
+        :param cost: A callable returning the cost of a value.
+        """
+        self.limit = limit
+        self.cost = cost
+        self.total = 0
+
+        self._values = OrderedDictionary()
+
+    def get(self, key, default=None):
+        """ Get a value, marking it as the most recently used.
+        """
+        value = self._values.pop(key, None)
+
+        if value is None:
+            return default
+
+        self._values[key] = value
+        return value
+
+    def put(self, key, value):
+        """ Add a value, discarding the least recently used values until the total cost fits under the limit. A value
+            costing more than the whole limit is not kept at all.
+        """
+        self.discard(key)
+
+        cost = self.cost(value)
+
+        if cost > self.limit:
+            return
+
+        self._values[key] = value
+        self.total += cost
+
+        while self.total > self.limit:
+            discarded_key, discarded_value = self._values.popitem(last=False)
+            self.total -= self.cost(discarded_value)
+
+    def discard(self, key):
+        value = self._values.pop(key, None)
+
+        if value is not None:
+            self.total -= self.cost(value)
+
+    def clear(self):
+        self._values.clear()
+        self.total = 0
+
+    def __contains__(self, key):
+        return key in self._values
+
+    def __len__(self):
+        return len(self._values)
+
+
+class DiskCache(object):
+    """ Directory of thumbnail images named after the path, modification time and size of the image they were made from
+        (so an image that changes gets a new thumbnail), pruned least recently used first down to a number of bytes.
+
+        Thumbnails are read on the GUI thread (they are small), and written and pruned on the worker threads.
+    """
+
+    # The number of thumbnails written between checks of the size of the cache.
+    PRUNE_INTERVAL = 64
+
+    def __init__(self, directory, limit=256 * 1024 * 1024):
+        """ DiskCache initializer
+
+        :param directory: The directory to keep the thumbnails in.
+        :param limit: The number of bytes to prune the directory down to.
+        """
+        self.directory = directory
+        self.limit = limit
+
+        self._writes = 0
+        self._writes_lock = threading.Lock()
+        self._prune_lock = threading.Lock()
+
+    def path_of(self, image_key):
+        """ Get the path of the thumbnail of an image.
+
+        :param image_key: The (path, modification time, size) of the image.
+        """
+        digest = hashlib.sha1(repr(image_key)).hexdigest()
+        return os.path.join(self.directory, digest + '.png')
+
+    def read(self, image_key):
+        """ Read the thumbnail of an image, marking it as recently used.
+
+        :return: QImage, or None if there is no thumbnail of the image.
+        """
+        thumbnail_path = self.path_of(image_key)
+
+        if not os.path.exists(thumbnail_path):
+            return None
+
+        image = QImage(thumbnail_path)
+
+        if image.isNull():
+            return None
+
+        try:
+            os.utime(thumbnail_path, None)
+        except OSError:
+            pass
+
+        return image
+
+    def write(self, image_key, image):
+        """ Write the thumbnail of an image, ignoring failures (a full disk or read-only cache only means the thumbnail
+            is decoded again next time).
+        """
+        thumbnail_path = self.path_of(image_key)
+        temporary_path = '{path}.{thread}.tmp'.format(path=thumbnail_path, thread=threading.current_thread().ident)
+
+        try:
+            if not os.path.isdir(self.directory):
+                os.makedirs(self.directory)
+
+            if not image.save(temporary_path, 'PNG'):
+                return
+
+            if os.name == 'nt' and os.path.exists(thumbnail_path):
+                os.remove(thumbnail_path)
+
+            os.rename(temporary_path, thumbnail_path)
+        except OSError:
+            return
+
+        # Thumbnails are written from several worker threads at once.
+        with self._writes_lock:
+            self._writes += 1
+            prune = not self._writes % self.PRUNE_INTERVAL
+
+        if prune:
+            self.prune()
+
+    def prune(self):
+        """ Remove the least recently used thumbnails until the cache fits under its limit.
+        """
+        if not self._prune_lock.acquire(False):
+            # Another thread is already pruning.
+            return
+
+        try:
+            entries = []
+
+            for filename in os.listdir(self.directory):
+                path = os.path.join(self.directory, filename)
+
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+            total = sum(size for mtime, size, path in entries)
+            entries.sort()
+
+            for mtime, size, path in entries:
+                if total <= self.limit:
+                    break
+
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+
+                total -= size
+        except OSError:
+            pass
+        finally:
+            self._prune_lock.release()
+
+
+class _DecodeTask(QRunnable):
+    """ Decode an image at a given size on a worker thread, handing the result back to the ThumbnailService.
+    """
+
+    def __init__(self, service, request_key, image_key):
+        QRunnable.__init__(self)
+
+        self.service = service
+        self.request_key = request_key
+        self.image_key = image_key
+
+    def run(self):
+        service = self.service
+        path, bucket = self.request_key
+
+        if not service.is_pending(self.request_key):
+            # Cancelled before it started.
+            return
+
+        reader = QImageReader(path)
+        full_size = reader.size()
+
+        if bucket is not None and full_size.isValid() and max(full_size.width(), full_size.height()) > bucket:
+            reader.setScaledSize(full_size.scaled(QSize(bucket, bucket), Qt.KeepAspectRatio))
+
+        image = reader.read()
+
+        if image.isNull():
+            service.image_decoded.emit(self.request_key, self.image_key, None)
+            return
+
+        if service.disk_cache is not None and self.image_key is not None and not service.has_thumbnail(self.image_key):
+            if max(image.width(), image.height()) <= THUMBNAIL_SIZE:
+                thumbnail = image
+            else:
+                thumbnail = image.scaled(THUMBNAIL_SIZE, THUMBNAIL_SIZE, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+
+            service.disk_cache.write(self.image_key, thumbnail)
+
+        service.image_decoded.emit(self.request_key, self.image_key, image)
+
+
+class ThumbnailService(QObject):
+    """ Decode images at a requested size on a QThreadPool, using QImageReader's scaled decoding so that only the pixels
+        that will be shown are ever decoded.
+
+        request returns the best image already available (from the memory cache, or a thumbnail from the disk cache) so
+        that something can be shown right away, and image_ready is emitted once the image is decoded at the size that
+        was asked for. Decoded images are kept in a memory LRU cache, and a small thumbnail of every decoded image is
+        kept on disk, both keyed by the path, modification time and size of the image file (see image_key), so an image
+        that changes on disk is decoded again.
+    """
+
+    # Emitted with the path, size bucket (None for full resolution) and QImage of a decoded image, or None as the image
+    # if it could not be decoded.
+    image_ready = pyqtSignal(object, object, object)
+
+    # Emitted from the worker threads with the (path, size bucket) of the request, the image_key of the image file when
+    # it was requested, and the decoded QImage.
+    image_decoded = pyqtSignal(object, object, object)
+
+    def __init__(self, memory_limit=64 * 1024 * 1024, cache_directory=None, max_threads=None, parent=None):
+        """ ThumbnailService initializer
+
+        :param memory_limit: The number of bytes of decoded images to keep in memory.
+        :param cache_directory: The directory to keep thumbnails in, defaults to ~/.cache/pyqt_widgets/thumbnails, or
+            False to not keep thumbnails on disk.
+        :param max_threads: Optional number of worker threads, defaults to the number of processors.
+        :param parent: The QT Parent object.
+        """
+        QObject.__init__(self, parent)
+
+        if cache_directory is None:
+            cache_root = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+            cache_directory = os.path.join(cache_root, 'pyqt_widgets', 'thumbnails')
+
+        self.memory_cache = LRUCache(memory_limit)
+        self.disk_cache = DiskCache(cache_directory) if cache_directory else None
+
+        self.pool = QThreadPool(self)
+
+        if max_threads:
+            self.pool.setMaxThreadCount(max_threads)
+
+        # The number of requesters still waiting for each (path, size bucket) being decoded.
+        self._pending = {}
+
+        self.image_decoded.connect(self._image_decoded)
+
+    def request(self, path, size=None):
+        """ Ask for an image at a given size, decoding it in the background unless it is already in memory (or, for the
+            thumbnail size, on disk).
+
+        :param path: The path of the image file.
+        :param size: The largest edge the image will be shown at, or None for full resolution.
+        :return: The best image available right away: the image at the requested size if it is in memory, otherwise
+            the largest smaller image in memory or the thumbnail on disk, or None if there is nothing to show yet.
+        """
+        bucket = size_bucket(size)
+        request_key = (path, bucket)
+        image_key = self.image_key(path)
+
+        if image_key is not None:
+            image = self.memory_cache.get((image_key, bucket))
+
+            if image is not None:
+                return image
+
+        if bucket == THUMBNAIL_SIZE and self.disk_cache is not None and image_key is not None:
+            thumbnail = self.disk_cache.read(image_key)
+
+            if thumbnail is not None:
+                self.memory_cache.put((image_key, bucket), thumbnail)
+                return thumbnail
+
+        if request_key in self._pending:
+            self._pending[request_key] += 1
+        else:
+            self._pending[request_key] = 1
+            self.pool.start(_DecodeTask(self, request_key, image_key))
+
+        return self._best_available(path, bucket, image_key)
+
+    def cancel(self, path, size=None):
+        """ Withdraw a request that has not been answered with image_ready yet. Every request that did not return the
+            image at the requested size has to be answered or withdrawn: the image is only dropped (without being
+            decoded if it has not started decoding yet) once every requester withdrew.
+
+        :param path: The path of the image file.
+        :param size: The size that was requested.
+        """
+        request_key = (path, size_bucket(size))
+        requesters = self._pending.get(request_key)
+
+        if requesters is None:
+            return
+        elif requesters > 1:
+            self._pending[request_key] = requesters - 1
+        else:
+            del self._pending[request_key]
+
+    def is_pending(self, request_key):
+        return request_key in self._pending
+
+    def has_thumbnail(self, image_key):
+        return os.path.exists(self.disk_cache.path_of(image_key))
+
+    def wait(self, milliseconds=-1):
+        """ Wait for every decode that has been started to finish.
+        """
+        return self.pool.waitForDone(milliseconds)
+
+    def image_key(self, path):
+        """ Get the (path, modification time, size) key of an image file, or None if it cannot be read. Images are
+            kept in the memory cache under (image key, size bucket) tuples.
+        """
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+
+        return os.path.abspath(path), stat.st_mtime, stat.st_size
+
+    def _best_available(self, path, bucket, image_key):
+        """ Get the largest image smaller than a size bucket that is in memory, or the thumbnail on disk.
+        """
+        if image_key is None:
+            return None
+
+        smaller_buckets = [smaller for smaller in SIZE_BUCKETS if bucket is None or smaller < bucket]
+
+        for smaller in reversed(smaller_buckets):
+            image = self.memory_cache.get((image_key, smaller))
+
+            if image is not None:
+                return image
+
+        if self.disk_cache is None:
+            return None
+
+        thumbnail = self.disk_cache.read(image_key)
+
+        if thumbnail is not None:
+            self.memory_cache.put((image_key, THUMBNAIL_SIZE), thumbnail)
+
+        return thumbnail
+
+    def _image_decoded(self, request_key, image_key, image):
+        if request_key not in self._pending:
+            # Cancelled while it was decoding.
+            return
+
+        del self._pending[request_key]
+        path, bucket = request_key
+
+        if image is not None and image_key is not None:
+            self.memory_cache.put((image_key, bucket), image)
+
+        self.image_ready.emit(path, bucket, image)
+
+
+_service = None
+
+
+def thumbnail_service():
+    """ Get the ThumbnailService shared by every widget, creating it the first time.
+    """
+    global _service
+
+    if _service is None:
+        _service = ThumbnailService()
+
+    return _service
@@ -0,0 +1,179 @@
+# coding=utf-8
+""" Load the Ui_* form classes straight from the .ui files in this package, compiling each file once into a cached code
+object, and let widgets defer building their form until they are first shown.
+
+The compiled code is cached under ~/.cache/pyqt_widgets/ui (or $XDG_CACHE_HOME/pyqt_widgets/ui), along with the
+modification time and size of the .ui file it was compiled from, and is compiled again whenever the .ui file changes.
+
+Author: Ian Davis
+"""
+
+import hashlib
+import imp
+import marshal
+import os
+import tempfile
+
+from cStringIO import StringIO
+
+from PyQt4 import uic
+from PyQt4.QtCore import PYQT_VERSION_STR
+
+
+UI_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+
+_forms = {}
+
+
+def cache_directory():
+    """ Get the directory the compiled forms are cached in.
+    """
+    cache_root = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(cache_root, 'pyqt_widgets', 'ui')
+
+
+def load_form(form_name, ui_directory=UI_DIRECTORY):
+    """ Get the Ui_* class generated from a .ui file, compiling the file only if it changed since it was last cached.
+
+    :param form_name: The name of the .ui file, without its extension (such as 'progress_dialog').
+    :param ui_directory: The directory holding the .ui file, defaults to this package.
+    :return: The form class, whose setupUi method builds the form on a widget.
+    """
+    ui_path = os.path.join(ui_directory, form_name + '.ui')
+    ui_stat = os.stat(ui_path)
+    stamp = (imp.get_magic(), PYQT_VERSION_STR, ui_stat.st_mtime, ui_stat.st_size)
+
+    form = _forms.get(ui_path)
+
+    if form is not None and form[0] == stamp:
+        return form[1]
+
+    # The path is part of the name of the cache file, so that installs in different places do not share the cache.
+    cache_path = os.path.join(cache_directory(), '{name}-{digest}.formc'.format(
+        name=form_name, digest=hashlib.md5(ui_path).hexdigest()[:12]))
+    code = _read_cache(cache_path, stamp)
+
+    if code is None:
+        code = _compile_form(ui_path)
+        _write_cache(cache_path, stamp, code)
+
+    namespace = {'__name__': 'pyqt_widgets.widgets.ui.Ui_{name}'.format(name=form_name)}
+    exec code in namespace
+
+    form_classes = [value for name, value in namespace.iteritems()
+                    if name.startswith('Ui_') and isinstance(value, type)]
+
+    if len(form_classes) != 1:
+        raise ImportError('{path} does not define a single form class'.format(path=ui_path))
+
+    _forms[ui_path] = stamp, form_classes[0]
+    return form_classes[0]
+
+
+def _compile_form(ui_path):
+    """ Compile a .ui file to a code object.
+    """
+    source = StringIO()
+
+    with open(ui_path) as ui_file:
+        uic.compileUi(ui_file, source)
+
+    return compile(source.getvalue(), ui_path, 'exec')
+
+
+def _read_cache(cache_path, stamp):
+    """ Read a compiled form from the cache.
+
+    :return: The code object, or None if it is not cached, or was cached from a different version of the .ui file.
+    """
+    try:
+        with open(cache_path, 'rb') as cache_file:
+            cached_stamp, code = marshal.load(cache_file)
+    except (IOError, OSError, EOFError, ValueError, TypeError):
+        return None
+
+    if tuple(cached_stamp) != stamp:
+        return None
+
+    return code
+
+
+def _write_cache(cache_path, stamp, code):
+    """ Write a compiled form to the cache, through a temporary file so that readers never see a partial file.
+
+        Failing to write the cache (a read-only home directory, for example) only means compiling the form again next
+        time, so errors are ignored.
+    """
+    directory = os.path.dirname(cache_path)
+
+    try:
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+        descriptor, temporary_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+
+        with os.fdopen(descriptor, 'wb') as cache_file:
+            marshal.dump((stamp, code), cache_file)
+
+        if os.name == 'nt' and os.path.exists(cache_path):
+            os.remove(cache_path)
+
+        os.rename(temporary_path, cache_path)
+    except (IOError, OSError):
+        pass
+
+
+class DeferredForm(object):
+    """ Mixin for widgets built from a .ui form, that builds the form the first time the widget is shown (or its ui is
+        used) instead of when the widget is created. It must come before the QWidget class in the bases:
+
+            class ProgressDialog(DeferredForm, QtGui.QWidget):
+                form_name = 'progress_dialog'
+
+        Subclasses apply their state to the form in setup_form, which is called right after the form is built, and
+        should only touch ui from their setters once form_built is True.
+    """
+
+    form_name = None
+
+    _form = None
+
+    @property
+    def ui(self):
+        """ The form instance, building it on the widget first if it has not been built yet.
+        """
+        return self.build_form()
+
+    @property
+    def form_built(self):
+        return self._form is not None
+
+    def build_form(self):
+        """ Build the form on the widget, unless it has already been built.
+
+        :return: The form instance.
+        """
+        if self._form is None:
+            form = load_form(self.form_name)()
+            form.setupUi(self)
+            self._form = form
+
+            self.setup_form()
+
+        return self._form
+
+    def setup_form(self):
+        """ Called right after the form was built, to apply the widget's state to it and connect its signals.
+        """
+        pass
+
+    def setVisible(self, visible):
+        """ Reimplemented from QWidget (every way of showing a widget ends up here), to build the form before the widget
+            is first shown.
+
+        :param visible: Whether the widget is being shown or hidden.
+        """
+        if visible:
+            self.build_form()
+
+        super(DeferredForm, self).setVisible(visible)
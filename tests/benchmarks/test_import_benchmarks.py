@@ -0,0 +1,20 @@
+""" Benchmarks of the cold import cost of every public name of pyqt_widgets.models and pyqt_widgets.widgets, run with
+pytest-benchmark.
+
+Every round imports the name in a fresh interpreter, so the timings include the interpreter start up, and the time of
+the import statement alone is kept in the extra info of each benchmark.
+"""
+
+import pytest
+
+from pyqt_widgets.diagnostics import import_time
+
+
+pytest.importorskip('pytest_benchmark')
+
+
+@pytest.mark.parametrize('statement', import_time.import_statements())
+def test_cold_import(benchmark, statement):
+    result = benchmark.pedantic(import_time.cold_import, args=(statement, ), rounds=3)
+
+    benchmark.extra_info.update(result)
@@ -0,0 +1,207 @@
+""" Benchmarks of the TableModel and TreeModel operations that scale with the number of rows, run with pytest-benchmark.
+
+The sizes default to 10000 rows so the suite stays quick, set PYQT_WIDGETS_BENCHMARK_SIZES to a comma separated list
+of sizes (such as 10000,100000,1000000) to run the full suite, and see the README for storing a baseline and comparing
+against it.
+"""
+
+import os
+
+import pytest
+
+from PyQt4.QtCore import Qt
+
+from pyqt_widgets.models import TableModel, TreeModel
+
+
+pytest.importorskip('pytest_benchmark')
+
+SIZES = [int(size) for size in os.environ.get('PYQT_WIDGETS_BENCHMARK_SIZES', '10000').split(',')]
+HEADER = ('Column1', 'Column2', 'Column3', 'Column4', )
+
+# The number of rows sampled (evenly across the model) by the index/data sweeps, and edited by the change storms.
+SAMPLE_ROWS = 1000
+
+# Every top level tree node gets this many children.
+TREE_FANOUT = 9
+
+parametrize_sizes = pytest.mark.parametrize('size', SIZES)
+
+
+def make_record(index):
+    return {'Column1': 'Row{0}'.format(index), 'Column2': index, 'Column3': 'Value{0}'.format(index % 97), 'Column4': ''}
+
+
+def make_tree_children(size):
+    """ Build (values, children) tuples for a two level tree with size nodes in total.
+    """
+    parent_count = max(1, size // (TREE_FANOUT + 1))
+    children = []
+
+    for parent_index in xrange(parent_count):
+        first_child = parent_count + parent_index * TREE_FANOUT
+        grandchildren = [make_record(index) for index in xrange(first_child, first_child + TREE_FANOUT)]
+        children.append((make_record(parent_index), grandchildren))
+
+    return children
+
+
+def make_table_model(size):
+    table_model = TableModel(HEADER)
+
+    for index in xrange(size):
+        table_model.add_row(make_record(index))
+
+    return table_model
+
+
+def make_tree_model(size):
+    tree_model = TreeModel(HEADER)
+    tree_model.add_nodes(None, make_tree_children(size))
+
+    return tree_model
+
+
+def sample_rows(row_count):
+    return xrange(0, row_count, max(1, row_count // SAMPLE_ROWS))
+
+
+_models = {}
+
+
+def cached_model(factory, size):
+    """ Models for the read-only benchmarks are built once per size and shared.
+    """
+    key = (factory, size)
+
+    if key not in _models:
+        _models[key] = factory(size)
+
+    return _models[key]
+
+
+@parametrize_sizes
+def test_table_ingest(benchmark, size):
+    records = [make_record(index) for index in xrange(size)]
+
+    def ingest():
+        table_model = TableModel(HEADER)
+
+        for record in records:
+            table_model.add_row(record)
+
+    benchmark.pedantic(ingest, rounds=3)
+
+
+@parametrize_sizes
+def test_tree_ingest(benchmark, size):
+    children = make_tree_children(size)
+
+    benchmark.pedantic(lambda: TreeModel(HEADER).add_nodes(None, children), rounds=3)
+
+
+@parametrize_sizes
+def test_tree_build_from_records(benchmark, size):
+    records = []
+
+    for index in xrange(size):
+        record = make_record(index)
+        record['Parent'] = 'Row{0}'.format((index - 1) // TREE_FANOUT) if index else None
+        records.append(record)
+
+    benchmark.pedantic(lambda: TreeModel(HEADER).build_from_records(records, 'Parent'), rounds=3)
+
+
+@parametrize_sizes
+def test_table_sweep(benchmark, size):
+    table_model = cached_model(make_table_model, size)
+    columns = xrange(len(HEADER))
+
+    def sweep():
+        for row in sample_rows(size):
+            for column in columns:
+                table_model.data(table_model.index(row, column), Qt.DisplayRole)
+
+    benchmark.pedantic(sweep, rounds=3)
+
+
+@parametrize_sizes
+def test_tree_sweep(benchmark, size):
+    tree_model = cached_model(make_tree_model, size)
+    columns = xrange(len(HEADER))
+
+    def sweep():
+        for row in sample_rows(tree_model.rowCount()):
+            parent_index = tree_model.index(row, 0)
+            tree_model.parent(parent_index)
+
+            for child_row in xrange(tree_model.rowCount(parent_index)):
+                for column in columns:
+                    index = tree_model.index(child_row, column, parent_index)
+                    tree_model.data(index, Qt.DisplayRole)
+                    tree_model.parent(index)
+
+    benchmark.pedantic(sweep, rounds=3)
+
+
+@parametrize_sizes
+def test_table_match_pattern(benchmark, size):
+    table_model = cached_model(make_table_model, size)
+
+    benchmark(table_model.match_pattern, 2, 'Value1')
+
+
+@parametrize_sizes
+def test_tree_filter_nodes(benchmark, size):
+    tree_model = cached_model(make_tree_model, size)
+
+    def filter_nodes():
+        tree_model.filter_nodes(2, 'Value1')
+        tree_model.clear_filter()
+
+    benchmark(filter_nodes)
+
+
+@parametrize_sizes
+def test_table_remove(benchmark, size):
+    def setup():
+        table_model = make_table_model(size)
+        return (table_model, table_model.table_data.values()[::2]), {}
+
+    benchmark.pedantic(lambda table_model, table_rows: table_model.remove_table_rows(table_rows), setup=setup,
+                       rounds=3)
+
+
+@parametrize_sizes
+def test_tree_remove(benchmark, size):
+    def setup():
+        tree_model = make_tree_model(size)
+        return (tree_model, tree_model.root.children.values()[::2]), {}
+
+    benchmark.pedantic(lambda tree_model, nodes: tree_model.remove_nodes(nodes), setup=setup, rounds=3)
+
+
+@parametrize_sizes
+def test_table_change_storm(benchmark, size):
+    table_model = cached_model(make_table_model, size)
+    table_rows = table_model.table_data.values()
+    edited_rows = [table_rows[row] for row in sample_rows(size)]
+
+    def storm():
+        for table_row in edited_rows:
+            table_row['Column4'] = table_row['Column4'] + 'x'
+
+    benchmark(storm)
+
+
+@parametrize_sizes
+def test_tree_change_storm(benchmark, size):
+    tree_model = cached_model(make_tree_model, size)
+    nodes = tree_model.root.children.values()
+    edited_nodes = [nodes[row].children.at(0) for row in sample_rows(len(nodes))]
+
+    def storm():
+        for node in edited_nodes:
+            node['Column4'] = node['Column4'] + 'x'
+
+    benchmark(storm)
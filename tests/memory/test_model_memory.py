@@ -0,0 +1,146 @@
+""" Memory regression tests, which add and remove rows from the models in a loop and check that removed rows are freed
+and that memory stays flat from one cycle to the next.
+
+The number of rows per cycle defaults to a size that runs quickly, set PYQT_WIDGETS_MEMORY_ROWS (to 1000000 for the
+full soak test) to change it. Memory is measured with tracemalloc where it is available, and by counting the objects
+tracked by the garbage collector otherwise.
+
+test_bytes_per_row also keeps the python heap bytes per row (see pyqt_widgets.diagnostics.footprint) under a budget,
+measured with tracemalloc where it is available and by adding up sys.getsizeof of the objects built otherwise.
+"""
+
+import gc
+import os
+import weakref
+
+import pytest
+
+from pyqt_widgets.diagnostics import footprint
+from pyqt_widgets.models import TableModel, TreeModel
+
+
+ROW_COUNT = int(os.environ.get('PYQT_WIDGETS_MEMORY_ROWS', 10000))
+CYCLES = 4
+HEADER = ('Column1', 'Column2', 'Column3', )
+
+# Allowed growth between the first and last cycle, per row added in a cycle.
+BYTES_PER_ROW_SLACK = 4
+OBJECTS_PER_ROW_SLACK = 0.01
+
+# Python heap bytes a row of HEADER may cost, not counting its cell values or the C++ side of its QObject.
+BYTES_PER_ROW_BUDGET = {'table': 2048, 'tree': 4096}
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+
+def make_record(index):
+    return {'Column1': 'Row{0}'.format(index), 'Column2': index, 'Column3': 'Value{0}'.format(index)}
+
+
+def measure():
+    gc.collect()
+
+    if tracemalloc is not None:
+        return tracemalloc.get_traced_memory()[0]
+
+    return len(gc.get_objects())
+
+
+def assert_flat(run_cycle):
+    """ Run a number of add/remove cycles, checking that the rows of every cycle are freed and that memory after the
+        last cycle has not grown past the memory after the first one.
+
+    :param run_cycle: Callable running one cycle, returning weak references to the rows it removed.
+    """
+    if tracemalloc is not None:
+        tracemalloc.start()
+
+    try:
+        measurements = []
+
+        for cycle in xrange(CYCLES):
+            removed_rows = run_cycle()
+            measurements.append(measure())
+
+            assert not [row for row in removed_rows if row() is not None]
+    finally:
+        if tracemalloc is not None:
+            tracemalloc.stop()
+
+    if tracemalloc is not None:
+        assert measurements[-1] - measurements[0] <= ROW_COUNT * BYTES_PER_ROW_SLACK
+    else:
+        assert measurements[-1] - measurements[0] <= ROW_COUNT * OBJECTS_PER_ROW_SLACK
+
+
+def test_table_rows_released():
+    table_model = TableModel(HEADER)
+
+    def run_cycle():
+        table_rows = [table_model.add_row(make_record(index)) for index in xrange(ROW_COUNT)]
+        table_model.remove_table_rows(table_rows)
+
+        return [weakref.ref(table_row) for table_row in table_rows]
+
+    assert_flat(run_cycle)
+    assert table_model.rowCount() == 0
+
+
+def test_tree_nodes_released():
+    tree_model = TreeModel(HEADER, rollup_columns=('Column2', ))
+    tree_model.filter_nodes(0, 'Row1')
+
+    def run_cycle():
+        parents = tree_model.add_nodes(None, [make_record(index) for index in xrange(ROW_COUNT // 10)])
+        removed_nodes = list(parents)
+
+        for parent_index, parent in enumerate(parents):
+            children = [make_record(ROW_COUNT + parent_index * 10 + index) for index in xrange(9)]
+            removed_nodes.extend(tree_model.add_nodes(parent, children))
+
+        tree_model.remove_nodes(parents)
+        tree_model.flush_rollups()
+
+        return [weakref.ref(node) for node in removed_nodes]
+
+    assert_flat(run_cycle)
+    assert tree_model.rowCount() == 0
+    assert not tree_model.nodes_by_key
+
+
+def test_tree_sync_released():
+    tree_model = TreeModel(HEADER)
+    records = [make_record(index) for index in xrange(ROW_COUNT)]
+
+    def run_cycle():
+        tree_model.sync(records)
+        synced_nodes = [weakref.ref(node) for node in tree_model]
+        tree_model.sync([])
+
+        return synced_nodes
+
+    assert_flat(run_cycle)
+    assert not tree_model.nodes_by_key
+
+
+@pytest.mark.parametrize('model_type', ('table', 'tree'))
+def test_bytes_per_row(model_type):
+    build_report = footprint.table_footprint if model_type == 'table' else footprint.tree_footprint
+
+    if tracemalloc is not None:
+        tracemalloc.start()
+
+    try:
+        report = build_report(ROW_COUNT, len(HEADER))
+    finally:
+        if tracemalloc is not None:
+            tracemalloc.stop()
+
+    python_bytes = dict((label, python_per_row) for label, python_per_row, process_per_row in report.lines)
+    total = [python_per_row for label, python_per_row in python_bytes.iteritems() if label.startswith('total')][0]
+
+    assert 0 < total <= BYTES_PER_ROW_BUDGET[model_type]
+    assert python_bytes['alternative: tuples in a list'] < total
@@ -0,0 +1,152 @@
+import pytest
+
+from PyQt4.QtCore import QModelIndex
+from PyQt4.QtCore import Qt
+
+from pyqt_widgets.models import TreeModel, TreeFlattenProxyModel, FenwickTree
+
+
+TREE_HEADER = ('Column1', 'Column2', )
+
+
+@pytest.fixture
+def tree_model():
+    model = TreeModel(TREE_HEADER)
+
+    first_node = model.add_node({'Column1': 'A'}, children=[{'Column1': 'A1'},
+                                                             ({'Column1': 'A2'}, [{'Column1': 'A2a'}, {'Column1': 'A2b'}]),
+                                                             {'Column1': 'A3'}])
+    model.add_node({'Column1': 'B'}, children=[{'Column1': 'B1'}])
+    model.add_node({'Column1': 'C'})
+
+    return model
+
+
+def visible_keys(proxy_model):
+    return [proxy_model.node_at(row)['Column1'] for row in xrange(proxy_model.rowCount())]
+
+
+def expected_keys(tree_model, proxy_model):
+    """ The visible keys calculated by walking the tree, to check the proxy's indexes against.
+    """
+    keys = []
+    pending = list(reversed(tree_model.root.children.values()))
+
+    while pending:
+        node = pending.pop()
+        keys.append(node['Column1'])
+
+        if proxy_model.is_expanded(node):
+            pending.extend(reversed(node.children.values()))
+
+    return keys
+
+
+def test_fenwick_tree():
+    counts = FenwickTree([1, 3, 1, 2])
+
+    assert counts.total == 7
+    assert counts.prefix_sum(2) == 4
+    assert counts.find(0) == (0, 0)
+    assert counts.find(3) == (1, 2)
+    assert counts.find(6) == (3, 1)
+
+    counts.add(1, -2)
+    counts.append(5)
+
+    assert counts.total == 10
+    assert len(counts) == 5
+    assert [counts.prefix_sum(count) for count in xrange(6)] == [0, 1, 2, 3, 5, 10]
+
+    counts.truncate(2)
+    assert counts.total == 2
+
+
+def test_expand_collapse(qtbot, tree_model):
+    proxy_model = TreeFlattenProxyModel(tree_model)
+    first_node = tree_model.find_node('A')
+    second_node = tree_model.find_node('A2')
+
+    assert visible_keys(proxy_model) == ['A', 'B', 'C']
+
+    with qtbot.waitSignal(proxy_model.rowsInserted, raising=True) as blocker:
+        proxy_model.expand(proxy_model.index(0, 0))
+
+    assert blocker.args == [QModelIndex(), 1, 3]
+    assert visible_keys(proxy_model) == ['A', 'A1', 'A2', 'A3', 'B', 'C']
+
+    proxy_model.expand_node(second_node)
+    assert visible_keys(proxy_model) == ['A', 'A1', 'A2', 'A2a', 'A2b', 'A3', 'B', 'C']
+    assert proxy_model.mapFromSource(tree_model.index_of_node(tree_model.find_node('B'))).row() == 6
+
+    with qtbot.waitSignal(proxy_model.rowsRemoved, raising=True) as blocker:
+        proxy_model.toggle(proxy_model.index(0, 0))
+
+    assert blocker.args == [QModelIndex(), 1, 5]
+    assert visible_keys(proxy_model) == ['A', 'B', 'C']
+    assert not proxy_model.mapFromSource(tree_model.index_of_node(second_node)).isValid()
+
+    proxy_model.expand_node(first_node)
+    assert visible_keys(proxy_model) == ['A', 'A1', 'A2', 'A2a', 'A2b', 'A3', 'B', 'C']
+
+    index = proxy_model.index(3, 0)
+    assert proxy_model.mapToSource(index).internalPointer()['Column1'] == 'A2a'
+    assert proxy_model.data(index, Qt.DisplayRole) == '        A2a'
+    assert proxy_model.data(index, TreeFlattenProxyModel.DepthRole) == 2
+
+
+def test_source_changes(qtbot, tree_model):
+    proxy_model = TreeFlattenProxyModel(tree_model)
+    first_node = tree_model.find_node('A')
+    second_node = tree_model.find_node('A2')
+
+    proxy_model.expand_node(first_node)
+    proxy_model.expand_node(second_node)
+
+    with qtbot.waitSignal(proxy_model.rowsInserted, raising=True) as blocker:
+        tree_model.add_node({'Column1': 'A2c'}, parent=second_node)
+
+    assert blocker.args == [QModelIndex(), 5, 5]
+    assert visible_keys(proxy_model) == expected_keys(tree_model, proxy_model)
+
+    with qtbot.waitSignal(proxy_model.rowsRemoved, raising=True) as blocker:
+        tree_model.remove_node(tree_model.find_node('A1'))
+
+    assert blocker.args == [QModelIndex(), 1, 1]
+    assert visible_keys(proxy_model) == expected_keys(tree_model, proxy_model)
+
+    with qtbot.waitSignal(proxy_model.rowsRemoved, raising=True) as blocker:
+        tree_model.remove_node(second_node)
+
+    assert blocker.args == [QModelIndex(), 1, 4]
+    assert not proxy_model.is_expanded(second_node)
+    assert visible_keys(proxy_model) == ['A', 'A3', 'B', 'C']
+
+    with qtbot.waitSignal(proxy_model.dataChanged, raising=True) as blocker:
+        tree_model.find_node('B')['Column2'] = 'Changed'
+
+    assert blocker.args[0].row() == 2
+
+    with qtbot.waitSignal(proxy_model.modelReset, raising=True):
+        tree_model.move_node(tree_model.find_node('B1'), first_node, 0)
+
+    assert visible_keys(proxy_model) == ['A', 'B1', 'A3', 'B', 'C']
+
+    tree_model.add_node({'Column1': 'A0'}, children=[{'Column1': 'A0a'}], parent=first_node)
+    proxy_model.expand_node(tree_model.find_node('A0'))
+    proxy_model.collapse_node(first_node)
+    proxy_model.expand_node(first_node)
+
+    assert visible_keys(proxy_model) == ['A', 'B1', 'A3', 'A0', 'A0a', 'B', 'C']
+    assert visible_keys(proxy_model) == expected_keys(tree_model, proxy_model)
+
+
+def test_expand_batched_loader(tree_model):
+    tree_model.fetch_batch_size = 2
+    node = tree_model.add_node({'Column1': 'D'}, children=lambda node: ({'Column1': 'D' + str(row)} for row in xrange(5)))
+    proxy_model = TreeFlattenProxyModel(tree_model)
+
+    proxy_model.expand_node(node)
+
+    assert not tree_model.canFetchMore(tree_model.index_of_node(node))
+    assert visible_keys(proxy_model) == ['A', 'B', 'C', 'D', 'D0', 'D1', 'D2', 'D3', 'D4']
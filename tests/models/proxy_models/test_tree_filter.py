@@ -0,0 +1,34 @@
+import pytest
+
+from PyQt4.QtCore import QModelIndex
+
+from pyqt_widgets.models import TreeModel, TreeFilterProxyModel
+
+
+TREE_HEADER = ('Column1', 'Column2', )
+
+
+@pytest.fixture
+def tree_model():
+    model = TreeModel(TREE_HEADER)
+
+    parent_node = model.add_node({'Column1': 'Parent', 'Column2': 'Hidden'})
+    model.add_node({'Column1': 'Child', 'Column2': 'Shown'}, parent=parent_node)
+    model.add_node({'Column1': 'Sibling', 'Column2': 'Hidden'})
+
+    return model
+
+
+def test_filter_accepts_row(tree_model):
+    proxy_model = TreeFilterProxyModel(tree_model)
+    parent_index = tree_model.index(0, 0)
+
+    assert proxy_model.sourceModel() == tree_model
+    assert proxy_model.filterAcceptsRow(1, QModelIndex())
+
+    tree_model.filter_nodes(1, 'Shown')
+
+    assert proxy_model.filterAcceptsRow(0, QModelIndex())
+    assert proxy_model.filterAcceptsRow(0, parent_index)
+    assert not proxy_model.filterAcceptsRow(1, QModelIndex())
+    assert not proxy_model.filterAcceptsRow(5, QModelIndex())
@@ -55,6 +55,72 @@ def test_add_row(qtbot, table_model):
     assert table_row['Column5'] == ''
 
 
+def test_add_row_replace(qtbot, table_model):
+    """ Verify that adding a row with a key already in the table replaces the existing row in place.
+    """
+    for data in TABLE_DATA:
+        table_model.add_row(data)
+
+    replacement = dict(TABLE_DATA[1], Column2='Replaced')
+
+    with qtbot.waitSignal(table_model.dataChanged, raising=True) as blocker:
+        with qtbot.assertNotEmitted(table_model.rowsInserted):
+            table_row = table_model.add_row(replacement)
+
+    assert blocker.args[0].row() == 1
+    assert table_row.row == 1
+    assert table_model.rowCount() == len(TABLE_DATA)
+    assert table_model.table_data['Row2_Column1'] is table_row
+    assert table_model.data(table_model.index(1, 1), Qt.DisplayRole) == 'Replaced'
+
+    with qtbot.waitSignal(table_model.dataChanged, raising=True) as blocker:
+        table_row['Column3'] = 'Changed'
+
+    assert blocker.args[0].row() == 1
+
+
+def test_add_rows(qtbot, table_model):
+    """ Verify that adding a batch of rows inserts the new keys with a single ranged insert, and replaces existing keys
+        in place.
+    """
+    table_model.add_row(TABLE_DATA[0])
+
+    with qtbot.waitSignal(table_model.rowsInserted, raising=True) as blocker:
+        table_rows = table_model.add_rows([TABLE_DATA[1], TABLE_DATA[2], TABLE_DATA[1]])
+
+    assert blocker.args[1:] == [1, 2]
+    assert table_model.rowCount() == 3
+    assert [table_row.row for table_row in table_rows] == [1, 2, 1]
+    assert table_model.table_data['Row2_Column1'] is table_rows[2]
+
+    replacement = dict(TABLE_DATA[0], Column2='Replaced')
+
+    with qtbot.waitSignal(table_model.dataChanged, raising=True) as blocker:
+        with qtbot.assertNotEmitted(table_model.rowsInserted):
+            table_model.add_rows([replacement])
+
+    assert blocker.args[0].row() == 0
+    assert table_model.rowCount() == 3
+    assert table_model.table_data['Row1_Column1']['Column2'] == 'Replaced'
+    assert table_model.add_rows([]) == []
+
+
+def test_remove_keys(qtbot, table_model):
+    """ Verify that removing rows by key removes each contiguous range of rows with a single notification.
+    """
+    table_model.add_rows(TABLE_DATA)
+    removed_ranges = []
+    table_model.rowsRemoved.connect(lambda parent, first, last: removed_ranges.append((first, last)))
+
+    removed_rows = table_model.remove_keys(['Row1_Column1', 'Row3_Column1', 'Row4_Column1', 'Missing'])
+
+    assert removed_ranges == [(2, 3), (0, 0)]
+    assert [table_row['Column1'] for table_row in removed_rows] == ['Row1_Column1', 'Row3_Column1', 'Row4_Column1']
+    assert table_model.rowCount() == 1
+    assert table_model.table_data['Row2_Column1'].row == 0
+    assert table_model.remove_keys(['Missing']) == []
+
+
 def test_remove_rows(qtbot, table_model):
     """ Verify functionality of the various ways of removing rows from the model.
     """
@@ -67,6 +133,9 @@ def test_remove_rows(qtbot, table_model):
     assert table_model.rowCount() == 0
     assert 'Row1Column1' not in table_model.table_data
 
+    with qtbot.assertNotEmitted(table_model.dataChanged):
+        table_row['Column2'] = 'Removed'
+
     table_rows = []
 
     for data in TABLE_DATA:
@@ -92,10 +161,12 @@ def test_data_functions(qtbot, table_model):
 
     assert table_model.data(index, Qt.DisplayRole) == table_row['Column1']
 
-    with qtbot.waitSignal(table_model.dataChanged, raising=True):
+    with qtbot.waitSignal(table_model.dataChanged, raising=True) as blocker:
         with qtbot.waitSignal(table_row.changed, raising=True):
             table_row['Column1'] = 'Row1_Column1_New'
 
+    assert blocker.args == [index, index]
+
     assert table_model.data(index, Qt.DisplayRole) == 'Row1_Column1_New'
     assert table_model.data(index, Qt.TextAlignmentRole) == Qt.AlignCenter
     assert table_model.data(index, Qt.EditRole) == None
@@ -0,0 +1,68 @@
+import pytest
+
+from PyQt4.QtCore import Qt
+
+from pyqt_widgets.models import TableModel
+from pyqt_widgets.models import TreeModel
+from pyqt_widgets.models.basic import BasicModel
+from pyqt_widgets.models.instrumentation import ModelInstrumentation
+from pyqt_widgets.models.instrumentation import format_summary
+from pyqt_widgets.models.tree_models.basic import TreeItem
+
+
+MODEL_HEADER = ('Column1', 'Column2', 'Column3', )
+
+
+@pytest.fixture()
+def instrumentation():
+    instrumentation = ModelInstrumentation(interval=None)
+    yield instrumentation
+    instrumentation.disable()
+
+
+def test_instrumentation_counts(instrumentation):
+    original_data = BasicModel.__dict__['data']
+    original_row = TreeItem.__dict__['row']
+    table_model = TableModel(MODEL_HEADER)
+    table_model.add_row({'Column1': 'Row1', 'Column2': 'Value1', 'Column3': 'Value2'})
+
+    instrumentation.enable()
+    assert instrumentation.enabled
+    assert BasicModel.__dict__['data'] is not original_data
+
+    index = table_model.index(0, 1)
+    assert table_model.data(index, Qt.DisplayRole) == 'Value1'
+    table_model.data(index, Qt.DisplayRole)
+    table_model.data(index, role=Qt.TextAlignmentRole)
+
+    tree_model = TreeModel(MODEL_HEADER)
+    node = tree_model.add_node({'Column1': 'Node1'})
+    assert node.row() == 0
+
+    calls = dict(((row['method'], row['role']), row['calls']) for row in instrumentation.summary())
+    assert calls[('TableModel.index', None)] == 1
+    assert calls[('BasicModel.data', 'DisplayRole')] == 2
+    assert calls[('BasicModel.data', 'TextAlignmentRole')] == 1
+    assert calls[('TreeItem.row', None)] >= 1
+    assert instrumentation.summary() == []
+
+    instrumentation.disable()
+    assert not instrumentation.enabled
+    assert BasicModel.__dict__['data'] is original_data
+    assert TreeItem.__dict__['row'] is original_row
+
+    table_model.data(index, Qt.DisplayRole)
+    assert instrumentation.summary() == []
+
+
+def test_instrumentation_callback(instrumentation):
+    summaries = []
+    table_model = TableModel(MODEL_HEADER)
+
+    instrumentation.enable(interval=0, callback=lambda rows, elapsed: summaries.append(rows))
+    table_model.rowCount()
+    table_model.rowCount()
+
+    assert len(summaries) == 2
+    assert [(row['method'], row['calls']) for row in summaries[0]] == [('TableModel.rowCount', 1)]
+    assert 'TableModel.rowCount' in format_summary(summaries[0], 1.0)
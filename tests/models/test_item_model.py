@@ -36,9 +36,11 @@ def test_item_getter(item_model):
 
 
 def test_item_set(qtbot, item_model):
-    with qtbot.waitSignal(item_model.changed, raising=True):
+    with qtbot.waitSignal(item_model.changed, raising=True) as blocker:
         item_model['Column1'] = 'NewValue1'
 
+    assert blocker.args == [['Column1']]
+
     with qtbot.waitSignal(item_model.changed, raising=True):
         item_model['Column5'] = 'NewValue5'
 
@@ -46,6 +48,21 @@ def test_item_set(qtbot, item_model):
     assert item_model['Column5'] == 'NewValue5'
 
 
+def test_item_update(qtbot):
+    item_model = ItemModel({'Column1': 'Value1', 'Column2': 'Value2'})
+
+    with qtbot.waitSignal(item_model.changed, raising=True) as blocker:
+        changed_keys = item_model.update({'Column1': 'Value1', 'Column2': 'NewValue2', 'Column5': 'NewValue5'})
+
+    assert sorted(changed_keys) == ['Column2', 'Column5']
+    assert sorted(blocker.args[0]) == ['Column2', 'Column5']
+    assert item_model['Column2'] == 'NewValue2'
+    assert item_model['Column5'] == 'NewValue5'
+
+    with qtbot.assertNotEmitted(item_model.changed):
+        assert item_model.update({'Column1': 'Value1'}) == []
+
+
 def test_item_parent(item_model):
     assert item_model.parent == PARENT
 
@@ -31,7 +31,11 @@ def test_add_node(qtbot, tree_model):
     """
 
     for index, data in enumerate(TREE_DATA):
-        actual_node = tree_model.add_node(data)
+        with qtbot.waitSignal(tree_model.rowsInserted, raising=True) as blocker:
+            with qtbot.waitSignal(tree_model.rowsAboutToBeInserted, raising=True):
+                actual_node = tree_model.add_node(data)
+
+        assert blocker.args == [QModelIndex(), index, index]
 
         key_value = 'Row{0}_Column1'.format(index + 1)
         expected_node = TREE_DATA[index]
@@ -51,8 +55,39 @@ def test_add_node(qtbot, tree_model):
     assert tree_node['Column4'] == ''
     assert tree_node['Column5'] == ''
 
-    tree_node = tree_model.add_node(TREE_DATA[0], children=[TREE_DATA[1], TREE_DATA[2]])
+    with qtbot.waitSignal(tree_model.rowsInserted, raising=True) as blocker:
+        with qtbot.waitSignal(tree_model.rowsRemoved, raising=True):
+            tree_node = tree_model.add_node(TREE_DATA[0], children=[TREE_DATA[1], TREE_DATA[2]])
+
+    assert blocker.args == [QModelIndex(), 0, 0]
     assert len(tree_node.children) == 2
+    assert tree_model.rowCount() == 5
+    assert tree_node.row() == 0
+
+
+def test_add_nodes(qtbot, tree_model):
+    parent_node = tree_model.add_node(TREE_DATA[0])
+    parent_index = tree_model.index(0, 0)
+    inserted = []
+
+    tree_model.rowsInserted.connect(lambda parent, first, last: inserted.append((parent, first, last)))
+
+    nodes = tree_model.add_nodes(parent_node, [TREE_DATA[1], (TREE_DATA[2], [TREE_DATA[3]])])
+
+    assert inserted == [(parent_index, 0, 1)]
+    assert [node['Column1'] for node in nodes] == ['Row2_Column1', 'Row3_Column1']
+    assert tree_model.rowCount(parent_index) == 2
+    assert tree_model.rowCount(tree_model.index(1, 0, parent_index)) == 1
+    assert tree_model.find_node('Row4_Column1').parent == nodes[1]
+
+    assert tree_model.add_nodes(None, []) == []
+    assert len(inserted) == 1
+
+    nodes = tree_model.add_nodes(parent_node, [dict(TREE_DATA[1], Column2='Replaced'), TREE_DATA[3]])
+
+    assert inserted[1:] == [(parent_index, 0, 0), (parent_index, 2, 2)]
+    assert parent_node.children.keys() == ['Row2_Column1', 'Row3_Column1', 'Row4_Column1']
+    assert parent_node.children['Row2_Column1']['Column2'] == 'Replaced'
 
 
 def test_find_node(tree_model):
@@ -63,14 +98,72 @@ def test_find_node(tree_model):
     with pytest.raises(KeyError):
         found_node = tree_model.find_node('Row5_Column1')
 
+    child_node = tree_model.add_node(TREE_DATA[1], parent=tree_node)
+    grandchild_node = tree_model.add_node(TREE_DATA[2], parent=child_node)
+
+    assert tree_model.find_node('Row3_Column1') == grandchild_node
+    assert tree_model.find_node('Row2_Column1', parent=tree_node) == child_node
+
+    with pytest.raises(KeyError):
+        tree_model.find_node('Row3_Column1', parent=tree_node)
+
+    tree_model.remove_node(child_node)
+
+    with pytest.raises(KeyError):
+        tree_model.find_node('Row3_Column1')
+
+
+def test_path_to(tree_model):
+    tree_model.add_node(TREE_DATA[0])
+    parent_node = tree_model.add_node(TREE_DATA[1])
+    child_node = tree_model.add_node(TREE_DATA[2], parent=parent_node)
+    tree_model.add_node(TREE_DATA[3], parent=parent_node)
+
+    path = tree_model.path_to('Row3_Column1')
+
+    assert path == [tree_model.index(1, 0), tree_model.index(0, 0, tree_model.index(1, 0))]
+    assert path[-1].internalPointer() == child_node
+
+    with pytest.raises(KeyError):
+        tree_model.path_to('Row5_Column1')
+
+
+def test_duplicate_keys(tree_model):
+    first_parent = tree_model.add_node(TREE_DATA[0])
+    second_parent = tree_model.add_node(TREE_DATA[1])
+    first_child = tree_model.add_node(TREE_DATA[2], parent=first_parent)
+    second_child = tree_model.add_node(TREE_DATA[2], parent=second_parent)
+
+    assert tree_model.find_node('Row3_Column1', parent=first_parent) == first_child
+    assert tree_model.find_node('Row3_Column1', parent=second_parent) == second_child
+
+    with pytest.raises(KeyError):
+        tree_model.find_node('Row3_Column1')
+
+    with pytest.raises(KeyError):
+        tree_model.path_to('Row3_Column1')
+
+    tree_model.remove_node(first_child)
+
+    assert tree_model.find_node('Row3_Column1') == second_child
+    assert tree_model.path_to('Row3_Column1')[-1].internalPointer() == second_child
+
+    with pytest.raises(KeyError):
+        tree_model.build_from_records([dict(TREE_DATA[0], Parent=''),
+                                       dict(TREE_DATA[1], Parent=''),
+                                       dict(TREE_DATA[2], Parent='Row1_Column1'),
+                                       dict(TREE_DATA[2], Parent='Row2_Column1')], 'Parent')
+
+    assert tree_model.rowCount() == 2
+
 
 def test_remove_node(qtbot, tree_model):
     """ Verify functionality of the various ways of removing rows from the model.
     """
     tree_node = tree_model.add_node(TREE_DATA[0])
 
-    with qtbot.waitSignal(tree_model.layoutChanged, raising=True):
-        with qtbot.waitSignal(tree_model.layoutAboutToBeChanged, raising=True):
+    with qtbot.waitSignal(tree_model.rowsRemoved, raising=True):
+        with qtbot.waitSignal(tree_model.rowsAboutToBeRemoved, raising=True):
             tree_model.remove_node(tree_node)
 
     assert tree_model.rowCount() == 0
@@ -82,8 +175,8 @@ def test_remove_node(qtbot, tree_model):
         tree_nodes.append(tree_model.add_node(data))
 
     for node in tree_nodes:
-        with qtbot.waitSignal(tree_model.layoutChanged, raising=True):
-            with qtbot.waitSignal(tree_model.layoutAboutToBeChanged, raising=True):
+        with qtbot.waitSignal(tree_model.rowsRemoved, raising=True):
+            with qtbot.waitSignal(tree_model.rowsAboutToBeRemoved, raising=True):
                 tree_model.remove_node(node)
 
     parent_node = tree_model.add_node(TREE_DATA[0])
@@ -95,6 +188,39 @@ def test_remove_node(qtbot, tree_model):
         tree_model.remove_node(child_node)
 
 
+def test_remove_nodes(qtbot, tree_model):
+    """ Verify that removing many nodes at once groups them into contiguous ranges and releases their subtrees.
+    """
+    parent_node = tree_model.add_node(TREE_DATA[0])
+    children = tree_model.add_nodes(parent_node, [{'Column1': str(row)} for row in xrange(6)])
+    grandchild = tree_model.add_node(TREE_DATA[1], parent=children[1])
+    top_nodes = tree_model.add_nodes(None, TREE_DATA[2:])
+    removed = []
+
+    tree_model.rowsRemoved.connect(lambda parent, first, last: removed.append((parent.internalPointer(), first, last)))
+    tree_model.remove_nodes([children[0], children[1], children[3], children[4], grandchild, top_nodes[1]])
+
+    assert sorted(removed) == sorted([(parent_node, 3, 4), (parent_node, 0, 1), (None, 2, 2)])
+    assert parent_node.children.keys() == ['2', '5']
+    assert tree_model.rowCount() == 2
+    assert children[2].row() == 0
+    assert children[5].row() == 1
+
+    assert grandchild.parent is None
+    assert len(children[1].children) == 0
+
+    with pytest.raises(KeyError):
+        tree_model.find_node('Row2_Column1')
+
+    with qtbot.assertNotEmitted(tree_model.dataChanged):
+        children[1]['Column2'] = 'Released'
+
+    with pytest.raises(KeyError):
+        tree_model.remove_nodes([children[2], children[1]])
+
+    assert parent_node.children.keys() == ['2', '5']
+
+
 def test_parent_index(tree_model):
     parent_node = tree_model.add_node(TREE_DATA[0])
     child_node = tree_model.add_node(TREE_DATA[1], parent=parent_node)
@@ -186,6 +312,10 @@ def test_row_count(tree_model):
     assert tree_model.rowCount(parent_index) == 2
 
     assert tree_model.root.row() == 0
+    assert child_node2.row() == 1
+
+    tree_node.remove_child(child_node1['Column1'])
+    assert child_node2.row() == 0
 
 
 def test_iterator(tree_model):
@@ -196,3 +326,453 @@ def test_iterator(tree_model):
 
     for actual_node, expected_node in zip(tree_model, tree_nodes):
         assert actual_node == expected_node
+
+
+def test_lazy_loading(qtbot, tree_model):
+    loaded = []
+
+    def load_children(node):
+        loaded.append(node)
+        return [TREE_DATA[1], (TREE_DATA[2], [TREE_DATA[3]])]
+
+    tree_node = tree_model.add_node(TREE_DATA[0], children=load_children)
+    parent_index = tree_model.index(0, 0)
+
+    assert tree_model.rowCount(parent_index) == 0
+    assert tree_model.hasChildren(parent_index)
+    assert tree_model.canFetchMore(parent_index)
+    assert loaded == []
+
+    with qtbot.waitSignal(tree_model.rowsInserted, raising=True):
+        tree_model.fetchMore(parent_index)
+
+    assert loaded == [tree_node]
+    assert tree_model.rowCount(parent_index) == 2
+    assert not tree_model.canFetchMore(parent_index)
+    assert len(tree_model.find_node('Row3_Column1').children) == 1
+
+    tree_model.unload_node(tree_node)
+
+    assert tree_model.rowCount(parent_index) == 0
+    assert tree_model.canFetchMore(parent_index)
+
+    with pytest.raises(KeyError):
+        tree_model.find_node('Row4_Column1')
+
+
+def test_lazy_loading_batches(tree_model):
+    tree_model.fetch_batch_size = 3
+    tree_node = tree_model.add_node(TREE_DATA[0], children=lambda node: ({'Column1': str(row)} for row in xrange(7)))
+    parent_index = tree_model.index(0, 0)
+
+    for expected_rows in (3, 6, 7):
+        tree_model.fetchMore(parent_index)
+        assert tree_model.rowCount(parent_index) == expected_rows
+
+    assert not tree_model.canFetchMore(parent_index)
+
+    tree_model.evict_stale(lambda index: index == parent_index)
+    assert tree_model.rowCount(parent_index) == 7
+
+    tree_model.evict_stale(lambda index: False, keep=lambda node: node is tree_node)
+    assert tree_model.rowCount(parent_index) == 7
+
+    tree_model.evict_stale(lambda index: False)
+    assert len(tree_node.children) == 0
+    assert tree_model.canFetchMore(parent_index)
+
+
+def test_build_from_records(qtbot, tree_model):
+    tree_model.add_node(TREE_DATA[3])
+
+    records = [dict(TREE_DATA[2], Parent='Row2_Column1'),
+               dict(TREE_DATA[1], Parent='Row1_Column1'),
+               dict(TREE_DATA[0], Parent=''),
+               dict(TREE_DATA[3], Parent='Row1_Column1'),
+              ]
+
+    with qtbot.waitSignal(tree_model.modelReset, raising=True):
+        tree_model.build_from_records((record for record in records), 'Parent')
+
+    assert tree_model.rowCount() == 1
+
+    parent_node = tree_model.find_node('Row1_Column1')
+    assert parent_node.children.keys() == ['Row2_Column1', 'Row4_Column1']
+    assert tree_model.find_node('Row3_Column1').parent == tree_model.find_node('Row2_Column1')
+    assert tree_model.find_node('Row4_Column1').row() == 1
+
+    with qtbot.waitSignal(tree_model.dataChanged, raising=True):
+        parent_node['Column2'] = 'Row1_Column2_New'
+
+    with pytest.raises(ValueError):
+        tree_model.build_from_records([dict(TREE_DATA[0], Parent='Row2_Column1'),
+                                       dict(TREE_DATA[1], Parent='Row1_Column1')], 'Parent')
+
+    assert tree_model.rowCount() == 1
+
+
+def test_filter_nodes(qtbot, tree_model):
+    parent_node = tree_model.add_node(TREE_DATA[0])
+    child_node = tree_model.add_node(TREE_DATA[1], parent=parent_node)
+    grandchild_node = tree_model.add_node(TREE_DATA[2], parent=child_node)
+    other_node = tree_model.add_node(TREE_DATA[3])
+
+    with qtbot.waitSignal(tree_model.filter_changed, raising=True):
+        matches = tree_model.filter_nodes(1, 'Row3')
+
+    assert matches == set([grandchild_node])
+    assert tree_model.accepts_node(parent_node)
+    assert tree_model.accepts_node(child_node)
+    assert tree_model.accepts_node(grandchild_node)
+    assert not tree_model.accepts_node(other_node)
+
+    assert tree_model.filter_nodes(1, 'Row3_') == set([grandchild_node])
+    assert tree_model.filter_nodes(1, 'Row3_X') == set()
+    assert not tree_model.accepts_node(parent_node)
+    assert tree_model.filter_nodes(1, 'Row[34]') == set([grandchild_node, other_node])
+
+    with qtbot.waitSignal(tree_model.dataChanged, raising=True):
+        grandchild_node['Column2'] = 'Changed'
+
+    assert not tree_model.accepts_node(parent_node)
+    assert tree_model.accepts_node(other_node)
+
+    new_node = tree_model.add_node({'Column1': 'New', 'Column2': 'Row4_New'}, parent=child_node)
+
+    assert tree_model.accepts_node(new_node)
+    assert tree_model.accepts_node(parent_node)
+
+    tree_model.remove_node(child_node)
+    assert not tree_model.accepts_node(parent_node)
+
+    tree_model.clear_filter()
+    assert tree_model.accepts_node(parent_node)
+
+
+def test_node_paths(tree_model):
+    parent_node = tree_model.add_node(TREE_DATA[0])
+    child_node = tree_model.add_node(TREE_DATA[1], parent=parent_node)
+    grandchild_node = tree_model.add_node(TREE_DATA[2], parent=child_node)
+    other_node = tree_model.add_node(TREE_DATA[3])
+
+    assert tree_model.node_path(grandchild_node) == ('Row1_Column1', 'Row2_Column1', 'Row3_Column1')
+    assert tree_model.node_path(tree_model.root) == ()
+
+    assert tree_model.depth(parent_node) == 0
+    assert tree_model.depth(grandchild_node) == 2
+
+    assert tree_model.is_ancestor(parent_node, grandchild_node)
+    assert tree_model.is_ancestor(tree_model.root, other_node)
+    assert not tree_model.is_ancestor(grandchild_node, parent_node)
+    assert not tree_model.is_ancestor(other_node, grandchild_node)
+    assert not tree_model.is_ancestor(parent_node, parent_node)
+
+    assert tree_model.descendants(parent_node) == [child_node, grandchild_node]
+    assert tree_model.descendants(other_node) == []
+
+    tree_model.remove_node(child_node)
+
+    with pytest.raises(KeyError):
+        tree_model.node_path(grandchild_node)
+
+
+def test_move_node(qtbot, tree_model):
+    first_node = tree_model.add_node(TREE_DATA[0])
+    second_node = tree_model.add_node(TREE_DATA[1])
+    third_node = tree_model.add_node(TREE_DATA[2])
+    child_node = tree_model.add_node(TREE_DATA[3], parent=first_node)
+
+    with qtbot.waitSignal(tree_model.rowsMoved, raising=True) as blocker:
+        tree_model.move_node(first_node, position=2)
+
+    assert blocker.args == [QModelIndex(), 0, 0, QModelIndex(), 3]
+    assert tree_model.root.children.values() == [second_node, third_node, first_node]
+    assert first_node.row() == 2
+    assert tree_model.node_path(child_node) == ('Row1_Column1', 'Row4_Column1')
+
+    tree_model.move_node(third_node, first_node, 0)
+
+    assert third_node.parent is first_node
+    assert first_node.children.values() == [third_node, child_node]
+    assert tree_model.root.children.values() == [second_node, first_node]
+    assert tree_model.index(0, 0, tree_model.index_of_node(first_node)).internalPointer() is third_node
+    assert tree_model.node_path(third_node) == ('Row1_Column1', 'Row3_Column1')
+
+    with qtbot.waitSignal(tree_model.dataChanged, raising=True):
+        child_node['Column2'] = 'Still connected'
+
+    with pytest.raises(ValueError):
+        tree_model.move_node(first_node, child_node)
+
+    with pytest.raises(IndexError):
+        tree_model.move_node(second_node, first_node, 5)
+
+    tree_model.filter_nodes(0, 'Row4')
+    assert tree_model.accepts_node(first_node)
+
+    tree_model.move_node(child_node, second_node)
+    assert tree_model.accepts_node(second_node)
+    assert not tree_model.accepts_node(first_node)
+
+
+def test_sort(qtbot):
+    tree_model = TreeModel(('Name', 'Size'), header_types={'Name': 'string', 'Size': 'int'})
+
+    big_node = tree_model.add_node({'Name': 'big', 'Size': '100'},
+                                   children=[{'Name': 'b', 'Size': 3}, {'Name': 'a', 'Size': 20}, {'Name': 'c', 'Size': 1}])
+    small_node = tree_model.add_node({'Name': 'Small', 'Size': '9'})
+    empty_node = tree_model.add_node({'Name': 'empty'})
+
+    with qtbot.waitSignal(tree_model.layoutChanged, raising=True):
+        tree_model.sort(1)
+
+    assert tree_model.root.children.values() == [small_node, big_node, empty_node]
+    assert [node['Name'] for node in big_node] == ['c', 'b', 'a']
+
+    tree_model.sort(0, Qt.DescendingOrder, recursive=False)
+
+    assert tree_model.root.children.values() == [small_node, empty_node, big_node]
+    assert [node['Name'] for node in big_node] == ['c', 'b', 'a']
+
+    tree_model.sort(1)
+
+    with qtbot.waitSignal(tree_model.rowsMoved, raising=True) as blocker:
+        tree_model.find_node('c')['Size'] = 50
+
+    assert blocker.args == [tree_model.index_of_node(big_node), 0, 0, tree_model.index_of_node(big_node), 3]
+    assert [node['Name'] for node in big_node] == ['b', 'a', 'c']
+    assert tree_model.index(2, 0, tree_model.index_of_node(big_node)).internalPointer()['Name'] == 'c'
+
+    with qtbot.assertNotEmitted(tree_model.rowsMoved):
+        tree_model.find_node('a')['Name'] = 'a'
+
+    with qtbot.assertNotEmitted(tree_model.layoutChanged):
+        with qtbot.waitSignal(tree_model.rowsInserted, raising=True) as blocker:
+            tree_model.add_node({'Name': 'd', 'Size': 2}, parent=big_node)
+
+    assert blocker.args == [tree_model.index_of_node(big_node), 0, 0]
+    assert [node['Name'] for node in big_node] == ['d', 'b', 'a', 'c']
+
+    big_index = tree_model.index_of_node(big_node)
+
+    with qtbot.waitSignal(tree_model.rowsMoved, raising=True) as blocker:
+        tree_model.move_node(small_node, big_node, 0)
+
+    assert blocker.args == [QModelIndex(), 0, 0, big_index, 2]
+    assert [node['Name'] for node in big_node] == ['d', 'b', 'Small', 'a', 'c']
+
+    with qtbot.assertNotEmitted(tree_model.rowsMoved):
+        tree_model.move_node(tree_model.find_node('c'), big_node, 0)
+
+    tree_model.move_node(small_node, position=2)
+    assert tree_model.root.children.values() == [small_node, big_node, empty_node]
+
+    tree_model.sort(-1)
+    tree_model.add_node({'Name': 'e', 'Size': 1}, parent=big_node)
+    assert [node['Name'] for node in big_node] == ['d', 'b', 'a', 'c', 'e']
+
+
+def test_rollup_columns(qtbot):
+    tree_model = TreeModel(('Name', 'Size'), rollup_columns=('Size', ))
+
+    folder_node = tree_model.add_node({'Name': 'folder'},
+                                      children=[{'Name': 'a', 'Size': 10},
+                                                ({'Name': 'sub'}, [{'Name': 'b', 'Size': 5}, {'Name': 'c', 'Size': '7'}])])
+    sub_node = tree_model.find_node('sub')
+    leaf_node = tree_model.find_node('b')
+    tree_model.flush_rollups()
+
+    assert folder_node['Size'] == 22
+    assert sub_node['Size'] == 12
+    assert tree_model.root['Size'] == 22
+
+    with qtbot.waitSignal(tree_model.dataChanged, raising=True):
+        leaf_node['Size'] = 8
+        leaf_node['Size'] = 9
+
+    assert sub_node['Size'] == 16
+    assert folder_node['Size'] == 26
+
+    changed_nodes = []
+    tree_model.dataChanged.connect(lambda top_left, bottom_right: changed_nodes.append(top_left.internalPointer()))
+
+    leaf_node['Size'] = 1
+    leaf_node['Size'] = 2
+    tree_model.flush_rollups()
+
+    assert changed_nodes.count(sub_node) == 1
+    assert changed_nodes.count(folder_node) == 1
+
+    tree_model.add_node({'Name': 'd', 'Size': 3}, parent=sub_node)
+    assert sub_node['Size'] == 12
+    assert folder_node['Size'] == 22
+
+    tree_model.remove_node(sub_node)
+    assert folder_node['Size'] == 10
+    assert tree_model.root['Size'] == 10
+
+    tree_model.build_from_records([{'Name': 'x', 'Size': 1, 'Parent': None},
+                                   {'Name': 'y', 'Size': 2, 'Parent': 'x'},
+                                   {'Name': 'z', 'Size': 4, 'Parent': 'y'}], 'Parent')
+    assert tree_model.find_node('x')['Size'] == 7
+    assert tree_model.find_node('y')['Size'] == 6
+
+    tree_model.move_node(tree_model.find_node('y'))
+    assert tree_model.find_node('x')['Size'] == 1
+    assert tree_model.root['Size'] == 7
+
+
+def test_sort_rollups(qtbot):
+    tree_model = TreeModel(('Name', 'Size'), header_types={'Size': 'int'}, rollup_columns=('Size', ))
+    tree_model.add_nodes(None, [{'Name': 'a', 'Size': 10},
+                                ({'Name': 'b'}, [{'Name': 'b1', 'Size': 5}]),
+                                ({'Name': 'c'}, [{'Name': 'c1', 'Size': 3}])])
+    tree_model.flush_rollups()
+    tree_model.sort(1)
+
+    assert [node['Name'] for node in tree_model] == ['c', 'b', 'a']
+
+    layout_changes = []
+    tree_model.layoutChanged.connect(lambda: layout_changes.append(True))
+
+    tree_model.remove_nodes([tree_model.find_node('c1'), tree_model.find_node('b1')])
+    tree_model.add_node({'Name': 'c2', 'Size': 20}, parent=tree_model.find_node('c'))
+    tree_model.flush_rollups()
+
+    assert [(node['Name'], node['Size']) for node in tree_model] == [('b', 0), ('a', 10), ('c', 20)]
+    assert len(layout_changes) == 1
+
+
+def test_load_json(tmpdir):
+    tree_model = TreeModel(('Name', 'Size'), rollup_columns=('Size', ))
+    path = tmpdir.join('tree.json')
+    path.write('[{"Name": "a", "Size": 1, "children": [{"Name": "a1", "Size": 2.5, "extra": {"x": [1, 2]},'
+               ' "children": [{"Name": "a1x", "children": [{"Name": "deep", "Size": 4}]}]}]},'
+               ' {"children": [], "Name": "b \\u00e9", "Size": null}]')
+
+    nodes = tree_model.load_json(str(path))
+
+    assert [node['Name'] for node in nodes] == ['a', u'b \u00e9']
+    assert tree_model.find_node('deep').parent is tree_model.find_node('a1x')
+    assert tree_model.find_node('a')['Size'] == 7.5
+    assert tree_model.rowCount() == 2
+
+    tree_model = TreeModel(('Name', 'Size'))
+    tree_model.load_json(str(path), max_depth=2)
+    a1_node = tree_model.find_node('a1')
+
+    assert 'a1x' not in tree_model.nodes_by_key
+    assert tree_model.hasChildren(tree_model.index_of_node(a1_node))
+    assert not tree_model.hasChildren(tree_model.index_of_node(tree_model.find_node(u'b \u00e9')))
+
+    tree_model.fetchMore(tree_model.index_of_node(a1_node))
+    a1x_node = tree_model.find_node('a1x')
+
+    assert a1x_node.parent is a1_node
+    assert tree_model.canFetchMore(tree_model.index_of_node(a1x_node))
+
+    tree_model.fetchMore(tree_model.index_of_node(a1x_node))
+    assert tree_model.find_node('deep')['Size'] == 4
+
+
+def test_load_json_batches(tmpdir):
+    path = tmpdir.join('tree.json')
+    # Children larger than the reader's chunks, so that every batch reads from the document again.
+    path.write('[' + ', '.join('{{"Name": "{0}", "children": [{1}]}}'.format(
+        name, ', '.join('{{"Name": "{0}{1}", "Padding": "{2}"}}'.format(name, row, 'x' * 50000) for row in xrange(3)))
+        for name in 'ab') + ']')
+
+    stream = path.open('rb')
+
+    for source in (str(path), stream):
+        tree_model = TreeModel(('Name', ))
+        tree_model.fetch_batch_size = 2
+        tree_model.load_json(source, max_depth=1)
+        indexes = [tree_model.index(row, 0) for row in xrange(2)]
+
+        # Alternate between the batches of both nodes, which read the same document.
+        for batch in xrange(2):
+            for index in indexes:
+                tree_model.fetchMore(index)
+
+        for name, index in zip('ab', indexes):
+            assert [node['Name'] for node in index.internalPointer()] == [name + str(row) for row in xrange(3)]
+            assert not tree_model.canFetchMore(index)
+
+    stream.close()
+
+
+def test_sync(qtbot, tree_model):
+    tree_model.sync([{'Column1': 'a', 'children': [{'Column1': 'a1'}, {'Column1': 'a2'}, {'Column1': 'a3'}]},
+                     {'Column1': 'b'}, {'Column1': 'c'}, {'Column1': 'd'}])
+
+    a_node = tree_model.find_node('a')
+    a1_node = tree_model.find_node('a1')
+    d_node = tree_model.find_node('d')
+
+    assert [node['Column1'] for node in tree_model] == ['a', 'b', 'c', 'd']
+    assert [node['Column1'] for node in a_node] == ['a1', 'a2', 'a3']
+
+    moves = []
+    tree_model.rowsMoved.connect(lambda *args: moves.append(args))
+
+    with qtbot.waitSignal(tree_model.rowsInserted, raising=True) as blocker:
+        tree_model.sync([{'Column1': 'd', 'Column2': 'changed'},
+                         {'Column1': 'a', 'children': [{'Column1': 'a1'}, {'Column1': 'new1'}, {'Column1': 'new2'},
+                                                       {'Column1': 'a3'}]},
+                         {'Column1': 'b'}, {'Column1': 'c'}])
+
+    assert blocker.args == [tree_model.index_of_node(a_node), 1, 2]
+    assert len(moves) == 1
+    assert [node['Column1'] for node in tree_model] == ['d', 'a', 'b', 'c']
+    assert [node['Column1'] for node in a_node] == ['a1', 'new1', 'new2', 'a3']
+    assert tree_model.find_node('a1') is a1_node
+    assert tree_model.find_node('d') is d_node
+    assert d_node['Column2'] == 'changed'
+    assert 'a2' not in tree_model.nodes_by_key
+
+    with qtbot.assertNotEmitted(tree_model.dataChanged):
+        with qtbot.assertNotEmitted(tree_model.rowsMoved):
+            tree_model.sync([{'Column1': 'd', 'Column2': 'changed'}, {'Column1': 'a'}, {'Column1': 'b'},
+                             {'Column1': 'c'}])
+
+    assert len(a_node.children) == 4
+
+    with qtbot.waitSignal(tree_model.rowsRemoved, raising=True) as blocker:
+        tree_model.sync([], parent=a_node)
+
+    assert blocker.args == [tree_model.index_of_node(a_node), 0, 3]
+
+
+def test_sync_rollups():
+    tree_model = TreeModel(('Name', 'Size'), rollup_columns=('Size', ))
+    tree_model.sync([{'Name': 'a', 'Size': 1, 'children': [{'Name': 'a1', 'Size': 2}, {'Name': 'a2', 'Size': 3}]}])
+
+    assert tree_model.find_node('a')['Size'] == 6
+
+    tree_model.sync([{'Name': 'a', 'Size': 10, 'children': [{'Name': 'a1', 'Size': 5}]}])
+
+    assert tree_model.find_node('a')['Size'] == 15
+    assert tree_model.root['Size'] == 15
+
+
+def test_changed_keys(qtbot, tree_model):
+    parent_node = tree_model.add_node(TREE_DATA[0])
+    tree_node = tree_model.add_node(TREE_DATA[1], parent=parent_node)
+
+    with qtbot.waitSignal(tree_model.dataChanged, raising=True) as blocker:
+        tree_node['Column3'] = 'Changed'
+
+    assert [index.column() for index in blocker.args] == [2, 2]
+
+    with qtbot.waitSignal(tree_model.dataChanged, raising=True) as blocker:
+        tree_node.update({'Column2': 'Changed', 'Column3': 'Changed', 'Column5': 'Changed'})
+
+    assert [index.column() for index in blocker.args] == [1, 4]
+
+    tree_node['Column1'] = 'Renamed'
+
+    assert tree_model.find_node('Renamed') is tree_node
+    assert 'Row2_Column1' not in tree_model.nodes_by_key
+    assert tree_model.find_node('Renamed', parent=parent_node) is tree_node
+    assert tree_model.node_path(tree_node) == ('Row1_Column1', 'Renamed')
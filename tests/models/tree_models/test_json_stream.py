@@ -0,0 +1,54 @@
+import json
+
+from StringIO import StringIO
+
+from pyqt_widgets.models.tree_models.json_stream import JSONEventReader, read_value, skip_value
+
+
+DOCUMENT = json.dumps([{'name': u'caf\u00e9 "quoted"', 'values': [1, -2.5, 3e10, True, False, None], 'nested': {'a': {}}},
+                       [], 12345678901234567890, 'tail'], ensure_ascii=False).encode('utf-8')
+
+
+def test_read_value_across_chunks():
+    for chunk_size in (1, 2, 3, 7, 64):
+        events = iter(JSONEventReader(StringIO(DOCUMENT), chunk_size=chunk_size))
+        event, value, offset = next(events)
+
+        assert read_value(events, event, value) == json.loads(DOCUMENT)
+
+
+def test_offsets():
+    events = iter(JSONEventReader(StringIO(DOCUMENT), chunk_size=5))
+    next(events)
+    next(events)
+
+    for event, key, offset in events:
+        event, value, offset = next(events)
+
+        if key == 'values':
+            break
+
+        skip_value(events, event)
+
+    assert DOCUMENT[offset] == '['
+
+    events = iter(JSONEventReader(StringIO(DOCUMENT), offset))
+    event, value, offset = next(events)
+
+    assert read_value(events, event, value) == [1, -2.5, 3e10, True, False, None]
+    assert list(events) == []
+
+
+def test_shared_stream():
+    stream = StringIO(DOCUMENT)
+    first_events = iter(JSONEventReader(stream, chunk_size=4))
+    second_events = iter(JSONEventReader(stream, DOCUMENT.index('[1'), chunk_size=4))
+    first_values = []
+    second_values = []
+
+    for first_event, second_event in zip(first_events, second_events):
+        first_values.append(first_event)
+        second_values.append(second_event)
+
+    assert first_values == list(JSONEventReader(StringIO(DOCUMENT)))[:len(first_values)]
+    assert second_values == list(JSONEventReader(StringIO(DOCUMENT), DOCUMENT.index('[1')))
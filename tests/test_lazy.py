@@ -0,0 +1,99 @@
+import sys
+
+import pytest
+
+from pyqt_widgets.lazy import LazyModule
+
+
+PACKAGE_INIT = """
+import sys
+
+from pyqt_widgets.lazy import LazyModule
+
+
+def package_function():
+    return 'package'
+
+
+sys.modules[__name__] = LazyModule(sys.modules[__name__], (
+    ('first', ('FirstClass', 'shared', )),
+    ('second', ('second_function', )),
+    ('third', ('third', 'ThirdClass', )),
+))
+"""
+
+
+@pytest.fixture()
+def lazy_package(tmpdir):
+    package = tmpdir.mkdir('lazy_package')
+    package.join('__init__.py').write(PACKAGE_INIT)
+    package.join('first.py').write("class FirstClass(object):\n    pass\n\nshared = 'first'\nunlisted = 'first'\n")
+    package.join('second.py').write("def second_function():\n    return 'second'\n\nunlisted = 'second'\n")
+    package.join('third.py').write("class ThirdClass(object):\n    pass\n\ndef third():\n    return ThirdClass()\n")
+
+    sys.path.insert(0, str(tmpdir))
+
+    try:
+        import lazy_package
+        yield lazy_package
+    finally:
+        sys.path.remove(str(tmpdir))
+
+        for name in list(sys.modules):
+            if name == 'lazy_package' or name.startswith('lazy_package.'):
+                del sys.modules[name]
+
+
+def test_lazy_attributes(lazy_package):
+    assert isinstance(lazy_package, LazyModule)
+    assert lazy_package.package_function() == 'package'
+    assert 'lazy_package.first' not in sys.modules
+    assert 'lazy_package.second' not in sys.modules
+
+    assert lazy_package.second_function() == 'second'
+    assert 'lazy_package.second' in sys.modules
+    assert 'lazy_package.first' not in sys.modules
+
+    from lazy_package import FirstClass
+    assert FirstClass.__module__ == 'lazy_package.first'
+    assert lazy_package.shared == 'first'
+
+    # Names that are not listed are found as if the submodules had been star-imported in order.
+    assert lazy_package.unlisted == 'second'
+
+    with pytest.raises(AttributeError):
+        lazy_package.missing
+
+
+def test_lazy_star_import(lazy_package):
+    names = {}
+    exec 'from lazy_package import *' in names
+
+    assert names['FirstClass'].__module__ == 'lazy_package.first'
+    assert names['second_function']() == 'second'
+    assert names['unlisted'] == 'second'
+    assert 'FirstClass' in lazy_package.__all__
+
+
+def test_lazy_name_of_submodule(lazy_package):
+    # Loading the submodule through another of its names must not hide the listed name that is the same as its own.
+    assert lazy_package.ThirdClass.__module__ == 'lazy_package.third'
+    assert callable(lazy_package.third)
+    assert isinstance(lazy_package.third(), lazy_package.ThirdClass)
+
+    from lazy_package import third
+    assert isinstance(third(), lazy_package.ThirdClass)
+
+
+def test_widgets_image_view(qtbot, tmpdir):
+    from pyqt_widgets import widgets
+
+    assert widgets.ImageLabel.__module__ == 'pyqt_widgets.widgets.image_view'
+    assert callable(widgets.image_view)
+
+    from pyqt_widgets.widgets import image_view
+    assert image_view is widgets.image_view
+
+    label = image_view(str(tmpdir.join('missing.png')))
+    qtbot.addWidget(label)
+    assert isinstance(label, widgets.ImageLabel)
@@ -0,0 +1,97 @@
+import pytest
+
+from pyqt_widgets.widgets import media_scanner
+from pyqt_widgets.widgets.media_scanner import MediaScanner, extension_set, is_supported, list_filenames, media_changes
+
+
+IMAGE_NAMES = ['image{0}.png'.format(index) for index in xrange(5)]
+
+
+@pytest.fixture()
+def media_directory(tmpdir):
+    for filename in IMAGE_NAMES + ['notes.txt', 'UPPER.PNG']:
+        tmpdir.join(filename).write('')
+
+    tmpdir.mkdir('folder.png')
+    return str(tmpdir)
+
+
+def test_extension_set():
+    assert extension_set({'Images': ['.PNG', '.jpg'], 'Videos': ['.mp4']}) == frozenset(['.png', '.jpg', '.mp4'])
+    assert extension_set({}) is None
+    assert extension_set(None) is None
+
+
+def test_is_supported():
+    extensions = frozenset(['.png', '.jpg'])
+
+    assert is_supported('photo.JPG', extensions)
+    assert is_supported('archive.tar.png', extensions)
+    assert not is_supported('notes.txt', extensions)
+    assert not is_supported('png', extensions)
+    assert is_supported('notes.txt', None)
+
+
+def test_list_filenames(media_directory, monkeypatch):
+    expected_names = sorted(IMAGE_NAMES + ['UPPER.PNG', 'notes.txt'])
+
+    assert sorted(list_filenames(media_directory)) == expected_names
+
+    monkeypatch.setattr(media_scanner, 'scandir', None)
+    assert sorted(list_filenames(media_directory)) == expected_names
+
+
+def test_media_changes():
+    assert media_changes(['a.png', 'b.png'], ['b.png', 'a.png']) == ([], [])
+    assert media_changes([], ['b.png', 'a.png']) == (['a.png', 'b.png'], [])
+    assert media_changes(['a.png', 'b.png'], []) == ([], ['a.png', 'b.png'])
+    assert media_changes(['a.png', 'old.png'], set(['a.png', 'new.png', 'c.png'])) == (['c.png', 'new.png'],
+                                                                                    ['old.png'])
+
+
+def test_scan_batches(media_directory):
+    scanner = MediaScanner(media_directory, frozenset(['.png']), batch_size=2, batch_interval=60)
+    batches = []
+    scanner.files_found.connect(batches.append)
+
+    scanner.run()
+
+    assert [len(batch) for batch in batches] == [2, 2, 2]
+    assert sorted(sum(batches, [])) == sorted(IMAGE_NAMES + ['UPPER.PNG'])
+    assert not scanner.failed
+
+
+def test_scan_cancel(media_directory):
+    scanner = MediaScanner(media_directory, batch_size=2, batch_interval=60)
+    batches = []
+
+    def files_found(batch):
+        batches.append(batch)
+        scanner.cancel()
+
+    scanner.files_found.connect(files_found)
+    scanner.run()
+
+    assert [len(batch) for batch in batches] == [2]
+    assert scanner.cancelled
+
+
+def test_scan_failed(tmpdir):
+    scanner = MediaScanner(str(tmpdir.join('missing')))
+    errors = []
+    scanner.scan_failed.connect(errors.append)
+
+    scanner.run()
+
+    assert len(errors) == 1
+    assert scanner.failed
+
+
+def test_scan_finished(qtbot, media_directory):
+    scanner = MediaScanner(media_directory, frozenset(['.png']))
+
+    with qtbot.waitSignal(scanner.finished, raising=True):
+        scanner.start()
+
+    assert scanner.wait()
+    assert not scanner.isRunning()
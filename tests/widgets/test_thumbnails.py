@@ -0,0 +1,186 @@
+import os
+import threading
+
+import pytest
+
+from PyQt4.QtCore import QRunnable
+from PyQt4.QtGui import QApplication
+from PyQt4.QtGui import QImage
+
+from pyqt_widgets.widgets.thumbnails import DiskCache, LRUCache, ThumbnailService, THUMBNAIL_SIZE, size_bucket
+
+
+def make_image(path, width, height):
+    image = QImage(width, height, QImage.Format_RGB32)
+    image.fill(0)
+    assert image.save(path, 'PNG')
+
+    return path
+
+
+@pytest.fixture()
+def image_path(qtbot, tmpdir):
+    return make_image(str(tmpdir.join('image.png')), 1000, 500)
+
+
+@pytest.fixture()
+def service(tmpdir):
+    service = ThumbnailService(cache_directory=str(tmpdir.join('cache')))
+    yield service
+    service.wait()
+
+
+class BlockingTask(QRunnable):
+    """ Keep the only thread of a pool busy until released, so that the tasks started after it wait.
+    """
+
+    def __init__(self):
+        QRunnable.__init__(self)
+        self.released = threading.Event()
+
+    def run(self):
+        self.released.wait(5)
+
+
+def test_size_bucket():
+    assert size_bucket(None) is None
+    assert size_bucket(1) == THUMBNAIL_SIZE
+    assert size_bucket(THUMBNAIL_SIZE) == THUMBNAIL_SIZE
+    assert size_bucket(THUMBNAIL_SIZE + 1) == 512
+    assert size_bucket(4096) == 4096
+    assert size_bucket(4097) is None
+
+
+def test_lru_cache():
+    cache = LRUCache(10, cost=len)
+
+    cache.put('a', 'aaaa')
+    cache.put('b', 'bbbb')
+    assert cache.get('a') == 'aaaa'
+
+    # 'b' is now the least recently used value.
+    cache.put('c', 'cccc')
+    assert 'b' not in cache
+    assert 'a' in cache and 'c' in cache
+    assert cache.total == 8
+
+    cache.put('a', 'aa')
+    assert cache.total == 6
+
+    # A value costing more than the whole limit is not kept, and does not evict anything.
+    cache.put('d', 'd' * 11)
+    assert 'd' not in cache
+    assert len(cache) == 2
+
+    cache.discard('a')
+    assert cache.total == 4
+    assert cache.get('a', 'missing') == 'missing'
+
+    cache.clear()
+    assert cache.total == 0 and not len(cache)
+
+
+def test_disk_cache(qtbot, tmpdir):
+    disk_cache = DiskCache(str(tmpdir.join('cache')), limit=1)
+    image = QImage(64, 32, QImage.Format_RGB32)
+    image.fill(0)
+
+    first_key = ('/images/first.png', 1000.0, 2048)
+    second_key = ('/images/first.png', 2000.0, 2048)
+    assert disk_cache.read(first_key) is None
+
+    disk_cache.write(first_key, image)
+    thumbnail = disk_cache.read(first_key)
+    assert (thumbnail.width(), thumbnail.height()) == (64, 32)
+
+    # A different modification time (or size) is a different thumbnail.
+    assert disk_cache.path_of(second_key) != disk_cache.path_of(first_key)
+    assert disk_cache.read(second_key) is None
+
+    disk_cache.write(second_key, image)
+    os.utime(disk_cache.path_of(first_key), (0, 0))
+    assert not [filename for filename in os.listdir(disk_cache.directory) if filename.endswith('.tmp')]
+
+    disk_cache.limit = os.path.getsize(disk_cache.path_of(second_key))
+    disk_cache.prune()
+
+    # The least recently used thumbnail goes first.
+    assert disk_cache.read(first_key) is None
+    assert disk_cache.read(second_key) is not None
+
+
+def test_request(qtbot, service, image_path):
+    with qtbot.waitSignal(service.image_ready, raising=True) as blocker:
+        assert service.request(image_path, 300) is None
+        service.wait()
+
+    path, bucket, image = blocker.args
+    assert (path, bucket) == (image_path, 512)
+    assert (image.width(), image.height()) == (512, 256)
+
+    # Decoded images are kept in memory, and a thumbnail of them on disk.
+    assert service.request(image_path, 400).width() == 512
+    assert service.disk_cache.read(service.image_key(image_path)).width() == THUMBNAIL_SIZE
+
+    service.memory_cache.clear()
+    assert service.request(image_path, THUMBNAIL_SIZE).width() == THUMBNAIL_SIZE
+
+    # While a larger size is decoded, the thumbnail is the best image available.
+    with qtbot.waitSignal(service.image_ready, raising=True) as blocker:
+        assert service.request(image_path, None).width() == THUMBNAIL_SIZE
+        service.wait()
+
+    assert blocker.args[1] is None
+    assert blocker.args[2].width() == 1000
+
+
+def test_request_changed_file(qtbot, service, image_path):
+    with qtbot.waitSignal(service.image_ready, raising=True):
+        service.request(image_path, 512)
+        service.wait()
+
+    make_image(image_path, 600, 600)
+    stat = os.stat(image_path)
+    os.utime(image_path, (stat.st_atime, stat.st_mtime + 10))
+
+    # The image changed, so neither the decoded image nor its thumbnail are used.
+    with qtbot.waitSignal(service.image_ready, raising=True) as blocker:
+        assert service.request(image_path, 512) is None
+        service.wait()
+
+    assert (blocker.args[2].width(), blocker.args[2].height()) == (512, 512)
+
+
+def test_cancel(qtbot, service, image_path):
+    service.pool.setMaxThreadCount(1)
+    blocking_task = BlockingTask()
+    service.pool.start(blocking_task)
+
+    # A request withdrawn by every requester before it started is never decoded.
+    with qtbot.assertNotEmitted(service.image_ready):
+        service.request(image_path, 512)
+        service.request(image_path, 512)
+        service.cancel(image_path, 512)
+        service.cancel(image_path, 512)
+
+        blocking_task.released.set()
+        service.wait()
+        QApplication.processEvents()
+
+    assert service.request(image_path, 512) is None
+    service.cancel(image_path, 512)
+    service.wait()
+
+    # A request that someone still waits for is decoded for them.
+    blocking_task = BlockingTask()
+    service.pool.start(blocking_task)
+
+    with qtbot.waitSignal(service.image_ready, raising=True) as blocker:
+        service.request(image_path, 1024)
+        service.request(image_path, 1024)
+        service.cancel(image_path, 1024)
+
+        blocking_task.released.set()
+        service.wait()
+
+    assert blocker.args[1] == 1024
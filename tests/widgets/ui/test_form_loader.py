@@ -0,0 +1,148 @@
+import marshal
+import os
+
+import pytest
+
+from pyqt_widgets.widgets.progress_dialog import ProgressDialog
+from pyqt_widgets.widgets.prompts import MultipleChoicePrompt
+from pyqt_widgets.widgets.ui import form_loader
+
+
+SAMPLE_FORM = '''<?xml version="1.0" encoding="UTF-8"?>
+<ui version="4.0">
+ <class>Sample</class>
+ <widget class="QWidget" name="Sample">
+  <widget class="QLabel" name="label"/>
+ </widget>
+ <resources/>
+ <connections/>
+</ui>
+'''
+
+
+@pytest.fixture()
+def ui_directory(tmpdir, monkeypatch):
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmpdir.join('cache')))
+    monkeypatch.setattr(form_loader, '_forms', {})
+
+    ui_directory = tmpdir.mkdir('ui')
+    ui_directory.join('sample.ui').write(SAMPLE_FORM)
+
+    return str(ui_directory)
+
+
+@pytest.fixture()
+def compiled(monkeypatch):
+    """ Record the paths of the .ui files compiled by load_form.
+    """
+    compiled = []
+    compile_form = form_loader._compile_form
+
+    def recording_compile_form(ui_path):
+        compiled.append(ui_path)
+        return compile_form(ui_path)
+
+    monkeypatch.setattr(form_loader, '_compile_form', recording_compile_form)
+    return compiled
+
+
+def test_load_form_cache(ui_directory, compiled):
+    form = form_loader.load_form('sample', ui_directory)
+
+    assert form.__name__ == 'Ui_Sample'
+    assert len(compiled) == 1
+    assert len(os.listdir(form_loader.cache_directory())) == 1
+    assert form_loader.load_form('sample', ui_directory) is form
+
+    form_loader._forms.clear()
+
+    assert form_loader.load_form('sample', ui_directory).__name__ == 'Ui_Sample'
+    assert len(compiled) == 1
+
+
+def test_load_form_changed(ui_directory, compiled):
+    ui_path = os.path.join(ui_directory, 'sample.ui')
+    form_loader.load_form('sample', ui_directory)
+
+    ui_stat = os.stat(ui_path)
+    os.utime(ui_path, (ui_stat.st_atime, ui_stat.st_mtime + 10))
+    form_loader.load_form('sample', ui_directory)
+
+    assert len(compiled) == 2
+
+    ui_stat = os.stat(ui_path)
+
+    with open(ui_path, 'a') as ui_file:
+        ui_file.write('\n')
+
+    os.utime(ui_path, (ui_stat.st_atime, ui_stat.st_mtime))
+    form_loader.load_form('sample', ui_directory)
+
+    assert len(compiled) == 3
+
+
+def test_load_form_stamp(ui_directory, compiled, monkeypatch):
+    form_loader.load_form('sample', ui_directory)
+    cache_path = os.path.join(form_loader.cache_directory(), os.listdir(form_loader.cache_directory())[0])
+
+    with open(cache_path, 'rb') as cache_file:
+        stamp, code = marshal.load(cache_file)
+
+    with open(cache_path, 'wb') as cache_file:
+        marshal.dump((('\0\0\0\0', ) + tuple(stamp[1:]), code), cache_file)
+
+    form_loader._forms.clear()
+    form_loader.load_form('sample', ui_directory)
+
+    assert len(compiled) == 2
+
+    monkeypatch.setattr(form_loader, 'PYQT_VERSION_STR', 'another version')
+    form_loader._forms.clear()
+    form_loader.load_form('sample', ui_directory)
+
+    assert len(compiled) == 3
+
+    form_loader._forms.clear()
+    form_loader.load_form('sample', ui_directory)
+
+    assert len(compiled) == 3
+
+
+def test_deferred_form_shown(qtbot):
+    dialog = ProgressDialog('Copying', total_steps=4)
+    qtbot.addWidget(dialog)
+
+    dialog.complete_step('first')
+    dialog.notify_operation('second')
+
+    assert not dialog.form_built
+
+    dialog.show()
+
+    assert dialog.form_built
+    assert dialog.ui.progress_bar.maximum() == 4
+    assert dialog.ui.progress_bar.value() == 1
+    assert unicode(dialog.ui.log_window.toPlainText()) == u'first\nsecond'
+
+    dialog.finish('done')
+
+    assert dialog.ui.progress_bar.value() == 4
+    assert unicode(dialog.ui.log_window.toPlainText()) == u'first\nsecond\ndone'
+    assert not dialog.ui.cancel_button.isEnabled()
+
+
+def test_deferred_form_ui(qtbot):
+    prompt = MultipleChoicePrompt('Title', 'Message', ['a', 'b'])
+    qtbot.addWidget(prompt)
+
+    prompt.message = 'Choose one'
+    prompt.options = ['x', 'y', 'z']
+
+    assert not prompt.form_built
+
+    ui = prompt.ui
+
+    assert prompt.form_built
+    assert unicode(ui.combo_label.text()) == u'Choose one'
+    assert [unicode(ui.main_combo.itemText(row)) for row in xrange(ui.main_combo.count())] == [u'x', u'y', u'z']
+    assert prompt.selected_option() == 'x'